@@ -0,0 +1,215 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions that analyze the SMART time series from an nvmecmd logpage02 monitor
+#
+#  Works on the columns of monitor.csv (written by stop_monitor) or directly on a MonitorSeries.  All calculations
+#  are done with numpy over the whole series at once so millions of samples per drive can be processed quickly.
+#  Requires numpy, which is not needed by the other scripts.
+#
+#  Command line example:   python analysis.py Test7/Step1-Start-Monitor/monitor.csv --csv analysis.csv
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import sys,argparse,logging,csv
+import numpy as np
+from monitor import MONITOR_CSV_HEADER
+
+logger = logging.getLogger('nvme_logger')
+
+PERCENTILES     = [50,90,99,99.9]       # percentiles reported for temperature and bandwidth
+ROLLING_WINDOW  = 30                    # samples in the rolling mean, 60 seconds at the default 2 second interval
+
+# Name used in the analysis for each monitor.csv column
+
+CSV_COLUMN_NAMES = ['timestamp','temperature','read_rate','write_rate','tmt1_delta','tmt2_delta',
+                    'data_read','data_written','tmt1','tmt2','warning_time','critical_time','busy_time']
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Load the columns from monitor.csv or a MonitorSeries
+#--------------------------------------------------------------------------------------------------------------------
+def load_monitor_csv(csv_path):
+
+    with open(csv_path) as csv_file:
+        header = csv_file.readline().strip().split(',')
+
+    if header != MONITOR_CSV_HEADER:
+        raise ValueError(f"{csv_path} is not a monitor.csv file")
+
+    values     = np.loadtxt(csv_path, delimiter=',', skiprows=1, usecols=range(1,len(CSV_COLUMN_NAMES)), ndmin=2)
+    timestamps = np.loadtxt(csv_path, delimiter=',', skiprows=1, usecols=0, dtype=str, ndmin=1)
+
+    columns = {'timestamp': timestamps}
+    for index,name in enumerate(CSV_COLUMN_NAMES[1:]):
+        columns[name] = values[:,index]
+
+    return columns
+
+def series_columns(series):
+
+    # The series stores integer and float arrays, all columns are converted to float for the calculations
+
+    columns = {'timestamp': np.array(series.timestamps)}
+    for name,column in series.columns.items():
+        columns[name] = np.frombuffer(column, dtype=np.int64 if column.typecode == 'q' else np.float64).astype(np.float64)
+
+    columns['read_rate']  = np.diff(columns['data_read'], prepend=columns['data_read'][:1]) / series.sample_rate_sec
+    columns['write_rate'] = np.diff(columns['data_written'], prepend=columns['data_written'][:1]) / series.sample_rate_sec
+    columns['tmt1_delta'] = np.diff(columns['tmt1'], prepend=columns['tmt1'][:1])
+    columns['tmt2_delta'] = np.diff(columns['tmt2'], prepend=columns['tmt2'][:1])
+
+    return columns
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Batch calculations over a whole series
+#--------------------------------------------------------------------------------------------------------------------
+def percentiles(values, points=PERCENTILES):
+    if len(values) == 0: return {point: float('nan') for point in points}
+    return dict(zip(points, np.percentile(values, points)))
+
+def rolling_mean(values, window=ROLLING_WINDOW):
+
+    # Mean of the prior window samples using a cumulative sum, the first samples use the samples available
+
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0: return values
+
+    totals = np.cumsum(np.insert(values, 0, 0.0))
+    ends   = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+
+    return (totals[ends] - totals[starts]) / (ends - starts)
+
+def throttle_onsets(columns, window=ROLLING_WINDOW):
+
+    # A sample is throttled if the TMT1 or TMT2 time increased since the prior sample.  An onset is the first
+    # throttled sample after an unthrottled one.  Bandwidth before and after is the rolling mean either side.
+
+    throttled = (columns['tmt1_delta'] > 0) | (columns['tmt2_delta'] > 0)
+    onsets    = np.flatnonzero(throttled & ~np.concatenate(([False], throttled[:-1])))
+
+    bandwidth = columns['read_rate'] + columns['write_rate']
+    trailing  = rolling_mean(bandwidth, window)
+    leading   = rolling_mean(bandwidth[::-1], window)[::-1]
+
+    before    = trailing[np.maximum(onsets - 1, 0)]
+    after     = leading[onsets]
+
+    return [{'index':          int(index),
+             'timestamp':      str(columns['timestamp'][index]),
+             'temperature':    float(columns['temperature'][index]),
+             'bandwidth_before': float(bw_before),
+             'bandwidth_after':  float(bw_after)} for index,bw_before,bw_after in zip(onsets,before,after)]
+
+def bandwidth_temperature_correlation(columns):
+
+    # Pearson correlation of total bandwidth (read + write) with temperature, nan if either does not change
+
+    bandwidth   = columns['read_rate'] + columns['write_rate']
+    temperature = columns['temperature']
+
+    if len(bandwidth) < 2 or np.std(bandwidth) == 0 or np.std(temperature) == 0:
+        return float('nan')
+
+    return float(np.corrcoef(bandwidth, temperature)[0,1])
+
+def analyze_monitor(columns, window=ROLLING_WINDOW):
+
+    bandwidth = columns['read_rate'] + columns['write_rate']
+    throttled = (columns['tmt1_delta'] > 0) | (columns['tmt2_delta'] > 0)
+
+    results = {}
+    results['samples']                = len(bandwidth)
+    results['temperature']            = percentiles(columns['temperature'])
+    results['bandwidth']              = percentiles(bandwidth)
+    results['max_rolling_temperature']= float(np.max(rolling_mean(columns['temperature'], window))) if len(bandwidth) else float('nan')
+    results['max_rolling_bandwidth']  = float(np.max(rolling_mean(bandwidth, window))) if len(bandwidth) else float('nan')
+    results['throttled_percent']      = float(100.0 * np.mean(throttled)) if len(bandwidth) else 0.0
+    results['throttle_onsets']        = throttle_onsets(columns, window)
+    results['correlation']            = bandwidth_temperature_correlation(columns)
+
+    return results
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Log the results using the same format as the test steps
+#--------------------------------------------------------------------------------------------------------------------
+def log_monitor_analysis(results):
+
+    width = 40
+
+    logger.info("")
+    logger.info(f"\t {'   Samples':{width}} {results['samples']}")
+    logger.info("")
+    logger.info(f"\t {'   Temperature Percentiles':{width}} " + "   ".join(f"P{point}: {value:.1f} C" for point,value in results['temperature'].items()))
+    logger.info(f"\t {'   Bandwidth Percentiles':{width}} " + "   ".join(f"P{point}: {value:.3f} GB/s" for point,value in results['bandwidth'].items()))
+    logger.info(f"\t {'   Max Rolling Mean Temperature':{width}} {results['max_rolling_temperature']:.1f} C")
+    logger.info(f"\t {'   Max Rolling Mean Bandwidth':{width}} {results['max_rolling_bandwidth']:.3f} GB/s")
+    logger.info(f"\t {'   Bandwidth vs Temperature Correlation':{width}} {results['correlation']:.3f}")
+    logger.info(f"\t {'   Throttled Samples':{width}} {results['throttled_percent']:.2f} %")
+    logger.info("")
+
+    for onset in results['throttle_onsets']:
+        logger.info(f"\t   Throttle started {onset['timestamp']} at {onset['temperature']:.0f} C    " +
+                    f"Bandwidth: {onset['bandwidth_before']:.3f} GB/s before  {onset['bandwidth_after']:.3f} GB/s after")
+
+    if results['throttle_onsets']: logger.info("")
+
+def write_analysis_csv(csv_path, analyzed_files):
+
+    with open(csv_path, mode='w', newline='') as analysis_csv_file:
+        csv_writer = csv.writer(analysis_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+        csv_writer.writerow(['File','Samples'] + [f"TempP{point}(C)" for point in PERCENTILES] + [f"BandwidthP{point}(GB/sec)" for point in PERCENTILES] +
+                            ['MaxRollingTemp(C)','MaxRollingBandwidth(GB/sec)','Throttled(%)','ThrottleOnsets','Correlation'])
+
+        for file_path,results in analyzed_files:
+            csv_writer.writerow([file_path,results['samples']] +
+                                [f"{value:.1f}" for value in results['temperature'].values()] +
+                                [f"{value:.3f}" for value in results['bandwidth'].values()] +
+                                [f"{results['max_rolling_temperature']:.1f}",f"{results['max_rolling_bandwidth']:.3f}",
+                                 f"{results['throttled_percent']:.2f}",len(results['throttle_onsets']),f"{results['correlation']:.3f}"])
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Analyze one or more monitor.csv files from the command line
+#--------------------------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Analyzes monitor.csv files', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('files',    type=str, nargs='+', help='monitor.csv files to analyze', metavar='<file>')
+    parser.add_argument('--window', type=int, default=ROLLING_WINDOW, help='Samples in the rolling mean', metavar='#')
+    parser.add_argument('--csv',    type=str, default='', help='Write one row per file to this csv file', metavar='<file>')
+    args = parser.parse_args()
+
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+    analyzed_files = []
+    for file_path in args.files:
+        try:
+            results = analyze_monitor(load_monitor_csv(file_path), args.window)
+            logger.info(f"\t Monitor file : {file_path}")
+            log_monitor_analysis(results)
+            analyzed_files.append((file_path,results))
+        except Exception as e:
+            logger.error(f"Failed to analyze {file_path} with exception: {e}")
+
+    if args.csv != "":
+        write_analysis_csv(args.csv, analyzed_files)
+
+    sys.exit(len(args.files) - len(analyzed_files))
@@ -27,24 +27,43 @@
 #--------------------------------------------------------------------------------------------------------------------
 import sys,os, argparse, time, logging, csv
 from test import *
+from plan import load_plan,run_plan
 from datetime import datetime
 
 #--------------------------------------------------------------------------------------------------------------------
 # Read the command line parameters using argparse 
 #--------------------------------------------------------------------------------------------------------------------
 parser = argparse.ArgumentParser(description='Runs functional tests on NVMe drive', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-parser.add_argument('--nvme',   type=int, default=0, help='NVMe drive number', metavar='#')
-parser.add_argument('--volume', type=str, default=DEFAULT_VOLUME, help='Volume to run fio (e.g. c:)', metavar='<dir>')
+parser.add_argument('--nvme',   type=int, nargs="+", default=[0], help='NVMe drive number, drives listed are tested in parallel', metavar='#')
+parser.add_argument('--all',    default=False, action=argparse.BooleanOptionalAction, help="Test all NVMe drives in parallel")
+parser.add_argument('--volume', type=str, nargs="+", default=[DEFAULT_VOLUME], help='Volume to run fio (e.g. c:), one per drive when testing more than one drive', metavar='<dir>')
 parser.add_argument('--dir',    type=str, default='', help='Directory to log results', metavar='<dir>')
 parser.add_argument('--path',   type=str, default=NVMECMD_RESOURCES, help='Path to directory with cmd and rules subdirectories', metavar='<dir>')
 parser.add_argument('--new',    default=False, action=argparse.BooleanOptionalAction, help="Checks new-drives rules")
 parser.add_argument('--tests',  type=int, nargs="+", default=[1,2,3,4,5,6,7,8,9],  help="List of tests to run (e.g. 1 4 5 6)")
+parser.add_argument('--live',   default=False, action=argparse.BooleanOptionalAction, help="Follow the monitor during fio and abort fio on critical temperature")
+parser.add_argument('--live-rules', type=str, default='', help='With --live also abort fio when monitor samples fail these rules the fail limit times', metavar='<file>')
+parser.add_argument('--steady', default=False, action=argparse.BooleanOptionalAction, help="Tests 7 and 8 wait for thermal steady state from the live monitor instead of fixed delays")
+parser.add_argument('--adaptive', default=False, action=argparse.BooleanOptionalAction, help="Sweep tests 4, 5 and 6 sample each idle time until the latency converges and add idle times where it changes sharply")
+parser.add_argument('--reuse-target', default=True, action=argparse.BooleanOptionalAction, help="Reuse the fio target file from a prior checkout if the volume, size and fill pattern match")
+parser.add_argument('--precondition', default=False, action=argparse.BooleanOptionalAction, help="Random write the fio target until steady state before the fio tests, once for each target")
+parser.add_argument('--columns', default=False, action=argparse.BooleanOptionalAction, help="Also save monitor, admin command and sweep results as .columns files")
+parser.add_argument('--plan-cache', type=str, default=os.path.join(os.path.abspath('.'),'checkout','plan_cache'), help="Directory to cache plan steps across runs, empty string to not cache", metavar='<dir>')
+parser.add_argument('--resume', type=str, default='', help="Resume the checkout logged to this directory, steps that passed are not run again", metavar='<dir>')
+parser.add_argument('--plan',   type=str, default='', help="Run the tests in this test plan (see plan.py), relative to --path if not found", metavar='<file>')
+parser.add_argument('--db',     type=str, default=os.path.join(os.path.abspath('.'),'checkout','results.db'), help="SQLite database to save the results, empty string to not save", metavar='<file>')
 
 args = parser.parse_args()
 
-if os.path.dirname(args.volume) != args.volume:
-    print(f"Volume {args.volume} is not a legal volume.  Windows example: c:")
-    os._exit(1)
+output_options['columns'] = args.columns
+
+for volume in args.volume:
+    if os.path.dirname(volume) != volume:
+        print(f"Volume {volume} is not a legal volume.  Windows example: c:")
+        os._exit(1)
+
+if args.resume != "":
+    args.dir = args.resume
 
 if args.dir == "":   
     args.dir = os.path.join(os.path.abspath('.'), 'checkout', datetime.now().strftime("%Y%m%d_%H%M%S"))
@@ -66,6 +85,105 @@ fileHandler = logging.FileHandler(os.path.join(args.dir,'checkout.log'))
 fileHandler.setFormatter(logFormatter)
 logger.addHandler(fileHandler)
 
+#--------------------------------------------------------------------------------------------------------------------
+# Multi-drive checkout
+#
+# Each drive is tested by running this script for that drive in its own process, all drives run in parallel from
+# one asyncio loop.  Each drive logs to nvme<#> under the results directory and the results from each drive are
+# combined in drives.csv
+#--------------------------------------------------------------------------------------------------------------------
+def drive_checkout_args(drive, volume):
+
+    return [sys.executable, os.path.abspath(__file__),
+            "--nvme",f"{drive}",
+            "--volume",f"{volume}",
+            "--dir",os.path.join(args.dir, f"nvme{drive}"),
+            "--path",f"{args.path}",
+            "--new" if args.new else "--no-new",
+            "--live" if args.live else "--no-live",
+            "--live-rules",f"{args.live_rules}",
+            "--steady" if args.steady else "--no-steady",
+            "--adaptive" if args.adaptive else "--no-adaptive",
+            "--reuse-target" if args.reuse_target else "--no-reuse-target",
+            "--precondition" if args.precondition else "--no-precondition",
+            "--columns" if args.columns else "--no-columns",
+            "--plan",f"{args.plan}",
+            "--plan-cache",f"{args.plan_cache}",
+            "--resume",os.path.join(args.dir, f"nvme{drive}") if args.resume != "" else "",
+            "--db",f"{args.db}",
+            "--tests"] + [f"{number}" for number in args.tests]
+
+def drive_checkout_result(drive, volume, process_result):
+
+    drive_directory = os.path.join(args.dir, f"nvme{drive}")
+
+    try:
+        with open(os.path.join(drive_directory,"results.json")) as results_file:
+            tests = json.load(results_file)["tests"]
+    except:
+        tests = []
+
+    return {"drive": drive, "volume": volume, "code": process_result["code"], "run time": process_result["run time"],
+            "directory": drive_directory, "tests": tests, "stderr": process_result["stderr"]}
+
+if args.all:
+    args.nvme = list_nvme_drives(os.path.join(args.dir,"nvme-list"))
+    if len(args.nvme) == 0:
+        logger.error(">>>> FATAL ERROR:  No NVMe drives found")
+        os._exit(1)
+
+if len(args.nvme) > 1:
+
+    if len(args.volume) == 1:
+        args.volume = args.volume * len(args.nvme)
+
+    if len(args.volume) != len(args.nvme):
+        logger.error(f">>>> FATAL ERROR:  {len(args.volume)} volumes specified for {len(args.nvme)} drives")
+        os._exit(1)
+
+    if ((6 in args.tests) or (7 in args.tests) or (8 in args.tests)) and len(set(args.volume)) != len(args.volume):
+        logger.error(">>>> FATAL ERROR:  fio tests 6, 7 and 8 need a different volume for each drive, use --volume")
+        os._exit(1)
+
+    logger.info(f" Testing NVMe drives {' '.join(str(drive) for drive in args.nvme)} in parallel")
+    logger.info(f" Logs: {args.dir}")
+    logger.info("")
+
+    # Each drive runs on its own console so stopping the monitor of one drive does not send ctrl-c to the others
+
+    process_results = run_step_processes([(drive_checkout_args(drive,volume), args.dir) for drive,volume in zip(args.nvme,args.volume)],
+                                         new_console=True)
+    drive_results   = [drive_checkout_result(drive,volume,result) for drive,volume,result in zip(args.nvme,args.volume,process_results)]
+
+    with open(os.path.join(args.dir,"drives.csv"), mode='w', newline='') as drives_csv_file:
+        csv_writer = csv.writer(drives_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['Drive','Volume','Code','RunTime(sec)','Directory'] + [f"Test{number}" for number in args.tests])
+
+        for result in drive_results:
+            test_result = {test["number"]: test["result"] for test in result["tests"]}
+            csv_writer.writerow([result["drive"],result["volume"],result["code"],f"{result['run time']:.3f}",result["directory"]] +
+                                [test_result.get(number,"NOT RUN") for number in args.tests])
+
+    script_errors = 0
+    for result in drive_results:
+        logger.info(f"\t NVMe {result['drive']:<4} {'Passed' if result['code'] == 0 else '********  FAILED  ********':26} " +
+                    f"( Code : {result['code']} )  {result['run time']:.3f} seconds   {result['directory']}")
+        if result["code"] != 0: 
+            script_errors += 1
+            for line in result["stderr"].decode(errors='replace').splitlines()[-5:]:
+                logger.info(f"\t           {line}")
+
+    logger.info("")
+    os._exit(script_errors)
+
+args.nvme   = args.nvme[0]
+args.volume = args.volume[0]
+
+if args.db != "":
+    start_results_run(args.db, args.nvme, args.dir)
+
+start_checkpoint(args.dir, args.resume != "")
+
 #--------------------------------------------------------------------------------------------------------------------
 # Setup vars 
 #--------------------------------------------------------------------------------------------------------------------
@@ -76,6 +194,39 @@ step            = {}
 
 idle_times_ms   = [0,20,50,70,90,150,200,500,700,900,1000,1200,1500 ]
 
+#--------------------------------------------------------------------------------------------------------------------
+# Run a test plan instead of the tests below.  The steps run in the order of their dependencies, see plan.py.
+#--------------------------------------------------------------------------------------------------------------------
+if args.plan != "":
+
+    try:
+        test_plan = load_plan(args.plan if os.path.exists(args.plan) else os.path.join(args.path, args.plan))
+    except:
+        logger.exception(f">>>> FATAL ERROR:  Failed to load test plan {args.plan}")
+        os._exit(USAGE_ERROR_CODE)
+
+    plan_context = {'nvme':    args.nvme,
+                    'volume':  args.volume,
+                    'path':    args.path,
+                    'dir':     args.dir,
+                    'target':  os.path.abspath(os.path.join(args.volume,os.sep,"fio","target.bin")),
+                    'tests':   args.tests,
+                    'cache dir': args.plan_cache if args.plan_cache != "" else None,
+                    'options': {'new': args.new, 'adaptive': args.adaptive, 'reuse target': args.reuse_target,
+                                'precondition': args.precondition, 'live': args.live, 'steady': args.steady,
+                                'live rules': args.live_rules, 'windows': "Windows" == platform.system()}}
+
+    try:
+        script_errors = run_plan(test_plan, plan_context)
+    except:
+        logger.exception('ERROR:  Test plan aborted because of unhandled exception:')
+        os._exit(1)
+
+    if not args.reuse_target:
+        remove_target(plan_context['target'])
+
+    os._exit(script_errors)
+
 #--------------------------------------------------------------------------------------------------------------------
 # Start testing...
 #--------------------------------------------------------------------------------------------------------------------
@@ -104,7 +255,7 @@ try:
                         "--rules",f"{rules_file}",       # Verify features rules                     
                         "--nvme",f"{args.nvme}"]         # NVMe drive number 
 
-        step['code'] = run_step_process(nvmecmd_args, working_directory)  # run nvmecmd in directory created by start_step
+        if not step['resumed']: step['code'] = run_step_process(nvmecmd_args, working_directory)  # run nvmecmd in directory created by start_step
 
         log_report(ref_info_file,args.nvme,False)                         # Display the report on the NVMe drive being tested
         test['errors'] += end_step(step) 
@@ -125,7 +276,7 @@ try:
                             "--rules",f"{rules_file}",       # Verify new drive rules                     
                             "--nvme",f"{args.nvme}"]         # NVMe drive number 
 
-            step['code'] = run_step_process(nvmecmd_args, working_directory)    # run process in directory created by start_step
+            if not step['resumed']: step['code'] = run_step_process(nvmecmd_args, working_directory)    # run process in directory created by start_step
             test['errors'] += end_step(step)    
         
         script_errors += end_test(test)     
@@ -155,10 +306,10 @@ try:
                         "--dir",f"{working_directory}",  # log to the directory created by start_step
                         "--nvme",f"{args.nvme}"]         # NVMe drive number 
 
-        step['code'] = run_step_process(nvmecmd_args, working_directory)
+        if not step['resumed']: step['code'] = run_step_process(nvmecmd_args, working_directory)
         test['errors'] += end_step(step) 
     
-        if ("Windows" == platform.system()):
+        if ("Windows" == platform.system()) and not step['resumed']:
             logger.info("\t\tWaiting 10 minutes for Windows workaround")
             logger.info("")
             time.sleep(600)
@@ -176,7 +327,7 @@ try:
                         "--extended",                    # run the extended self-test                        
                         "--nvme",f"{args.nvme}"]         # NVMe drive number
 
-        step['code'] = run_step_process(nvmecmd_args, working_directory)
+        if not step['resumed']: step['code'] = run_step_process(nvmecmd_args, working_directory)
         test['errors'] += end_step(step) 
         script_errors += end_test(test)     
         #-------------------------------------------------------------------
@@ -210,14 +361,14 @@ try:
                         "--interval","500",              # set interval in mS                                          
                         "--nvme",f"{args.nvme}"]         # NVMe drive number.  e.g. 0 for nvme0 or physicaldrive0
 
-        step['code'] = run_step_process(nvmecmd_args, working_directory)
+        if not step['resumed']: step['code'] = run_step_process(nvmecmd_args, working_directory)
         test['errors'] += end_step(step) 
         #-------------------------------------------------------------------
         # Parse the data on the admin commands
         #-------------------------------------------------------------------
         step  = start_step("Log-Admin-Times",test)
         csv_path = os.path.join(step['directory'],"admin_commands.csv")
-        step['code'] =  parse_admin_commands( summary_file, csv_path) 
+        if not step['resumed']: step['code'] = parse_admin_commands( summary_file, csv_path) 
         test['errors'] += end_step(step) 
 
         script_errors += end_test(test) 
@@ -231,34 +382,8 @@ try:
         step = start_step("Read",test)
         logger.info("")
 
-        with open(os.path.join(f"{step['directory']}","logpage2_sweep.csv"), mode='w', newline='') as results_csv_file:
-
-            csv_writer = csv.writer(results_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            csv_writer.writerow(['Idle(ms)','Avg(ms)','Min(ms)','Max(ms)','Count'])
-
-            for interval in idle_times_ms:
-
-                working_directory = os.path.join(f"{step['directory']}",f"{interval}mS")
-                os.makedirs(working_directory) 
-                cmd_file          = os.path.join(cmd_directory,f"logpage02.cmd.json")  
-                summary_file      = os.path.join(working_directory,"read.summary.json")
-                csv_path          = os.path.join( working_directory, "admin_commands.csv")
-
-                if interval > 999: sample = 100
-                else: sample = 200
-
-                nvmecmd_args =  [NVMECMD,                        # path to nvmecmd executable defined in lib
-                                f"{cmd_file}",                   # cmd file to read the NVMe information   
-                                "--samples",f"{sample}",  
-                                "--interval",f"{interval}",      # set interval in mS
-                                "--dir",f"{working_directory}",  # log to the directory created by start_step                  
-                                "--nvme",f"{args.nvme}"]         # NVMe drive number 
-
-                step['code'] += run_step_process(nvmecmd_args, working_directory) 
-                avg_ms, min_ms, max_ms, count = get_admin_command("Get Log Page 2", summary_file, csv_path, 2) 
-                interval_name = f"Idle {interval}mS then read log page"
-                logger.info(f"\t    {interval_name:35} Avg: {avg_ms:6.2f}mS    Min: {min_ms:6.2f}mS    Max: {max_ms:6.2f}mS      Count: {count:6}")
-                csv_writer.writerow([f"{interval}",f"{avg_ms}",f"{min_ms}",f"{max_ms}",f"{count}"])
+        cmd_file = os.path.join(cmd_directory,f"logpage02.cmd.json")  
+        if not step['resumed']: run_admin_sweep(step, args.nvme, cmd_file, "Get Log Page 2", idle_times_ms, "logpage2_sweep.csv", args.adaptive)
 
         logger.info("")
 
@@ -269,43 +394,17 @@ try:
     #################################################################################################################
     if 5 in args.tests:
 
-            test = start_test(5,"LogPage03-Sweep",args.dir)
-            step = start_step("Read",test)
-            logger.info("")
-
-            with open(os.path.join(f"{step['directory']}","logpage3_sweep.csv"), mode='w', newline='') as results_csv_file:
-
-                csv_writer = csv.writer(results_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-                csv_writer.writerow(['Idle(ms)','Avg(ms)','Min(ms)','Max(ms)','Count'])
-
-                for interval in idle_times_ms:
-
-                    working_directory = os.path.join(f"{step['directory']}",f"{interval}mS")
-                    os.makedirs(working_directory) 
-                    cmd_file          = os.path.join(cmd_directory,f"logpage03.cmd.json")  
-                    summary_file      = os.path.join(working_directory,"read.summary.json")
-                    csv_path          = os.path.join( working_directory, "admin_commands.csv")
-
-                    if interval > 999: sample = 100
-                    else: sample = 200
-
-                    nvmecmd_args =  [NVMECMD,                        # path to nvmecmd executable defined in lib
-                                    f"{cmd_file}",                   # cmd file to read the NVMe information   
-                                    "--samples",f"{sample}",         
-                                    "--interval",f"{interval}",      # set interval in mS
-                                    "--dir",f"{working_directory}",  # log to the directory created by start_step                  
-                                    "--nvme",f"{args.nvme}"]         # NVMe drive number 
+        test = start_test(5,"LogPage03-Sweep",args.dir)
+        step = start_step("Read",test)
+        logger.info("")
 
-                    step['code'] += run_step_process(nvmecmd_args, working_directory) 
-                    avg_ms, min_ms, max_ms, count = get_admin_command("Get Log Page 3", summary_file, csv_path, 2) 
-                    interval_name = f"Idle {interval}mS then read log page"
-                    logger.info(f"\t    {interval_name:35} Avg: {avg_ms:6.2f}mS    Min: {min_ms:6.2f}mS    Max: {max_ms:6.2f}mS      Count: {count:6}")
-                    csv_writer.writerow([f"{interval}",f"{avg_ms}",f"{min_ms}",f"{max_ms}",f"{count}"])
+        cmd_file = os.path.join(cmd_directory,f"logpage03.cmd.json")  
+        if not step['resumed']: run_admin_sweep(step, args.nvme, cmd_file, "Get Log Page 3", idle_times_ms, "logpage3_sweep.csv", args.adaptive)
 
-            logger.info("")
+        logger.info("")
 
-            test['errors'] += end_step(step)
-            script_errors +=  end_test(test) 
+        test['errors'] += end_step(step)
+        script_errors +=  end_test(test) 
  
     #################################################################################################################
     #  Setup fio target file if using fio
@@ -316,16 +415,11 @@ try:
         fio_target_file = temp_fio_target_file.replace(":",r"\:")
 
         working_directory = os.path.join(args.dir,'fio_setup')
-        os.makedirs(working_directory)
-
-        try: 
-            os.remove(temp_fio_target_file)
-        except: 
-            pass
+        os.makedirs(working_directory, exist_ok=True)
 
-        fio_startup_delay = 420                         # delay in seconds before starting fio after monitor to get baseline
+        fio_startup_delay = 420                         # delay in seconds before starting fio after monitor to get baseline, most with --steady
         fio_size          = '16g'                       # file size
-        fio_end_delay     = 420                         # delay to wait after fio completes, allows drive to cool down
+        fio_end_delay     = 420                         # delay to wait after fio completes, allows drive to cool down, most with --steady
         fio_runtime       = 720                         # time in seconds to run fio
 
         fio_rand_block_sizes   = ['4k']                 # block sizes for fio
@@ -338,20 +432,8 @@ try:
         fio_seq_threads       = 2                       # number of threads for fio
         fio_seq_depth         = 64                      # queue depth
 
-        fio_base_args = [FIO,                             # path to fio executable
-                        "--name=fio-setup",               # name for job
-                        f"--ioengine={FIO_ASYNC_IO}",     # asynchronous IO engine (Window/Linux are different)
-                        "--direct=1",                     # non-buffered IO
-                        "--numjobs=1",                    # Number of threads
-                        "--thread",                       # Generate threads 
-                        "--rw=write",                     # Access seq for speed 
-                        "--iodepth=32",                   # Big queue depth for speed
-                        "--bs=1024k",                     # Big block size for speed
-                        "--output-format=json",           # Use json output so easy to read and parse later
-                        f"--filename={fio_target_file}",  # use one file so generated only once
-                        f"--size={fio_size}"]             # size of data
-        
-        setup_result = run_step_process(fio_base_args, working_directory,300)
+        setup_result = prepare_fio_target(temp_fio_target_file, args.volume, fio_size, working_directory,
+                                          reuse=args.reuse_target, precondition=args.precondition)
         #-------------------------------------------------------------------
         # If test failed abort so can update the cmd/rules if needed
         #-------------------------------------------------------------------
@@ -360,62 +442,15 @@ try:
     #################################################################################################################
     #  Test - Random Read Sweep
     #################################################################################################################
-    if 6 in args.tests:    
+    if 6 in args.tests and not test_resumed(6,"Random Read Sweep",args.dir):    
             
-        test = start_test(6,"Random Read Sweep",args.dir)
+        test = start_test(6,"Random Read Sweep",args.dir,resume_steps=False)
         step = start_step("Read",test)
 
-        fio_base_args = [FIO,                             # path to fio executable
-                        "--name=fio-burst",               # name for job
-                        f"--ioengine={FIO_ASYNC_IO}",     # asynchronous IO engine (Window/Linux are different)
-                        "--direct=1",                     # non-buffered IO
-                        "--numjobs=1",                    # Number of threads
-                        "--thread",                       # Generate threads 
-                        "--rw=randread",                  # Access randomly 
-                        "--iodepth=1",                    # IO or queue depth
-                        "--thinktime_blocks=1",           # read one block then wait
-                        "--bs=4k",                        # one 4K block 
-                        "--runtime=180",                  # run time in seconds
-                        "--time_based",                   # run time specified
-                        "--output-format=json",           # Use json output so easy to read and parse later
-                        f"--filename={fio_target_file}",  # use one file so generated only once
-                        f"--size={fio_size}"]   
-
-        # log summary in a csv file and fio files in subdirectories named after interval time
-
-        with open(os.path.join(f"{step['directory']}","random_read_sweep.csv"), mode='w', newline='') as results_csv_file:
-
-            csv_writer = csv.writer(results_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            csv_writer.writerow(['Idle(ms)','Avg(ms)','Min(ms)','Max(ms)','Count'])
-
-            for interval in idle_times_ms:
-
-                working_directory = os.path.join(f"{step['directory']}",f"{interval}mS")
-                os.makedirs(working_directory) 
-        
-                if interval == 0: thinktime_us = 1
-                else: thinktime_us = interval * 1000
-
-                fio_args = fio_base_args.copy()                    
-
-                fio_args.append(f"--output={working_directory}\\fio.json")  
-                fio_args.append(f"--thinktime={thinktime_us}")      
-
-                test['errors']  += run_step_process(fio_args, working_directory, 240)
-
-                ref_file = open(f"{working_directory}\\fio.json") 
-                json_fio = json.load(ref_file) 
-                ref_file.close() 
+        fio_sweep_runtime = 180                         # time in seconds to run fio for each idle time
+        fio_batch_runtime = 30                          # time in seconds of each fio run for the adaptive sweep
 
-                min_ms = float(json_fio['jobs'][0]['read']['lat_ns']['min'])/NS_IN_MS 
-                max_ms = float(json_fio['jobs'][0]['read']['lat_ns']['max'])/NS_IN_MS 
-                avg_ms = float(json_fio['jobs'][0]['read']['lat_ns']['mean'])/NS_IN_MS 
-                count  = int(json_fio['jobs'][0]['read']['lat_ns']['N'])
-
-                interval_name = f"Idle {interval}mS then random 4k read"
-            
-                logger.info(f"\t    {interval_name:40} Avg: {avg_ms:6.2f}mS    Min: {min_ms:6.2f}mS    Max: {max_ms:6.2f}mS      Count: {count:6}")
-                csv_writer.writerow([f"{interval}",f"{avg_ms}",f"{min_ms}",f"{max_ms}",f"{count}"])
+        run_random_read_sweep(step, temp_fio_target_file, fio_size, idle_times_ms, args.adaptive, fio_sweep_runtime, fio_batch_runtime)
 
         logger.info("")
 
@@ -424,38 +459,21 @@ try:
     #################################################################################################################
     #  Test - Random Performance, single burst, fast monitor
     #################################################################################################################
-    if 7 in args.tests: 
+    if 7 in args.tests and not test_resumed(7,"Random-Peformance-Monitor",args.dir): 
             
-        test = start_test(7,"Random-Peformance-Monitor",args.dir)
+        test = start_test(7,"Random-Peformance-Monitor",args.dir,resume_steps=False)
 
         #-------------------------------------------------------------------
         # Step 1: Start nvmecmd and let run until done 
         #-------------------------------------------------------------------
         step = start_step("Start-Monitor",test)
 
-        working_directory = monitor_directory = f"{step['directory']}"
-        cmd_file          = os.path.join(cmd_directory,'logpage02.cmd.json')
-        summary_file      = os.path.join(working_directory,"read.summary.json")
-
-        nvmecmd_args =  [NVMECMD,                         # path to nvmecmd executable defined in lib
-                        f"{cmd_file}",                    # cmd file to read log page 2 every few seconds until ctrl-c sent to app
-                        "--dir",f"{working_directory}",   # run in the working directory
-                        "--samples","1000000",            # set number of samples to read
-                        "--interval","2000",              # set interval in mS                         
-                        "--nvme",f"{args.nvme}"]          # NVMe drive number.  e.g. 0 for nvme0 or physicaldrive0
+        cmd_file     = os.path.join(cmd_directory,'logpage02.live.cmd.json' if (args.live or args.steady) else 'logpage02.cmd.json')
+        summary_file = os.path.join(step['directory'],"read.summary.json")
+        monitor      = start_monitor(step['directory'], args.nvme, cmd_file, fio_startup_delay, args.steady)
 
-        nvmecmd_process, nvmecmd_start_time = start_step_process(nvmecmd_args, working_directory)
-
-        if nvmecmd_process == None:
-            logger.error('>>>> FATAL ERROR: nvmecmd failed to start.  Verify nvmecmd installed correctly')
-            os._exit(TEST_CASE_EXCEPTION)  
-
-        try:
-            nvmecmd_process.wait(fio_startup_delay)
-            logger.error('>>>> FATAL ERROR: Test aborted because nvmecmd exited.  Verify NVMe drive number is correct')
-            os._exit(TEST_CASE_EXCEPTION)    
-        except subprocess.TimeoutExpired:
-            pass
+        if monitor == None:
+            os._exit(TEST_CASE_EXCEPTION)
 
         test['errors'] += end_step(step)
         #-------------------------------------------------------------------
@@ -489,15 +507,17 @@ try:
                 fio_args.append(f"--bs={block_size}")                       # set block size
                 fio_file_paths.append(f"{working_directory}\\fio.json")     # track log file for later use
 
-                test['errors']    += run_step_process(fio_args, working_directory,(fio_runtime + 300))
-                time.sleep(fio_end_delay)
+                record_target_workload(temp_fio_target_file, fio_args)
+
+                abort_check = live_abort_check(cmd_file, args.live_rules) if args.live else None
+                test['errors'] += run_monitored_fio(fio_args, working_directory, monitor, (fio_runtime + 300), fio_end_delay, abort_check, args.steady)
 
             test['errors'] += end_step(step)
         #-------------------------------------------------------------------
         # Signal nvmecmd to finish to stop monitoring
         #-------------------------------------------------------------------
         step = start_step("Stop-Monitor",test)
-        step['code'] =  stop_monitor(monitor_directory, nvmecmd_process)
+        step['code'] =  stop_monitor(monitor['directory'], monitor['process'])
         test['errors'] += end_step(step)
 
         #-------------------------------------------------------------------
@@ -512,45 +532,28 @@ try:
         # Parse the fio data
         #-------------------------------------------------------------------
         step  = start_step("Parse-Fio",test)
-        step['code'] =  parse_fio_data(fio_file_paths,temp_fio_target_file)
+        step['code'] =  parse_fio_data(fio_file_paths,temp_fio_target_file,os.path.join(step['directory'],"fio.csv"))
         test['errors'] += end_step(step)
         script_errors += end_test(test) 
 
     #################################################################################################################
     #  Test - Sequential Performance, single burst, fast monitor
     #################################################################################################################
-    if 8 in args.tests:  
+    if 8 in args.tests and not test_resumed(8,"Sequential-Peformance-Monitor",args.dir):  
             
-        test = start_test(8,"Sequential-Peformance-Monitor",args.dir)
+        test = start_test(8,"Sequential-Peformance-Monitor",args.dir,resume_steps=False)
 
         #-------------------------------------------------------------------
         # Step 1: Start nvmecmd and let run until done 
         #-------------------------------------------------------------------
         step = start_step("Start-Monitor",test)
 
-        working_directory = monitor_directory = f"{step['directory']}"
-        cmd_file          = os.path.join(cmd_directory,'logpage02.cmd.json')
-        summary_file      = os.path.join(working_directory,"read.summary.json")
+        cmd_file     = os.path.join(cmd_directory,'logpage02.live.cmd.json' if (args.live or args.steady) else 'logpage02.cmd.json')
+        summary_file = os.path.join(step['directory'],"read.summary.json")
+        monitor      = start_monitor(step['directory'], args.nvme, cmd_file, fio_startup_delay, args.steady)
 
-        nvmecmd_args =  [NVMECMD,                         # path to nvmecmd executable defined in lib
-                        f"{cmd_file}",                    # cmd file to read log page 2 every few seconds until ctrl-c sent to app
-                        "--dir",f"{working_directory}",   # run in the working directory
-                        "--samples","1000000",            # set number of samples to read
-                        "--interval","2000",              # set interval in mS                          
-                        "--nvme",f"{args.nvme}"]          # NVMe drive number.  e.g. 0 for nvme0 or physicaldrive0
-
-        nvmecmd_process, nvmecmd_start_time = start_step_process(nvmecmd_args, working_directory)
-
-        if nvmecmd_process == None:
-            logger.error('>>>> FATAL ERROR: nvmecmd failed to start.  Verify nvmecmd installed correctly')
-            os._exit(TEST_CASE_EXCEPTION)  
-
-        try:
-            nvmecmd_process.wait(fio_startup_delay)
-            logger.error('>>>> FATAL ERROR: Test aborted because nvmecmd exited.  Verify NVMe drive number is correct')
-            os._exit(TEST_CASE_EXCEPTION)    
-        except subprocess.TimeoutExpired:
-            pass
+        if monitor == None:
+            os._exit(TEST_CASE_EXCEPTION)
 
         test['errors'] += end_step(step)
         #-------------------------------------------------------------------
@@ -585,15 +588,17 @@ try:
 
                 fio_file_paths.append(f"{working_directory}\\fio.json")     # track log file for later use
 
-                test['errors']    += run_step_process(fio_args, working_directory,(fio_runtime + 300))
-                time.sleep(fio_end_delay)
+                record_target_workload(temp_fio_target_file, fio_args)
+
+                abort_check = live_abort_check(cmd_file, args.live_rules) if args.live else None
+                test['errors'] += run_monitored_fio(fio_args, working_directory, monitor, (fio_runtime + 300), fio_end_delay, abort_check, args.steady)
 
                 test['errors'] += end_step(step)
         #-------------------------------------------------------------------
         # Signal nvmecmd to finish to stop monitoring
         #-------------------------------------------------------------------
         step = start_step("Stop-Monitor",test)
-        step['code'] =  stop_monitor(monitor_directory, nvmecmd_process)
+        step['code'] =  stop_monitor(monitor['directory'], monitor['process'])
         test['errors'] += end_step(step)
 
         #-------------------------------------------------------------------
@@ -610,7 +615,7 @@ try:
         #-------------------------------------------------------------------
         step  = start_step("Parse-Fio",test)
 
-        step['code'] =  parse_fio_data(fio_file_paths,temp_fio_target_file)
+        step['code'] =  parse_fio_data(fio_file_paths,temp_fio_target_file,os.path.join(step['directory'],"fio.csv"))
 
         test['errors'] += end_step(step)
         script_errors += end_test(test) 
@@ -620,7 +625,7 @@ try:
     #################################################################################################################
     if 9 in args.tests:
 
-        test = start_test(9,"Nvme-Compare-Times",args.dir)
+        test = start_test(9,"Nvme-Compare-Times",args.dir,resume_steps=False)        # always reads the drive info at the end
 
         #-------------------------------------------------------------------
         # Step 1: Get latest information
@@ -636,21 +641,22 @@ try:
                         "--dir",f"{working_directory}",  # log to the directory created by start_step                  
                         "--nvme",f"{args.nvme}"]         # NVMe drive number 
 
-        step['code'] = run_step_process(nvmecmd_args, step['directory'])    # run process in directory created by start_step
+        if not step['resumed']: step['code'] = run_step_process(nvmecmd_args, step['directory'])    # run process in directory created by start_step
         test['errors'] += end_step(step)   
         #-------------------------------------------------------------------
         # Step 2: Compare date and times against the reference
         #-------------------------------------------------------------------
         step  = start_step("Compare-Time",test)
         
-        step['code'] = compare_time(ref_info_file, last_info_file)          # this function defined in test.py
+        if not step['resumed']: step['code'] = compare_time(ref_info_file, last_info_file)          # this function defined in test.py
         test['errors'] += end_step(step)
         script_errors +=  end_test(test)
     #################################################################################################################
-    # Exit the script
+    # Exit the script, the fio target is kept for the next checkout unless --no-reuse-target
     ################################################################################################################# 
-    try:    os.remove(temp_fio_target_file)
-    except: pass
+    if not args.reuse_target:
+        try:    remove_target(temp_fio_target_file)
+        except: pass
 
     os._exit(script_errors)
 
@@ -0,0 +1,281 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions for saving results as typed columns in one binary file (.columns) and reading them back
+#
+#  Long monitor runs write hundreds of thousands of rows to monitor.csv and admin_commands.csv, each number formatted
+#  as text.  A columns file stores each column as one typed array after a small json header.  Integers are stored in
+#  the fewest bytes that hold them, decimals such as 'Data Read' as integers of their fixed number of places, and
+#  increasing values such as timestamps and counters as the difference from the prior row.  Text columns that repeat
+#  a few values, such as the admin command name, are stored as integer codes with the values listed in the header.
+#  A monitor.columns file is about 5 times smaller than monitor.csv.  Columns that are stored as is are read back with
+#  mmap without decoding, the others are decoded once when first used.
+#
+#  File layout:   MAGIC, header length (uint32 little endian), json header, then each column 8 byte aligned
+#
+#  Example:   with ColumnsFile("monitor.columns") as columns:
+#                 start,stop = columns.time_range(timestamp_ns("2021-10-01 10:00:00.000"), None)
+#                 temperature = columns.column('temperature', start, stop)
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import os,sys,json,mmap,math,struct,bisect
+from array import array
+from itertools import accumulate
+
+MAGIC             = b'NVMECOL1'
+COLUMNS_EXTENSION = ".columns"
+ALIGNMENT         = 8
+
+# Column types:
+#
+#   'q'    integer, stored divided by the common factor of the values in the smallest integer type that holds them
+#   'd'    8 byte float
+#   'f'    4 byte float
+#   's'    text, stored as integer codes
+#   'pN'   decimal with N places, e.g. 'p3' for 2.629, stored as the integer value * 10**N
+#   't'    increasing integer such as a timestamp or counter, stored as the difference from the prior row
+#   'tN'   increasing decimal with N places, stored as the difference from the prior row
+
+COLUMN_TYPES      = ['q', 'd', 'f', 's', 'p', 't']
+FLOAT_TYPES       = ['d', 'f']
+INTEGER_TYPECODES = ['b', 'h', 'i', 'q']
+
+def column_kind(column_type):
+    # 'p3' -> ('p', 3)
+    kind,places = column_type[:1], column_type[1:]
+    if kind not in COLUMN_TYPES or (places and (kind not in ['p','t'] or not places.isdigit())):
+        raise ValueError(f"Column type {column_type} is not valid")
+    return kind, int(places or 0)
+
+def narrow_integers(values):
+
+    # Returns the values divided by their common factor, in the smallest typecode that holds them, and the factor
+
+    unit = math.gcd(*values) or 1
+    if unit != 1: values = [value // unit for value in values]
+
+    low,high = (min(values), max(values)) if len(values) else (0, 0)
+    for typecode in INTEGER_TYPECODES:
+        limit = 2 ** (8 * array(typecode).itemsize - 1)
+        if -limit <= low and high < limit: break
+
+    return array(typecode, values), unit
+
+def columns_path(csv_path):
+    # admin_commands.csv -> admin_commands.columns
+    return os.path.splitext(csv_path)[0] + COLUMNS_EXTENSION
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Write a columns file
+#
+#  columns is a list of (name, type, values).  All columns must have the same number of rows.  attributes is saved in
+#  the header as is, e.g. the monitor sample rate.
+#--------------------------------------------------------------------------------------------------------------------
+def write_columns(file_path, columns, attributes=None):
+
+    rows = len(columns[0][2]) if len(columns) else 0
+
+    header = {'rows': rows, 'attributes': attributes or {}, 'columns': []}
+    data   = []
+
+    for name,column_type,values in columns:
+        if len(values) != rows:
+            raise ValueError(f"Column {name} has {len(values)} rows, expected {rows}")
+
+        entry      = {'name': name, 'type': column_type}
+        kind,places = column_kind(column_type)
+
+        if kind in FLOAT_TYPES:
+            if not isinstance(values, array) or values.typecode != kind: values = array(kind, values)
+        else:
+            if kind == 's':
+                codes = {}
+                values = [codes.setdefault(value, len(codes)) for value in values]
+                entry['values'] = list(codes)
+            elif places:
+                scale  = 10 ** places
+                values = [round(value * scale) for value in values]
+            else:
+                values = [int(value) for value in values]
+
+            if kind == 't':
+                entry['first'] = values[0] if rows else 0
+                values = [0] + [value - prior for prior,value in zip(values, values[1:])] if rows else []
+
+            values,unit = narrow_integers(values)
+            if unit != 1: entry['unit'] = unit
+
+        entry['storage'] = values.typecode
+
+        if sys.byteorder != 'little':
+            values = array(values.typecode, values)
+            values.byteswap()
+
+        header['columns'].append(entry)
+        data.append(values)
+
+    # Column offsets depend on the header length, the data start is moved past the header until it fits
+
+    data_start = 0
+    while True:
+        offset = data_start
+        for entry,values in zip(header['columns'], data):
+            entry['offset'] = offset
+            offset += len(values) * values.itemsize
+
+        header_bytes = json.dumps(header).encode()
+        header_end   = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+        if header_end <= data_start: break
+        data_start = header_end
+
+    with open(file_path, 'wb') as columns_file:
+        columns_file.write(MAGIC)
+        columns_file.write(struct.pack('<I', len(header_bytes)))
+        columns_file.write(header_bytes)
+        columns_file.write(b'\0' * (data_start - len(MAGIC) - 4 - len(header_bytes)))
+        for values in data:
+            values.tofile(columns_file)
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Read a columns file
+#
+#  The file is memory mapped and columns stored as is are returned as memoryviews into the map, so only the rows used
+#  are read from disk.  Views must not be used after the file is closed.  Delta, decimal and scaled columns are decoded
+#  to arrays the first time they are used.  Text columns are decoded to lists of strings.
+#--------------------------------------------------------------------------------------------------------------------
+class ColumnsFile:
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file     = open(file_path, 'rb')
+
+        try:
+            magic = self._file.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{file_path} is not a columns file")
+
+            header_length, = struct.unpack('<I', self._file.read(4))
+            header = json.loads(self._file.read(header_length))
+
+            self.rows       = header['rows']
+            self.attributes = header['attributes']
+            self._columns   = {entry['name']: entry for entry in header['columns']}
+            self._map       = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.rows else None
+            self._views     = []
+            self._decoded   = {}
+        except:
+            self._file.close()
+            raise
+
+    @property
+    def names(self):
+        return list(self._columns)
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in self._views: view.release()
+        self._views   = []
+        self._decoded = {}
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass                            # a caller still holds a column, the map closes when it is freed
+        self._map = None
+        self._file.close()
+
+    def _view(self, name):
+        entry    = self._columns[name]
+        typecode = entry['storage']
+        if self.rows == 0: return array(typecode)
+
+        stop = entry['offset'] + self.rows * array(typecode).itemsize
+
+        if sys.byteorder != 'little':
+            values = array(typecode)
+            values.frombytes(self._map[entry['offset']:stop])
+            values.byteswap()
+            return values
+
+        view = memoryview(self._map)[entry['offset']:stop].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _values(self, name):
+
+        # Stored values, or the decoded values for delta, decimal and scaled columns
+
+        entry       = self._columns[name]
+        kind,places = column_kind(entry['type'])
+        unit        = entry.get('unit', 1)
+
+        if kind in FLOAT_TYPES or (kind in ['q','s'] and unit == 1): return self._view(name)
+
+        if name not in self._decoded:
+            if kind == 't':
+                first  = entry['first']
+                values = (first + total * unit for total in accumulate(self._view(name)))
+            else:
+                values = (value * unit for value in self._view(name))
+
+            if places:
+                scale  = 10 ** places
+                values = array('d', (value / scale for value in values))
+            else:
+                values = array('q', values)
+            self._decoded[name] = values
+
+        return self._decoded[name]
+
+    def column(self, name, start=0, stop=None):
+
+        values = self._values(name)[start:stop]
+
+        entry = self._columns[name]
+        if entry['type'] == 's':
+            return [entry['values'][code] for code in values]
+        return values
+
+    def read(self, start=0, stop=None, names=None):
+        # Returns column name -> values for rows start to stop
+        return {name: self.column(name, start, stop) for name in (names or self.names)}
+
+    def time_range(self, start_ns=None, stop_ns=None, name='timestamp'):
+        # Rows with start_ns <= time < stop_ns found by binary search, the time column must be in increasing order
+
+        times = self._values(name)
+        start = 0 if start_ns is None else bisect.bisect_left(times, start_ns)
+        stop  = len(times) if stop_ns is None else bisect.bisect_left(times, stop_ns, start)
+        return start, stop
+
+def read_columns(file_path, start=0, stop=None, names=None):
+
+    # Copies the rows into lists, for callers that don't keep the file open
+
+    with ColumnsFile(file_path) as columns:
+        return {name: list(values) for name,values in columns.read(start, stop, names).items()}
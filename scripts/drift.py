@@ -0,0 +1,208 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions that measure drive clock drift over a series of nvme.info.json snapshots
+#
+#  Same comparison as compare_time but for any number of snapshots from any number of drives at once.  Snapshots
+#  are grouped by serial number and ordered by host timestamp, then the host and drive timestamp changes between
+#  each pair of snapshots are calculated with numpy for all drives together.  Pairs where the drive has no timestamp,
+#  the timestamp origin changed or the timestamp stopped are not used for drift.  As in compare_time the drift is the
+#  Host Delta, host change minus drive change, so a drive clock that runs slow has a positive Host Delta.  Requires
+#  numpy, which is not needed by the other scripts.
+#
+#  Command line example:   python drift.py checkout/*/Test*/*/nvme.info.json --csv drift.csv
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import sys,argparse,logging,csv
+import numpy as np
+from nvmeinfo import NvmeInfo
+
+logger = logging.getLogger('nvme_logger')
+
+MS_IN_HR = 60*60*1000
+
+DRIFT_CSV_HEADER = ['Serial','Model','Snapshots','HostChange(hrs)','DriveChange(hrs)','HostDelta(ms)','HostDelta(ppm)',
+                    'MaxOffset(ms)','StoppedEvents','OriginChanges','PowerOnHoursChange','PowerOnHoursError(hrs)']
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Read the timestamps from the snapshots into flat arrays, one entry per snapshot
+#--------------------------------------------------------------------------------------------------------------------
+def read_snapshot(info_file):
+
+    info = NvmeInfo(info_file)
+
+    snapshot = {'serial':  info['Serial Number (SN)'].strip(),
+                'model':   info['Model Number (MN)'].strip(),
+                'host':    info.number('Host Timestamp'),
+                'poh':     info.number('Power On Hours'),
+                'drive':   np.nan,
+                'origin':  -1,
+                'stopped': False}
+
+    if info.get('Timestamp Feature') == "Supported":
+        snapshot['drive']   = info.number('Timestamp')
+        snapshot['origin']  = 1 if info['Timestamp Origin'] == "Host Programmed" else 0
+        snapshot['stopped'] = info.get('Timestamp Stopped', "No") not in ("No","False")
+
+    return snapshot
+
+def read_snapshots(info_files):
+
+    snapshots = []
+    for info_file in info_files:
+        try:
+            snapshots.append(read_snapshot(info_file))
+        except Exception as e:
+            logger.error(f"Failed to read {info_file} with exception: {e}")
+
+    serials = sorted(set(snapshot['serial'] for snapshot in snapshots))
+    drive_index = {serial: index for index,serial in enumerate(serials)}
+
+    columns = {'drive_index': np.array([drive_index[snapshot['serial']] for snapshot in snapshots], dtype=np.int64),
+               'host':        np.array([snapshot['host'] for snapshot in snapshots], dtype=np.float64),
+               'drive':       np.array([snapshot['drive'] for snapshot in snapshots], dtype=np.float64),
+               'origin':      np.array([snapshot['origin'] for snapshot in snapshots], dtype=np.int64),
+               'stopped':     np.array([snapshot['stopped'] for snapshot in snapshots], dtype=bool),
+               'poh':         np.array([snapshot['poh'] for snapshot in snapshots], dtype=np.float64)}
+
+    models = {}
+    for snapshot in snapshots: models.setdefault(snapshot['serial'], snapshot['model'])
+
+    return serials, [models[serial] for serial in serials], columns
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Drift of every drive at once
+#
+#  Snapshots are sorted by drive then host time.  A pair is two snapshots in a row from the same drive.  Per-pair
+#  values are summed per drive with bincount.
+#--------------------------------------------------------------------------------------------------------------------
+def analyze_drift(serials, models, columns):
+
+    drives = len(serials)
+    order  = np.lexsort((columns['host'], columns['drive_index']))
+    c      = {name: values[order] for name,values in columns.items()}
+    index  = c['drive_index']
+
+    same_drive  = index[1:] == index[:-1]
+    pair_drive  = index[1:]
+    host_delta  = np.diff(c['host'])
+    drive_delta = np.diff(c['drive'])
+
+    # Drift pairs need a drive timestamp at both ends, the same origin and a timestamp that did not stop.  The
+    # timestamp stopped if either snapshot reports it or the drive timestamp did not move while the host time did.
+
+    origin_kept = (c['origin'][1:] == c['origin'][:-1])
+    timed       = same_drive & origin_kept & (c['origin'][1:] >= 0)
+    not_moving  = timed & (drive_delta <= 0) & (host_delta > 0)
+    valid       = timed & ~not_moving & ~c['stopped'][1:] & ~c['stopped'][:-1]
+
+    drift            = np.where(valid, host_delta - drive_delta, 0.0)
+    drift_ms         = np.bincount(pair_drive, weights=drift, minlength=drives)
+    drift_host_ms    = np.bincount(pair_drive, weights=np.where(valid, host_delta, 0.0), minlength=drives)
+    drive_change_ms  = np.bincount(pair_drive, weights=np.where(valid, drive_delta, 0.0), minlength=drives)
+    origin_changes   = np.bincount(pair_drive, weights=(same_drive & ~origin_kept), minlength=drives)
+
+    # A stopped event is a snapshot reporting stopped, or a drive timestamp that did not move, after one that did not
+
+    stopped          = c['stopped'].copy()
+    stopped[1:]     |= not_moving
+    started_stopping = stopped.copy()
+    started_stopping[1:] &= ~(stopped[:-1] & same_drive)
+    stopped_events   = np.bincount(index, weights=started_stopping, minlength=drives)
+
+    # Offset of drive from host is only meaningful when the host programmed the drive timestamp
+
+    offset           = np.where(c['origin'] == 1, np.abs(c['drive'] - c['host']), 0.0)
+    max_offset       = np.zeros(drives)
+    np.maximum.at(max_offset, index, offset)
+
+    # First and last snapshot of each drive
+
+    snapshots        = np.bincount(index, minlength=drives)
+    last             = np.cumsum(snapshots) - 1
+    first            = last - snapshots + 1
+    present          = snapshots > 0
+
+    host_change_ms   = np.zeros(drives)
+    poh_change       = np.zeros(drives)
+    host_change_ms[present] = c['host'][last[present]] - c['host'][first[present]]
+    poh_change[present]     = c['poh'][last[present]] - c['poh'][first[present]]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drift_ppm = np.where(drift_host_ms > 0, drift_ms / drift_host_ms * 1e6, np.nan)
+
+    return [{'serial':           serials[drive],
+             'model':            models[drive],
+             'snapshots':        int(snapshots[drive]),
+             'host hours':       float(host_change_ms[drive] / MS_IN_HR),
+             'drive hours':      float(drive_change_ms[drive] / MS_IN_HR),
+             'host delta ms':    float(drift_ms[drive]),
+             'host delta ppm':   float(drift_ppm[drive]),
+             'max offset ms':    float(max_offset[drive]),
+             'stopped events':   int(stopped_events[drive]),
+             'origin changes':   int(origin_changes[drive]),
+             'poh change':       float(poh_change[drive]),
+             'poh error hours':  float(poh_change[drive] - host_change_ms[drive] / MS_IN_HR)} for drive in range(drives)]
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Log and save the drift table
+#--------------------------------------------------------------------------------------------------------------------
+def log_drift(results):
+
+    logger.info("")
+    logger.info(f"\t {'Serial':22} {'Snapshots':>9} {'Host Hrs':>10} {'Host Delta ms':>14} {'Host Delta ppm':>14} {'Max Offset ms':>14} {'Stopped':>8} {'POH Error':>10}")
+    logger.info("")
+    for result in results:
+        logger.info(f"\t {result['serial']:22} {result['snapshots']:9} {result['host hours']:10.3f} {result['host delta ms']:14,.0f} " +
+                    f"{result['host delta ppm']:14.1f} {result['max offset ms']:14,.0f} {result['stopped events']:8} {result['poh error hours']:10.1f}")
+    logger.info("")
+
+def write_drift_csv(csv_path, results):
+
+    with open(csv_path, mode='w', newline='') as drift_csv_file:
+        csv_writer = csv.writer(drift_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(DRIFT_CSV_HEADER)
+
+        for result in results:
+            csv_writer.writerow([result['serial'],result['model'],result['snapshots'],f"{result['host hours']:.3f}",
+                                 f"{result['drive hours']:.3f}",f"{result['host delta ms']:.0f}",f"{result['host delta ppm']:.3f}",
+                                 f"{result['max offset ms']:.0f}",result['stopped events'],result['origin changes'],
+                                 f"{result['poh change']:.0f}",f"{result['poh error hours']:.3f}"])
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Analyze nvme.info.json files from the command line
+#--------------------------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Measures drive clock drift over nvme.info.json snapshots', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('files', type=str, nargs='+', help='nvme.info.json files from one or more drives', metavar='<file>')
+    parser.add_argument('--csv', type=str, default='', help='Write one row per drive to this csv file', metavar='<file>')
+    args = parser.parse_args()
+
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+    results = analyze_drift(*read_snapshots(args.files))
+    log_drift(results)
+
+    if args.csv != "":
+        write_drift_csv(args.csv, results)
+
+    sys.exit(0 if len(results) else 1)
@@ -0,0 +1,159 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions that read fio json output (--output-format=json) into result records
+#
+#  Each job and direction (read, write) becomes a dict with the data transferred, run time, IOPS, bandwidth, total
+#  latency and the completion latency percentiles logged by fio.  Jobs from numjobs are combined into one record per
+#  direction: totals and IOPS are summed, bandwidth is the sum of each job's bandwidth (the jobs run at the same
+#  time) and the completion latency histograms are merged so percentiles such as P99.99 cover all the jobs.
+#
+#  Example:   result = read_fio_result("fio.json")
+#             logger.info(f"{result['read']['iops']:.0f} IOPS  P99.99 {result['read']['percentiles'][99.99]:.3f} mS")
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import json,csv
+from latency import LatencyHistogram,PERCENTILES
+
+NS_IN_MS      = 1000*1000
+MS_IN_SEC     = 1000
+BYTES_IN_GB   = 1000*1000*1000
+
+DIRECTIONS      = ['read','write']
+FIO_PERCENTILES = PERCENTILES + [99.99]          # fio logs up to P99.99 by default
+
+FIO_CSV_HEADER  = (['Job','Direction','Data(GB)','RunTime(ms)','IOPS','BW(GB/s)','Count','Avg(ms)','Min(ms)','Max(ms)'] +
+                   [f"P{percent}(ms)" for percent in FIO_PERCENTILES])
+
+#--------------------------------------------------------------------------------------------------------------------
+#  One job direction
+#--------------------------------------------------------------------------------------------------------------------
+def add_fio_latency(histogram, job_direction):
+
+    # fio only logs clat_ns percentiles so the histogram is filled from them.  Latency is converted to mS to match the
+    # admin command times.
+
+    clat = job_direction.get('clat_ns', {})
+    if int(clat.get('N', 0)) == 0: return histogram
+
+    points = sorted((float(percent), value/NS_IN_MS) for percent,value in clat.get('percentile', {}).items())
+    stddev = clat['stddev']/NS_IN_MS if 'stddev' in clat else None
+    return histogram.record_distribution(points, int(clat['N']), clat['min']/NS_IN_MS, clat['max']/NS_IN_MS, clat['mean']/NS_IN_MS, stddev)
+
+def read_job_direction(job_direction):
+
+    lat        = job_direction.get('lat_ns', {})
+    clat       = job_direction.get('clat_ns', {})
+    io_bytes   = int(job_direction.get('io_bytes', 0))
+    runtime_ms = int(job_direction.get('runtime', 0))
+    count      = int(lat.get('N', 0))
+
+    # Percentiles logged by fio are used as is, any not logged are taken from the histogram
+
+    histogram   = add_fio_latency(LatencyHistogram(), job_direction)
+    logged      = {float(percent): value/NS_IN_MS for percent,value in clat.get('percentile', {}).items()}
+    percentiles = {percent: logged.get(float(percent), histogram.percentile(percent)) for percent in FIO_PERCENTILES}
+
+    return {'data gb':     io_bytes / BYTES_IN_GB,
+            'runtime ms':  runtime_ms,
+            'iops':        float(job_direction.get('iops', 0.0)),
+            'bw gbs':      (io_bytes / BYTES_IN_GB) / (runtime_ms / MS_IN_SEC) if runtime_ms else 0.0,
+            'count':       count,
+            'mean ms':     float(lat.get('mean', 0.0)) / NS_IN_MS,
+            'min ms':      float(lat.get('min', 0.0)) / NS_IN_MS if count else 0.0,
+            'max ms':      float(lat.get('max', 0.0)) / NS_IN_MS if count else 0.0,
+            'percentiles': percentiles if histogram.count else {percent: 0.0 for percent in FIO_PERCENTILES},
+            'clat stddev ms': float(clat.get('stddev', 0.0)) / NS_IN_MS,
+            'histogram':   histogram}
+
+def combine_directions(directions):
+
+    # Combines the same direction of jobs that ran at the same time
+
+    if len(directions) == 1: return dict(directions[0])
+
+    histogram = LatencyHistogram()
+    for direction in directions: histogram.merge(direction['histogram'])
+
+    count = sum(direction['count'] for direction in directions)
+
+    # Pooled standard deviation of the completion latency of all the jobs
+
+    squares = sum((direction['histogram'].count - 1) * direction['clat stddev ms']**2 +
+                  direction['histogram'].count * (direction['histogram'].mean - histogram.mean)**2
+                  for direction in directions if direction['histogram'].count)
+
+    return {'data gb':     sum(direction['data gb'] for direction in directions),
+            'runtime ms':  max([direction['runtime ms'] for direction in directions], default=0),
+            'iops':        sum(direction['iops'] for direction in directions),
+            'bw gbs':      sum(direction['bw gbs'] for direction in directions),
+            'count':       count,
+            'mean ms':     sum(direction['mean ms'] * direction['count'] for direction in directions) / count if count else 0.0,
+            'min ms':      min([direction['min ms'] for direction in directions if direction['count']], default=0.0),
+            'max ms':      max([direction['max ms'] for direction in directions if direction['count']], default=0.0),
+            'percentiles': {percent: histogram.percentile(percent) for percent in FIO_PERCENTILES},
+            'clat stddev ms': (squares / (histogram.count - 1))**0.5 if histogram.count > 1 else 0.0,
+            'histogram':   histogram}
+
+#--------------------------------------------------------------------------------------------------------------------
+#  One fio.json file
+#--------------------------------------------------------------------------------------------------------------------
+def read_fio_result(file_path):
+
+    with open(file_path) as fio_file:
+        json_fio = json.load(fio_file)
+
+    jobs = []
+    for job in json_fio['jobs']:
+        record = {'name': job.get('jobname', ''),
+                  'runtime sec': int(job.get('job options', {}).get('runtime', 0)),
+                  'error': int(job.get('error', 0))}
+        for direction in DIRECTIONS:
+            record[direction] = read_job_direction(job.get(direction, {}))
+        jobs.append(record)
+
+    result = {'file': file_path, 'jobs': jobs, 'runtime sec': jobs[0]['runtime sec'] if len(jobs) else 0}
+    for direction in DIRECTIONS:
+        result[direction] = combine_directions([job[direction] for job in jobs])
+
+    return result
+
+def fio_histograms(result):
+    return {direction: result[direction]['histogram'] for direction in DIRECTIONS}
+
+def write_fio_csv(csv_path, results):
+
+    # One row per job and direction, then the combined row of each file
+
+    with open(csv_path, mode='w', newline='') as fio_csv_file:
+        csv_writer = csv.writer(fio_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['File'] + FIO_CSV_HEADER)
+
+        for result in results:
+            rows = [(job['name'], job) for job in result['jobs']]
+            if len(result['jobs']) > 1: rows.append(('All Jobs', result))
+
+            for name,record in rows:
+                for direction in DIRECTIONS:
+                    values = record[direction]
+                    if values['count'] == 0: continue
+                    csv_writer.writerow([result['file'],name,direction,f"{values['data gb']:.3f}",values['runtime ms'],f"{values['iops']:.1f}",
+                                         f"{values['bw gbs']:.3f}",values['count'],f"{values['mean ms']}",f"{values['min ms']}",f"{values['max ms']}"] +
+                                        [f"{values['percentiles'][percent]}" for percent in FIO_PERCENTILES])
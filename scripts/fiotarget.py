@@ -0,0 +1,143 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions that keep track of the fio target file so a prepared target can be reused
+#
+#  Writing the 16GB target takes minutes and uses drive endurance, so after the target is written a metadata file
+#  (target.bin.json) is saved next to it with the volume, size and fill pattern.  The next checkout reuses the target
+#  if the metadata matches and the file is still the full size and fully allocated.  The metadata is removed before
+#  the target is written, so a setup that did not finish is never reused.  The tests write to the target so its
+#  contents are not checked, only that it is the target that was prepared.
+#
+#  The target can also be preconditioned, a random write pass that runs until fio reports steady state IOPS.  This is
+#  recorded in the metadata so it is done once for a target.  A fio job that writes the target leaves it in a
+#  different state, so the precondition is cleared and the job recorded as the last workload, see
+#  record_target_workload().  The next checkout with precondition preconditions the target again.
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import os,json
+from datetime import datetime
+
+TARGET_VERSION = 2
+
+# fio options for each fill pattern, fio fills with random data by default
+
+FILL_PATTERNS = {'random': [], 'zero': ["--zero_buffers"]}
+
+SIZE_UNITS = {'k': 2**10, 'm': 2**20, 'g': 2**30, 't': 2**40}       # fio sizes are base 1024 by default
+
+WRITE_WORKLOADS = ['write','randwrite','trimwrite','rw','readwrite','randrw']     # fio --rw values that write
+
+def size_bytes(size):
+    # fio size such as '16g' in bytes
+    size = str(size).strip().lower()
+    if size[-1:] in SIZE_UNITS: return int(float(size[:-1]) * SIZE_UNITS[size[-1]])
+    return int(size)
+
+def target_metadata_path(target_file):
+    return target_file + ".json"
+
+def volume_root(volume):
+    # The target is in the root of the volume.  'c:' is not made absolute, on Windows that is the current directory
+    drive,path = os.path.splitdrive(volume)
+    return os.path.normcase(os.path.join(drive, os.sep))
+
+def target_key(volume, size, pattern):
+    return {'version': TARGET_VERSION, 'volume': volume_root(volume), 'bytes': size_bytes(size), 'pattern': pattern}
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Read, check and save the metadata
+#--------------------------------------------------------------------------------------------------------------------
+def read_target_metadata(target_file):
+    try:
+        with open(target_metadata_path(target_file)) as metadata_file:
+            return json.load(metadata_file)
+    except (OSError, ValueError):
+        return None
+
+def cached_target(target_file, volume, size, pattern):
+
+    # Returns the metadata if the target can be reused, otherwise None
+
+    metadata = read_target_metadata(target_file)
+    if metadata is None: return None
+
+    key = target_key(volume, size, pattern)
+    if any(metadata.get(name) != value for name,value in key.items()): return None
+
+    try:
+        status = os.stat(target_file)
+    except OSError:
+        return None
+
+    if status.st_size != key['bytes']: return None
+
+    # A sparse file was not fully written, st_blocks is not available on Windows
+
+    if hasattr(status, 'st_blocks') and status.st_blocks * 512 < key['bytes']: return None
+
+    return metadata
+
+def save_target_metadata(target_file, metadata):
+    with open(target_metadata_path(target_file), 'w') as metadata_file:
+        json.dump(metadata, metadata_file, indent=2)
+
+def new_target_metadata(volume, size, pattern):
+    return {**target_key(volume, size, pattern), 'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'preconditioned': None}
+
+def fio_options(fio_args):
+    # fio --name=value options as a dictionary, e.g. {'rw': 'randrw', 'rwmixread': '0'}
+    return dict(arg[2:].split('=',1) for arg in fio_args if arg.startswith('--') and '=' in arg)
+
+def fio_writes(fio_args):
+
+    # True if the fio job writes, a mixed workload writes unless it is all reads
+
+    options  = fio_options(fio_args)
+    workload = options.get('rw', options.get('readwrite', 'read')).split(':')[0]
+
+    if workload not in WRITE_WORKLOADS: return False
+    if workload in ['rw','readwrite','randrw']:
+        return options.get('rwmixread', '50') != '100' and options.get('rwmixwrite', '50') != '0'
+    return True
+
+def record_target_workload(target_file, fio_args):
+
+    # Called before a fio job runs on the target so a job that is stopped part way still clears the precondition
+
+    if not fio_writes(fio_args): return
+
+    metadata = read_target_metadata(target_file)
+    if metadata is None: return
+
+    options = fio_options(fio_args)
+    metadata['preconditioned'] = None
+    metadata['last workload']  = " ".join(f"{name}={options[name]}" for name in ['rw','rwmixread','bs'] if name in options)
+    save_target_metadata(target_file, metadata)
+
+def remove_target(target_file):
+
+    # The metadata is removed first so a target left behind is never reused
+
+    for path in [target_metadata_path(target_file), target_file]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,242 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple class that accumulates latency statistics one value at a time
+#
+#  Count, total, min, max and standard deviation are exact, for a histogram filled from percentiles the standard
+#  deviation is exact only if it is given (see record_distribution).  Percentiles come from a log-linear histogram:
+#  each power of two is split into SUB_BUCKETS linear buckets so a percentile is within 1/SUB_BUCKETS of the true
+#  value no matter the range.
+#  Histograms from different files or runs can be merged and give the same result as recording all the values once.
+#
+#  Histograms are saved as small json files (e.g. admin_commands.histogram.json) so results from thousands of runs
+#  can be combined without reading the raw csv files again.
+#
+#  Command line example:   python latency.py run1/admin_commands.histogram.json run2/admin_commands.histogram.json
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import sys,os,argparse,logging,json,math
+
+logger = logging.getLogger('nvme_logger')
+
+SUB_BUCKETS = 128                           # linear buckets per power of two, sets the percentile resolution
+PERCENTILES = [50,99,99.9]                  # percentiles reported for admin commands
+HISTOGRAM_VERSION = 1
+
+class LatencyHistogram:
+
+    def __init__(self):
+        self.count   = 0
+        self.total   = 0.0
+        self.min     = math.inf
+        self.max     = -math.inf
+        self.m2      = 0.0                  # sum of squared differences from the mean, for the standard deviation
+        self.zeros   = 0                    # values of zero (or less) do not have a log bucket
+        self.buckets = {}                   # bucket index -> count
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def bucket_index(value):
+        mantissa, exponent = math.frexp(value)              # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+        return exponent * SUB_BUCKETS + int((mantissa * 2.0 - 1.0) * SUB_BUCKETS)
+
+    @staticmethod
+    def bucket_value(index):
+        # Middle of the bucket
+
+        exponent, sub_bucket = divmod(index, SUB_BUCKETS)
+        return math.ldexp(1.0 + (sub_bucket + 0.5) / SUB_BUCKETS, exponent - 1)
+
+    def record(self, value, count=1):
+
+        # The squared differences are updated as each value is added (Welford) so the values are not kept
+
+        if self.count:
+            delta    = value - self.mean
+            self.m2 += delta * delta * self.count * count / (self.count + count)
+
+        self.count += count
+        self.total += value * count
+        if value < self.min: self.min = value
+        if value > self.max: self.max = value
+
+        if value <= 0:
+            self.zeros += count
+        else:
+            index = self.bucket_index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other):
+
+        self.m2 += other.m2
+        if self.count and other.count:
+            delta    = other.mean - self.mean
+            self.m2 += delta * delta * self.count * other.count / (self.count + other.count)
+
+        self.count += other.count
+        self.total += other.total
+        self.min    = min(self.min, other.min)
+        self.max    = max(self.max, other.max)
+        self.zeros += other.zeros
+        for index,count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stdev(self):
+        # Sample standard deviation, the same as statistics.stdev of the recorded values
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, percent):
+
+        if self.count == 0: return 0.0
+
+        rank = math.ceil(self.count * percent / 100.0)
+        if rank <= self.zeros: return self.min
+
+        seen = self.zeros
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self.bucket_value(index), self.min), self.max)
+
+        return self.max
+
+    def percentiles(self, percents=PERCENTILES):
+        return {percent: self.percentile(percent) for percent in percents}
+
+    def record_distribution(self, points, count, minimum, maximum, mean, stddev=None):
+        # Fill from a percentile list such as fio clat_ns, points is a list of (percent, value) sorted by percent.
+        # The count between two percent points is recorded at the upper value.  Count, min, max and mean are exact.
+        # The standard deviation is exact if stddev, the sample standard deviation such as fio clat_ns stddev, is
+        # given.  Otherwise it is approximated from the points, about the exact mean.
+
+        if count == 0: return self
+
+        other = LatencyHistogram()
+        recorded = 0
+        for percent,value in points:
+            slice_count = round(count * percent / 100.0) - recorded
+            if slice_count > 0:
+                other.record(value, slice_count)
+                recorded += slice_count
+        if count > recorded: other.record(maximum, count - recorded)
+
+        if stddev is not None:
+            other.m2 = stddev * stddev * (count - 1)
+        else:
+            other.m2 += count * (other.mean - mean)**2
+
+        other.total = mean * count
+        other.min   = minimum
+        other.max   = maximum
+        return self.merge(other)
+
+    #----------------------------------------------------------------------------------------------------------------
+    #  Save and load as json
+    #----------------------------------------------------------------------------------------------------------------
+    def to_dict(self):
+        return {'version':     HISTOGRAM_VERSION,
+                'sub buckets': SUB_BUCKETS,
+                'count':       self.count,
+                'total':       self.total,
+                'min':         self.min if self.count else 0,
+                'max':         self.max if self.count else 0,
+                'm2':          self.m2,
+                'zeros':       self.zeros,
+                'buckets':     [[index, self.buckets[index]] for index in sorted(self.buckets)]}
+
+    @classmethod
+    def from_dict(cls, data):
+
+        if data.get('sub buckets') != SUB_BUCKETS:
+            raise ValueError(f"Histogram has {data.get('sub buckets')} sub buckets, expected {SUB_BUCKETS}")
+
+        histogram = cls()
+        histogram.count   = data['count']
+        histogram.total   = data['total']
+        histogram.min     = data['min'] if histogram.count else math.inf
+        histogram.max     = data['max'] if histogram.count else -math.inf
+        histogram.m2      = data.get('m2', 0.0)            # not saved by older versions
+        histogram.zeros   = data['zeros']
+        histogram.buckets = {index: count for index,count in data['buckets']}
+        return histogram
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Histogram files
+#
+#  A histogram file is a json object of named histograms, e.g. one per admin command or one per fio job direction
+#--------------------------------------------------------------------------------------------------------------------
+def histogram_path(csv_or_json_path):
+    root, _ = os.path.splitext(csv_or_json_path)
+    return root + ".histogram.json"
+
+def save_histograms(file_path, histograms):
+    with open(file_path, 'w') as json_file:
+        json.dump({name: histogram.to_dict() for name,histogram in histograms.items()}, json_file, separators=(',',':'))
+
+def load_histograms(file_path):
+    with open(file_path) as json_file:
+        return {name: LatencyHistogram.from_dict(data) for name,data in json.load(json_file).items()}
+
+def merge_histogram_files(file_paths):
+
+    merged = {}
+    for file_path in file_paths:
+        for name,histogram in load_histograms(file_path).items():
+            if name not in merged: merged[name] = LatencyHistogram()
+            merged[name].merge(histogram)
+    return merged
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Merge histogram files from the command line
+#--------------------------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Merges latency histogram files', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('files',    type=str, nargs='+', help='histogram.json files to merge', metavar='<file>')
+    parser.add_argument('--output', type=str, default='', help='Save the merged histograms to this file', metavar='<file>')
+    args = parser.parse_args()
+
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+    try:
+        merged = merge_histogram_files(args.files)
+    except Exception as e:
+        logger.error(f"Failed to merge histogram files with exception: {e}")
+        sys.exit(1)
+
+    for name,histogram in merged.items():
+        if histogram.count == 0: continue
+        line = f"Avg: {histogram.mean:8.3f}    Min: {histogram.min:8.3f}    Max: {histogram.max:8.3f}    Count: {histogram.count:8}    "
+        line += "    ".join(f"P{percent}: {value:8.3f}" for percent,value in histogram.percentiles().items())
+        logger.info(f"\t   {name:35} {line}")
+
+    if args.output != "":
+        save_histograms(args.output, merged)
+
+    sys.exit(0)
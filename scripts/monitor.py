@@ -0,0 +1,301 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple class that holds the SMART data read by an nvmecmd logpage02 monitor as numeric columns
+#
+#  Each field is decoded once when the sample is added and stored in an array so the csv file, maximum temperature
+#  and totals are computed from numbers instead of re-parsing the nvmecmd strings.
+#
+#  Also has functions to follow a monitor while nvmecmd is still running.  These need the monitor to be started with
+#  logpage02.live.cmd.json which sets "log sample rate" so nvmecmd logs the info file as each sample is read.
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import os,re,csv,time,asyncio,logging
+from array import array
+from datetime import datetime
+from summary import SampleDecoder,iter_summary_samples,read_summary_settings,timestamp_ns,timestamps_ns
+from nvmeinfo import NvmeInfo
+from columnar import write_columns
+
+MS_IN_SEC = 1000
+
+logger = logging.getLogger('nvme_logger')
+
+LIVE_POLL_SEC = 0.5                     # how often the monitor directory is checked for new samples
+
+STEADY_WINDOW_SEC  = 120                # samples used to decide if the drive is at steady state
+STEADY_TEMP_SLOPE  = 0.5                # most temperature change, in C per minute, at steady state
+STEADY_TEMP_MARGIN = 2                  # most degrees C above the baseline temperature at steady state
+
+# Column name, nvmecmd field name and array type ('q' integer, 'd' float) for each monitored value
+
+MONITOR_COLUMNS = [
+    ('temperature',   "Composite Temperature",                 'q'),
+    ('data_read',     "Data Read",                             'd'),
+    ('data_written',  "Data Written",                          'd'),
+    ('tmt1',          "Thermal Management Temperature 1 Time", 'q'),
+    ('tmt2',          "Thermal Management Temperature 2 Time", 'q'),
+    ('warning_time',  "Warning Composite Temperature Time",    'q'),
+    ('critical_time', "Critical Composite Temperature Time",   'q'),
+    ('busy_time',     "Controller Busy Time",                  'q'),
+]
+
+# Column types used in monitor.columns, counters are stored as the change from the prior sample (see columnar.py)
+
+MONITOR_COLUMN_ENCODINGS = {'timestamp': 't', 'temperature': 'q', 'data_read': 't3', 'data_written': 't3', 'tmt1': 't',
+                            'tmt2': 't', 'warning_time': 't', 'critical_time': 't', 'busy_time': 't'}
+
+# Header of monitor.csv written by MonitorSeries.write_csv
+
+MONITOR_CSV_HEADER = ['Timestamp','Temp(C)','DeltaRead(GB/sec)','DeltaWritten(GB/sec)','DeltaTMT1(Sec)','DeltaTMT2(Sec)',
+                      'DataRead(GB)','DataWritten(GB)','TMT1(Sec)','TMT2(Sec)','WarningThrottle(Min)','CriticalThrottle(Min)','BusyTime(Min)']
+
+class MonitorSeries:
+
+    def __init__(self, sample_rate_sec):
+        self.sample_rate_sec = sample_rate_sec
+        self.decoder         = SampleDecoder()
+        self.timestamps      = []
+        self.columns         = {name: array(typecode) for name,field,typecode in MONITOR_COLUMNS}
+
+    @classmethod
+    def from_summary(cls, file_path):
+        settings = read_summary_settings(file_path)
+        series   = cls(float(settings['read']['interval in ms']) / MS_IN_SEC)
+        for sample in iter_summary_samples(file_path):
+            series.append(sample)
+        return series
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def append(self, sample):
+        self.timestamps.append(sample["timestamp"])
+        for name,field,typecode in MONITOR_COLUMNS:
+            self.columns[name].append(self.decoder.decode(field, sample[field]))
+
+    def maximum(self, name):
+        return max(self.columns[name])
+
+    def total_delta(self, name):
+        column = self.columns[name]
+        return column[-1] - column[0]
+
+    def deltas(self, name):
+        # Change from the prior sample, the first sample has no prior so its delta is zero
+
+        column = self.columns[name]
+        deltas = array(column.typecode, column[:1])
+        if len(column): deltas[0] = 0
+        deltas.extend(column[index] - column[index-1] for index in range(1,len(column)))
+        return deltas
+
+    def rates(self, name):
+        return array('d', (delta / self.sample_rate_sec for delta in self.deltas(name)))
+
+    def write_csv(self, csv_path):
+
+        with open(csv_path, mode='w', newline='') as monitor_csv_file:
+            csv_writer = csv.writer(monitor_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+            csv_writer.writerow(MONITOR_CSV_HEADER)
+
+            c = self.columns
+
+            for index,(delta_dr,delta_dw,delta_tmt1,delta_tmt2) in enumerate(zip(self.rates('data_read'),self.rates('data_written'),
+                                                                              self.deltas('tmt1'),self.deltas('tmt2'))):
+                csv_writer.writerow([self.timestamps[index],f"{c['temperature'][index]}",
+                                    f"{delta_dr:.3f}",f"{delta_dw:.3f}",f"{float(delta_tmt1)}",f"{float(delta_tmt2)}",
+                                    f"{c['data_read'][index]:.3f}",f"{c['data_written'][index]:.3f}",f"{c['tmt1'][index]}",f"{c['tmt2'][index]}",
+                                    f"{c['warning_time'][index]}",f"{c['critical_time'][index]}",f"{c['busy_time'][index]}"])
+
+    def write_columns(self, file_path):
+
+        # Raw values only, the deltas and rates in monitor.csv are computed from these when read
+
+        e = MONITOR_COLUMN_ENCODINGS
+
+        write_columns(file_path, [('timestamp', e['timestamp'], timestamps_ns(self.timestamps))] +
+                                 [(name, e[name], self.columns[name]) for name,field,typecode in MONITOR_COLUMNS],
+                      {'sample rate sec': self.sample_rate_sec})
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Follow a running monitor
+#
+#  nvmecmd logs one info file per sample, nvme.info.sample-<number>.json, at the log sample rate.  Each new file is
+#  read and returned as a sample with the same field names as the samples in read.summary.json, in sample number
+#  order.  A file still being written fails to decode, it and the files after it are read again on the next poll so
+#  samples are never returned out of order.  The timestamp is the time the file was last written.
+#--------------------------------------------------------------------------------------------------------------------
+LIVE_SAMPLE_FILE = re.compile(r"nvme\.info\.sample-(\d+)\.json")
+
+def read_live_samples(monitor_directory, seen):
+
+    files = []
+
+    with os.scandir(monitor_directory) as entries:
+        for entry in entries:
+            match = LIVE_SAMPLE_FILE.fullmatch(entry.name)
+            if match is None: continue
+
+            modified = entry.stat().st_mtime_ns
+            if seen.get(entry.name) == modified: continue
+
+            files.append((int(match.group(1)), entry, modified))
+
+    samples = []
+
+    for number,entry,modified in sorted(files, key=lambda item: item[0]):
+        try:
+            parameters = NvmeInfo(entry.path).parameters
+        except (ValueError, KeyError, OSError):
+            break
+
+        seen[entry.name] = modified
+
+        sample = {"timestamp": datetime.fromtimestamp(modified / 1e9).strftime("%Y-%m-%d %H:%M:%S.%f")}
+        for name,parameter in parameters.items():
+            sample[name] = parameter['value']
+
+        samples.append(sample)
+
+    return samples
+
+def follow_monitor(monitor_directory, nvmecmd_process, poll_sec=LIVE_POLL_SEC):
+
+    # Yields samples until nvmecmd exits, samples logged before nvmecmd exited are still returned
+
+    seen = {}
+    while True:
+        running = nvmecmd_process.poll() == None
+
+        for sample in read_live_samples(monitor_directory, seen):
+            yield sample
+
+        if not running: return
+        time.sleep(poll_sec)
+
+async def follow_monitor_async(monitor_directory, nvmecmd_process, poll_sec=LIVE_POLL_SEC):
+
+    seen = {}
+    while True:
+        running = nvmecmd_process.poll() == None
+
+        for sample in read_live_samples(monitor_directory, seen):
+            yield sample
+
+        if not running: return
+        await asyncio.sleep(poll_sec)
+
+def increase_check(field, limit=0):
+
+    # Returns a function for checking live samples that is True once field has increased by more than limit since
+    # the first sample checked.  For example, increase_check("Critical Composite Temperature Time")
+
+    decoder = SampleDecoder()
+    first   = []
+
+    def check(sample):
+        if field not in sample: return False
+        value = decoder.decode(field, sample[field])
+        if not first: first.append(value)
+        return (value - first[0]) > limit
+
+    return check
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Thermal steady state
+#
+#  The drive is at steady state when, over the last STEADY_WINDOW_SEC of live samples, the least squares slope of
+#  the composite temperature is within STEADY_TEMP_SLOPE, the controller busy time did not increase, and, if a
+#  baseline is given, the temperature is within STEADY_TEMP_MARGIN of the baseline.  Used instead of fixed delays
+#  to get a baseline before a workload and to wait for the drive to cool down after it.
+#--------------------------------------------------------------------------------------------------------------------
+class SteadyState:
+
+    def __init__(self, baseline_temperature=None, window_sec=STEADY_WINDOW_SEC, temp_slope=STEADY_TEMP_SLOPE, temp_margin=STEADY_TEMP_MARGIN):
+        self.baseline_temperature = baseline_temperature
+        self.window_ns   = window_sec * 1e9
+        self.temp_slope  = temp_slope
+        self.temp_margin = temp_margin
+        self.decoder     = SampleDecoder()
+        self.window      = []               # (time in ns, temperature, busy time)
+        self.samples     = 0
+
+    @property
+    def temperature(self):
+        # Average temperature over the window
+        return sum(temperature for time_ns,temperature,busy in self.window) / len(self.window) if self.window else None
+
+    def slope(self):
+        # Temperature change in C per minute
+
+        times = [(time_ns - self.window[0][0]) / 60e9 for time_ns,temperature,busy in self.window]
+        temps = [temperature for time_ns,temperature,busy in self.window]
+
+        time_mean = sum(times) / len(times)
+        temp_mean = sum(temps) / len(temps)
+        spread    = sum((time - time_mean)**2 for time in times)
+        if spread == 0: return 0.0
+        return sum((time - time_mean) * (temp - temp_mean) for time,temp in zip(times,temps)) / spread
+
+    def add(self, sample):
+
+        # Returns True once the drive is at steady state
+
+        if "Composite Temperature" not in sample or "Controller Busy Time" not in sample: return False
+
+        self.samples += 1
+        time_ns = timestamp_ns(sample['timestamp'])
+        self.window.append((time_ns,
+                            self.decoder.decode("Composite Temperature", sample["Composite Temperature"]),
+                            self.decoder.decode("Controller Busy Time", sample["Controller Busy Time"])))
+
+        while len(self.window) > 1 and self.window[-1][0] - self.window[1][0] >= self.window_ns:
+            self.window.pop(0)
+
+        if self.window[-1][0] - self.window[0][0] < self.window_ns: return False
+        if self.window[-1][2] != self.window[0][2]: return False
+        if abs(self.slope()) > self.temp_slope: return False
+
+        if self.baseline_temperature is None: return True
+        return self.temperature <= self.baseline_temperature + self.temp_margin
+
+def wait_for_steady_state(monitor_directory, nvmecmd_process, max_wait_sec, baseline_temperature=None, poll_sec=LIVE_POLL_SEC):
+
+    # Returns (True, SteadyState) at steady state, or (False, SteadyState) after max_wait_sec or if nvmecmd exited
+
+    steady = SteadyState(baseline_temperature)
+    seen   = {}
+    start  = time.monotonic()
+
+    while True:
+        for sample in read_live_samples(monitor_directory, seen):
+            if steady.add(sample): return True, steady
+
+        if nvmecmd_process.poll() != None or (time.monotonic() - start) >= max_wait_sec:
+            if steady.samples == 0:
+                logger.warning(f"\t WARNING:  No monitor samples found in {monitor_directory}, steady state was not checked")
+            return False, steady
+
+        time.sleep(poll_sec)
@@ -0,0 +1,144 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple class for reading the parameters in an nvmecmd nvme.info.json file
+#
+#  Only the nvme parameters are decoded, the rest of the file (e.g. the raw hex data logged by read.cmd.json) is
+#  skipped unless asked for.  Parameters are read the first time one is used and looked up by full name or by the
+#  abbreviation in parentheses, e.g. info['MN'] is the same as info['Model Number (MN)'].  An abbreviation used by
+#  more than one parameter, e.g. ENLAT, must be looked up by full name.  Numeric values such as "1,234 Sec" are decoded
+#  once and cached.
+#
+#  Example:   info = NvmeInfo("nvme.info.json")
+#             logger.info(f"{info['Model Number (MN)']}  {info.number('Power On Hours')} hours")
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import os,threading
+from collections import OrderedDict
+from summary import read_json_value,SampleDecoder
+
+PARAMETERS_PATH = ('nvme','parameters')     # location of the parameters in nvme.info.json
+METADATA_PATH   = ('_metadata',)            # location of the system metadata in nvme.info.json
+HEX_DATA_KEY    = 'raw hex data'            # logged when the cmd file has "log hex data": true
+
+INFO_CHUNK_SIZE = 64*1024*1024              # info files are a few MB so are read in one chunk
+CACHE_FILES     = 32                        # parameters of the most recently read files are kept
+
+_parameter_cache = OrderedDict()            # (file path, modified time, size, hex data) -> parameters
+_cache_lock      = threading.Lock()         # the fleet report reads info files on worker threads
+
+class NvmeInfo:
+
+    def __init__(self, file_path, hex_data=False):
+        self.file_path   = file_path
+        self.hex_data    = hex_data
+        self._parameters = None
+        self._index      = None                 # abbreviation -> full parameter name
+        self._ambiguous  = set()                # abbreviations of more than one parameter
+        self._numbers    = {}                   # full parameter name -> decoded number
+        self._decoder    = SampleDecoder()
+        self._sections   = {}
+
+    @property
+    def parameters(self):
+
+        if self._parameters is None:
+
+            # The same file is often read by more than one report so the parameters are cached until it changes
+
+            status = os.stat(self.file_path)
+            key    = (os.path.abspath(self.file_path), status.st_mtime_ns, status.st_size, self.hex_data)
+
+            with _cache_lock:
+                parameters = _parameter_cache.get(key)
+                if parameters is not None: _parameter_cache.move_to_end(key)
+
+            # The file is read outside the lock so other threads can read other files at the same time
+
+            if parameters is None:
+                parameters = read_json_value(self.file_path, PARAMETERS_PATH, chunk_size=INFO_CHUNK_SIZE,
+                                             skip=() if self.hex_data else (HEX_DATA_KEY,))
+                if parameters is None:
+                    raise KeyError(f"No nvme parameters in {self.file_path}")
+
+                with _cache_lock:
+                    _parameter_cache[key] = parameters
+                    if len(_parameter_cache) > CACHE_FILES: _parameter_cache.popitem(last=False)
+
+            self._parameters = parameters
+
+        return self._parameters
+
+    def section(self, path):
+        # Any other part of the file, e.g. section(METADATA_PATH), is read on first use and cached
+
+        path = tuple(path)
+        if path not in self._sections:
+            self._sections[path] = read_json_value(self.file_path, path, chunk_size=INFO_CHUNK_SIZE)
+        return self._sections[path]
+
+    def name(self, name):
+
+        if name in self.parameters: return name
+
+        if self._index is None:
+
+            # Abbreviations used by more than one parameter, such as ENLAT in each power state, are left out
+
+            self._index     = {}
+            self._ambiguous = set()
+            for full_name in self.parameters:
+                if full_name.endswith(')') and '(' in full_name:
+                    abbreviation = full_name[full_name.rindex('(')+1:-1]
+                    if abbreviation in self._index: self._ambiguous.add(abbreviation)
+                    self._index[abbreviation] = full_name
+            for abbreviation in self._ambiguous: del self._index[abbreviation]
+
+        if name in self._index: return self._index[name]
+        if name in self._ambiguous: raise KeyError(f"{name} is the abbreviation of more than one parameter, use the full name")
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        try:
+            self.name(name)
+            return True
+        except KeyError:
+            return False
+
+    def __getitem__(self, name):
+        return self.parameters[self.name(name)]['value']
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def parameter(self, name):
+        return self.parameters[self.name(name)]
+
+    def number(self, name):
+        # Number at the start of the value, e.g. 1234 from "1,234 Sec"
+
+        full_name = self.name(name)
+        if full_name not in self._numbers:
+            self._numbers[full_name] = self._decoder.decode(full_name, self.parameters[full_name]['value'])
+        return self._numbers[full_name]
+
+    def unit(self, name):
+        self.number(name)
+        return self._decoder.unit(self.name(name))
@@ -0,0 +1,504 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions that run a test plan, a json file listing the tests and steps to run (e.g. checkout.plan.json)
+#
+#  Each step has an id, a name and a type.  The type decides what the step runs, e.g. "nvmecmd" runs nvmecmd with a
+#  cmd file and "admin-times" parses the admin command times of a summary file.  A step lists the steps it needs in
+#  "needs" and can use their log directories in its values as {<step id>}, so the steps form a dependency graph:
+#
+#      {"id": "reliability-read", "name": "Read-Verify-Compare-1K", "type": "nvmecmd", "cmd file": "read.cmd.json",
+#       "args": ["--samples","1000","--interval","500"]},
+#      {"id": "reliability-times", "name": "Log-Admin-Times", "type": "admin-times", "needs": ["reliability-read"],
+#       "summary": "{reliability-read}/read.summary.json"}
+#
+#  A step starts once the steps it needs passed and the steps listed in "after" ended, "after" only orders steps that
+#  are run anyway, e.g. reading the drive info at the end of the plan.  Steps that use the drive run one at a time in
+#  dependency order, steps that only read files run on other threads at the same time, e.g. parsing one sweep while
+#  the next reads the drive.  A step with "cache" is skipped if its values, input files and the steps it needs are
+#  the same as the last time it passed, its logs are copied from the cache directory shared by all runs (e.g.
+#  checkout/plan_cache).  Only steps whose input files repeat across runs can hit, e.g. a file kept outside the run
+#  directory.  A file written by a step that reads the drive changes every run, so checkout.plan.json caches nothing
+#  and only resuming skips work.  When resuming a checkout (see start_checkpoint in test.py) steps that passed are
+#  not run again, or for a test with "resume": false only if the whole test passed.  A test with "abort on fail"
+#  stops the plan if it fails, like tests 1 and 2 of checkout.py.
+#
+#  fio steps run on the target of the fio-target step they need.  A "monitor-start" step starts nvmecmd logging the
+#  drive until the "monitor-stop" step naming it in "monitor", fio steps naming it in "monitor" run while it logs,
+#  like tests 7 and 8 of checkout.py.
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import os,re,time,json,shutil,signal,hashlib,logging
+from concurrent.futures import ThreadPoolExecutor,wait,FIRST_COMPLETED
+from test import (NVMECMD,FIO,FIO_ASYNC_IO,start_test,end_test,test_resumed,start_step,end_step,run_step_process,
+                  log_report,parse_admin_commands,run_admin_sweep,compare_time,prepare_fio_target,parse_fio_data,
+                  start_monitor,stop_monitor,signal_handler,run_monitored_fio,live_abort_check,run_random_read_sweep,
+                  record_target_workload)
+
+logger = logging.getLogger('nvme_logger')
+
+PLAN_WORKERS    = 4                          # most steps running at the same time
+CACHE_FILE      = "step.cache.json"          # saved last in a cache entry, the entry is complete if it is there
+BUILTIN_VALUES  = ['nvme','volume','path','target','dir']
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Step types
+#
+#  Each function runs one step and returns the step code, 0 if passed.  definition is the step from the plan with
+#  the {} values filled in, context has the drive, volume, cmd path and options the plan is run with.
+#--------------------------------------------------------------------------------------------------------------------
+def plan_file(context, name):
+    # cmd, rules and plan files are relative to the cmd path like the checkout cmd files
+    return name if os.path.isabs(name) else os.path.join(context['path'], name)
+
+def run_nvmecmd_step(step, definition, context):
+
+    nvmecmd_args = [NVMECMD,                                           # path to nvmecmd executable defined in lib
+                    plan_file(context, definition['cmd file']),        # cmd file from the cmd path
+                    "--dir",f"{step['directory']}"]                    # log to the directory created by start_step
+
+    if 'rules file' in definition:
+        nvmecmd_args += ["--rules", plan_file(context, definition['rules file'])]
+
+    nvmecmd_args += [f"{arg}" for arg in definition.get('args', [])] + ["--nvme",f"{context['nvme']}"]
+
+    code = run_step_process(nvmecmd_args, step['directory'], definition.get('timeout'))
+
+    if definition.get('report', False):
+        log_report(os.path.join(step['directory'],"nvme.info.json"), context['nvme'], False)
+
+    return code
+
+def run_wait_step(step, definition, context):
+    logger.info(f"\t\tWaiting {definition['sec']} seconds")
+    logger.info("")
+    time.sleep(definition['sec'])
+    return 0
+
+def run_admin_times_step(step, definition, context):
+    return parse_admin_commands(definition['summary'], os.path.join(step['directory'],"admin_commands.csv"))
+
+def run_admin_sweep_step(step, definition, context):
+    run_admin_sweep(step, context['nvme'], plan_file(context, definition['cmd file']), definition['command'],
+                    definition['idle times ms'], definition['csv file'], context['options'].get('adaptive', False))
+    return step['code']
+
+def run_compare_time_step(step, definition, context):
+    return compare_time(definition['reference'], definition['info'])
+
+def run_fio_target_step(step, definition, context):
+    return prepare_fio_target(context['target'], context['volume'], definition['size'], step['directory'],
+                              definition.get('pattern', 'random'), context['options'].get('reuse target', True),
+                              context['options'].get('precondition', False))
+
+def run_fio_step(step, definition, context):
+
+    fio_file        = os.path.join(step['directory'],"fio.json")
+    fio_target_file = context['target'].replace(":",r"\:")
+
+    fio_args = [FIO,                                                    # path to fio executable
+                f"--name={definition.get('job', step['name'])}",        # name for job
+                f"--ioengine={FIO_ASYNC_IO}",                           # asynchronous IO engine (Window/Linux are different)
+                "--direct=1",                                           # non-buffered IO
+                "--thread",                                             # Generate threads
+                "--output-format=json",                                 # Use json output so easy to read and parse later
+                f"--output={fio_file}",
+                f"--filename={fio_target_file}"]                        # target prepared by a fio-target step
+
+    fio_args += [f"{arg}" for arg in definition.get('args', [])]
+
+    record_target_workload(context['target'], fio_args)
+
+    # With "monitor" fio runs while the monitor started by that step logs the drive, then waits "end delay sec"
+
+    if 'monitor' in definition:
+        options     = context['options']
+        monitor     = context['monitors'][definition['monitor']]
+        abort_check = live_abort_check(monitor['cmd file'], options.get('live rules', "")) if options.get('live', False) else None
+        code        = run_monitored_fio(fio_args, step['directory'], monitor, definition.get('timeout'),
+                                        definition.get('end delay sec', 0), abort_check, options.get('steady', False))
+    else:
+        code = run_step_process(fio_args, step['directory'], definition.get('timeout'))
+
+    if code or not definition.get('parse', True): return code
+
+    return parse_fio_data([fio_file], context['target'], os.path.join(step['directory'],"fio.csv"))
+
+def run_fio_results_step(step, definition, context):
+    return parse_fio_data(definition['files'], context['target'], os.path.join(step['directory'],"fio.csv"))
+
+def run_fio_sweep_step(step, definition, context):
+    run_random_read_sweep(step, context['target'], definition['size'], definition['idle times ms'],
+                          context['options'].get('adaptive', False), definition.get('runtime sec', 180),
+                          definition.get('batch runtime sec', 30))
+    return step['code']
+
+def run_monitor_start_step(step, definition, context):
+
+    # The live cmd file is used when following the monitor, the monitor is kept in the context for the steps that
+    # name this step in "monitor"
+
+    options  = context['options']
+    live     = options.get('live', False) or options.get('steady', False)
+    cmd_file = plan_file(context, definition.get('live cmd file', definition['cmd file']) if live else definition['cmd file'])
+    monitor  = start_monitor(step['directory'], context['nvme'], cmd_file, definition['delay sec'], options.get('steady', False))
+
+    if monitor is None: return 1
+    context['monitors'][definition['id']] = monitor
+    return 0
+
+def run_monitor_stop_step(step, definition, context):
+    monitor = context['monitors'].pop(definition['monitor'])
+    return stop_monitor(monitor['directory'], monitor['process'])
+
+# Step type -> (function, uses the drive, required values)
+
+STEP_TYPES = {'nvmecmd':      (run_nvmecmd_step,      True,  ['cmd file']),
+              'wait':         (run_wait_step,         True,  ['sec']),
+              'admin-times':  (run_admin_times_step,  False, ['summary']),
+              'admin-sweep':  (run_admin_sweep_step,  True,  ['cmd file','command','idle times ms','csv file']),
+              'compare-time': (run_compare_time_step, False, ['reference','info']),
+              'fio-target':   (run_fio_target_step,   True,  ['size']),
+              'fio':          (run_fio_step,          True,  []),
+              'fio-sweep':    (run_fio_sweep_step,    True,  ['size','idle times ms']),
+              'fio-results':  (run_fio_results_step,  False, ['files']),
+              'monitor-start':(run_monitor_start_step,True,  ['cmd file','delay sec']),
+              'monitor-stop': (run_monitor_stop_step, True,  ['monitor'])}
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Load and check a plan
+#
+#  Returns the plan with a flat list of steps in plan order and the step ids in dependency order, each step after the
+#  steps it needs and the steps it runs after but otherwise in plan order.  Raises ValueError if the plan has an unknown step type,
+#  a missing value, a duplicate id, a need that is not in the plan, a monitor the step does not need or a cycle.
+#--------------------------------------------------------------------------------------------------------------------
+def load_plan(file_path):
+
+    with open(file_path) as plan_json_file:
+        plan = json.load(plan_json_file)
+
+    steps = []
+    for test in plan['tests']:
+        for number,definition in enumerate(test['steps'], start=1):
+            steps.append({'test': test, 'number': number, 'definition': definition, 'id': definition['id'],
+                          'needs': definition.get('needs', []), 'after': definition.get('after', [])})
+
+    ids = {}
+    for entry in steps:
+        definition = entry['definition']
+
+        if entry['id'] in ids or entry['id'] in BUILTIN_VALUES:
+            raise ValueError(f"Step id {entry['id']} is used more than once")
+        ids[entry['id']] = entry
+
+        if definition.get('type') not in STEP_TYPES:
+            raise ValueError(f"Step {entry['id']} has unknown type {definition.get('type')}")
+
+        for name in STEP_TYPES[definition['type']][2]:
+            if name not in definition: raise ValueError(f"Step {entry['id']} is missing '{name}'")
+
+    for entry in steps:
+        for need in entry['needs'] + entry['after']:
+            if need not in ids: raise ValueError(f"Step {entry['id']} needs {need} which is not in the plan")
+
+        for name in value_names(entry['definition']):
+            if name not in BUILTIN_VALUES and name not in entry['needs']:
+                raise ValueError(f"Step {entry['id']} uses {{{name}}} but does not need it")
+
+        monitor = entry['definition'].get('monitor')
+        if monitor is not None:
+            if monitor not in entry['needs'] or ids[monitor]['definition']['type'] != 'monitor-start':
+                raise ValueError(f"Step {entry['id']} uses monitor {monitor} but does not need a monitor-start step with that id")
+
+    # Steps are put in dependency order, any left over are in a cycle
+
+    order = []
+    while len(order) < len(steps):
+        ready = [entry['id'] for entry in steps if entry['id'] not in order and all(need in order for need in entry['needs'] + entry['after'])]
+        if len(ready) == 0:
+            raise ValueError(f"Steps {', '.join(entry['id'] for entry in steps if entry['id'] not in order)} need each other")
+        order.append(ready[0])
+
+    plan['steps'] = steps
+    plan['ids']   = ids
+    plan['order'] = order
+    return plan
+
+def select_steps(plan, tests, options):
+
+    # Steps of the tests listed plus the steps they need.  Steps with "when" only run if that option is set, steps
+    # that need them are not run either.
+
+    selected = set()
+    pending  = [entry for entry in plan['steps'] if entry['test']['number'] in tests]
+
+    while len(pending):
+        entry = pending.pop()
+        if entry['id'] in selected: continue
+        selected.add(entry['id'])
+        pending += [plan['ids'][need] for need in entry['needs']]
+
+    steps = []
+    for entry in [plan['ids'][step_id] for step_id in plan['order']]:
+        if entry['id'] not in selected: continue
+        if not options.get(entry['definition'].get('when', ''), True): continue
+        if any(need not in [step['id'] for step in steps] for need in entry['needs']): continue
+        steps.append(entry)
+
+    return steps
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Fill in the {} values and the cache key of a step
+#--------------------------------------------------------------------------------------------------------------------
+VALUE_PATTERN = re.compile(r"\{([^{}]+)\}")
+
+def value_names(value):
+
+    # Names of the {} values used in a step
+
+    if isinstance(value, str):
+        return set(VALUE_PATTERN.findall(value))
+    if isinstance(value, list):
+        return set().union(*[value_names(item) for item in value])
+    if isinstance(value, dict):
+        return set().union(*[value_names(item) for item in value.values()])
+    return set()
+
+def fill_values(value, values):
+
+    if isinstance(value, str):
+        return VALUE_PATTERN.sub(lambda match: f"{values[match.group(1)]}", value)
+    if isinstance(value, list):
+        return [fill_values(item, values) for item in value]
+    if isinstance(value, dict):
+        return {name: fill_values(item, values) for name,item in value.items()}
+    return value
+
+def step_cache_key(entry, definition, context, need_keys):
+
+    # The step from the plan, the drive values it uses, the contents of the files it uses and the keys of the steps
+    # it needs.  The step directories are left out because they change with every run.
+
+    values = {name: context[name] for name in ['nvme','volume','path','target']}
+    key    = hashlib.sha256(json.dumps([entry['definition'], values], sort_keys=True).encode())
+
+    for name in ['cmd file','rules file','summary','reference','info'] + definition.get('inputs', []):
+        if name not in definition: continue
+        try:
+            with open(plan_file(context, definition[name]),'rb') as input_file:
+                key.update(hashlib.sha256(input_file.read()).digest())
+        except OSError:
+            key.update(b"missing")
+
+    for need_key in need_keys:
+        key.update(need_key.encode())
+
+    return key.hexdigest()
+
+def cache_step_path(context, step_id):
+    # Each drive has its own entries so drives tested in parallel don't replace each other's
+    return os.path.join(context['cache dir'], f"nvme{context['nvme']}", step_id)
+
+def cache_entry_path(context, step_id, key):
+    return os.path.join(cache_step_path(context, step_id), key)
+
+def restore_step_cache(context, step_id, key, directory):
+
+    # Copies the logs of the cached step to directory, returns False if there is no cache entry for the key
+
+    entry_path = cache_entry_path(context, step_id, key)
+    if not os.path.exists(os.path.join(entry_path, CACHE_FILE)): return False
+
+    shutil.copytree(entry_path, directory, dirs_exist_ok=True, ignore=shutil.ignore_patterns(CACHE_FILE))
+    return True
+
+def save_step_cache(context, step_id, key, directory):
+
+    # Only the last entry of each step is kept
+
+    shutil.rmtree(cache_step_path(context, step_id), ignore_errors=True)
+
+    entry_path = cache_entry_path(context, step_id, key)
+    shutil.copytree(directory, entry_path)
+    with open(os.path.join(entry_path, CACHE_FILE),'w') as cache_file:
+        json.dump({'key': key, 'directory': directory}, cache_file)
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Run a plan
+#
+#  context is {'nvme', 'volume', 'path', 'dir', 'target', 'tests', 'options', 'cache dir'}, steps are not cached if
+#  'cache dir' is None.  The steps are started and ended on this thread, only the step functions run on the worker
+#  threads.  Returns the number of tests that failed, a test asked for that is not in the plan counts as failed.
+#--------------------------------------------------------------------------------------------------------------------
+def run_plan(plan, context, max_workers=PLAN_WORKERS):
+
+    pending   = select_steps(plan, context['tests'], context['options'])
+    selected  = set(entry['id'] for entry in pending)
+    remaining = {}                                  # test number -> steps not ended
+    tests     = {}                                  # test number -> test from start_test
+    results   = {}                                  # step id -> (code, cache key)
+    resumed   = set()                               # steps that passed in the checkout being resumed
+    running   = {}                                  # future -> (entry, step, definition, key)
+    skipped   = set()                               # tests that passed in the checkout being resumed
+    drive     = {'busy': False}
+    errors    = 0
+    aborted   = False
+
+    context.setdefault('monitors', {})              # monitor-start step id -> monitor from start_monitor
+
+    # A test asked for that has no steps in the plan is failed rather than silently not run
+
+    plan_tests = set(test['number'] for test in plan['tests'])
+    for number in context['tests']:
+        if number not in plan_tests:
+            logger.error(f"ERROR:  Test {number} is not in the test plan")
+            errors += 1
+
+    for entry in pending:
+        remaining[entry['test']['number']] = remaining.get(entry['test']['number'], 0) + 1
+
+    def get_test(entry):
+
+        # A test with "resume": false runs all its steps again when resuming unless the whole test passed, for tests
+        # whose steps depend on each other while running, e.g. a monitor started in the first step.  Returns None if
+        # the test passed.
+
+        number = entry['test']['number']
+        resume = entry['test'].get('resume', True)
+        if number not in tests and number not in skipped:
+            if not resume and test_resumed(number, entry['test']['name'], context['dir']):
+                skipped.add(number)
+            else:
+                tests[number] = start_test(number, entry['test']['name'], context['dir'], resume)
+        return tests.get(number)
+
+    def end_plan_step(entry, step, code, key):
+        nonlocal errors, aborted
+
+        step['code'] = code
+        test = tests[entry['test']['number']]
+        test['errors'] += end_step(step)
+        results[entry['id']] = (code, key)
+
+        if code == 0 and entry['definition'].get('cache', False) and context.get('cache dir') is not None:
+            try:
+                save_step_cache(context, entry['id'], key, step['directory'])
+            except OSError:
+                logger.exception(f"Failed to save step {entry['id']} to the cache")
+
+        remaining[entry['test']['number']] -= 1
+        if remaining[entry['test']['number']] == 0:
+            errors += end_test(test)
+            if test['errors'] and entry['test'].get('abort on fail', False):
+                logger.info(f"\t Plan aborted because test {test['number']} failed")
+                aborted = True
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        while (len(pending) and not aborted) or len(running):
+
+            for entry in list(pending):
+                if aborted: break
+
+                need_results = [results.get(need) for need in entry['needs']]
+                if None in need_results: continue
+                if any(step_id in selected and step_id not in results for step_id in entry['after']): continue
+
+                uses_drive = STEP_TYPES[entry['definition']['type']][1]
+                if uses_drive and drive['busy']: continue
+
+                pending.remove(entry)
+                test = get_test(entry)
+
+                if test is None:
+                    results[entry['id']] = (0, "")
+                    resumed.add(entry['id'])
+                    remaining[entry['test']['number']] -= 1
+                    continue
+
+                step = start_step(entry['definition']['name'], test, entry['number'])
+
+                # A step whose needs failed is failed without running
+
+                if any(code != 0 for code,key in need_results):
+                    logger.info("\t Not run because a step it needs failed")
+                    end_plan_step(entry, step, 1, "")
+                    continue
+
+                values = {'nvme': context['nvme'], 'volume': context['volume'], 'path': context['path'],
+                          'target': context['target'], 'dir': step['directory']}
+                values.update({need: plan['ids'][need]['directory'] for need in entry['needs']})
+                entry['directory'] = step['directory']
+
+                try:
+                    definition = fill_values(entry['definition'], values)
+                    key        = step_cache_key(entry, definition, context, [key for code,key in need_results])
+                except Exception:
+                    logger.exception(f"Failed to fill in the values of step {entry['id']}")
+                    end_plan_step(entry, step, 1, "")
+                    continue
+
+                # A step that passed in the checkout being resumed is not run again unless a step it needs was
+
+                if step['resumed'] and all(need in resumed for need in entry['needs']):
+                    resumed.add(entry['id'])
+                    end_plan_step(entry, step, 0, key)
+                    continue
+
+                if (definition.get('cache', False) and context.get('cache dir') is not None and
+                    restore_step_cache(context, entry['id'], key, step['directory'])):
+                    logger.info("\t Cached:     inputs not changed since the step passed, using its cached logs")
+                    end_plan_step(entry, step, 0, key)
+                    continue
+
+                # The ctrl-c that stops a monitor also reaches this process, see stop_monitor
+
+                if definition['type'] == 'monitor-stop': signal.signal(signal.SIGINT, signal_handler)
+
+                function = STEP_TYPES[definition['type']][0]
+                future   = executor.submit(function, step, definition, context)
+                running[future] = (entry, step, definition, key)
+                if uses_drive: drive['busy'] = True
+
+            if len(running) == 0: continue
+
+            done,not_done = wait(list(running), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                entry, step, definition, key = running.pop(future)
+                if STEP_TYPES[definition['type']][1]: drive['busy'] = False
+                if definition['type'] == 'monitor-stop': signal.signal(signal.SIGINT, signal.default_int_handler)
+
+                try:
+                    code = future.result()
+                except Exception:
+                    logger.exception(f"Step {entry['id']} had unhandled exception:")
+                    code = 1
+
+                end_plan_step(entry, step, code, key)
+
+    # Tests stopped by an abort are ended with the steps that ran
+
+    for number,test in tests.items():
+        if remaining[number] != 0:
+            test['errors'] += 1
+            errors += end_test(test)
+
+    return errors
@@ -1,5 +1,8 @@
 #--------------------------------------------------------------------------------------------------------------------
 # Stand alone example python script that runs nvmecmd and generates a custom report file
+#
+# Fleet mode reads more than one drive (e.g. report.py 0 1 2 or report.py --all), or existing nvme.info.json files
+# (report.py --files <file> ...), in parallel and writes one table with a row per drive in csv, json or html format.
 #--------------------------------------------------------------------------------------------------------------------
 # Copyright(c) 2021 Joseph Jones
 #
@@ -21,7 +24,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #--------------------------------------------------------------------------------------------------------------------
-import sys,platform,subprocess,os,pathlib,logging,json,argparse
+import sys,platform,subprocess,os,pathlib,logging,json,argparse,csv,html
+from concurrent.futures import ThreadPoolExecutor
 from test import *
 from datetime import datetime
 
@@ -29,9 +33,76 @@ from datetime import datetime
 # Read the command line 
 #-------------------------------------------------------------------
 parser = argparse.ArgumentParser(description='create custom nvme report', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-parser.add_argument('nvme',type=int, nargs='?', default=0, help='NVMe drive number', metavar='#')
+parser.add_argument('nvme',type=int, nargs='*', default=[0], help='NVMe drive number, more than one drive creates a fleet report', metavar='#')
+parser.add_argument('--all',     default=False, action=argparse.BooleanOptionalAction, help="Fleet report on all NVMe drives")
+parser.add_argument('--files',   type=str, nargs="+", default=[], help='Fleet report from existing nvme.info.json files instead of reading drives', metavar='<file>')
+parser.add_argument('--format',  type=str, default='csv', choices=['csv','json','html'], help='Fleet report file format')
+parser.add_argument('--workers', type=int, default=16, help='Drives or files read at the same time in fleet mode', metavar='#')
 args = parser.parse_args()
 
+#-------------------------------------------------------------------
+# Fleet report
+#
+# One row per drive with the fields log_report displays (REPORT_FIELDS in test.py) and the PCI link
+#-------------------------------------------------------------------
+FLEET_FIELDS = REPORT_FIELDS + [('PCI Width',    'PCI Width'),
+                                ('PCI Speed',    'PCI Speed'),
+                                ('PCI Location', 'PCI Location')]
+
+REPORT_COLUMNS = ['Drive','Info File','Error'] + [name for name,parameter in FLEET_FIELDS]
+
+def report_row(drive, info_file, error=""):
+
+    row = {'Drive': drive, 'Info File': info_file, 'Error': error}
+    if error != "": return row
+
+    try:
+        info = NvmeInfo(info_file)
+        for name,parameter in FLEET_FIELDS:
+            row[name] = info.get(parameter, "")
+    except Exception as e:
+        row['Error'] = f"Failed to read {info_file}: {e}"
+
+    return row
+
+def read_drive_row(drive, working_directory):
+
+    drive_directory = os.path.join(working_directory, f"nvme{drive}")
+    os.makedirs(drive_directory, exist_ok=True)
+
+    nvmecmd_args =  [NVMECMD,                               # path to nvmecmd executable 
+                    f"{read_cmd_file}",                     # cmd file to read the NVMe information    
+                    "--dir",f"{drive_directory}",           # run in the drive directory
+                    "--nvme",f"{drive}"]                    # NVMe drive number.  e.g. 0 for nvme0 or physicaldrive0
+
+    info_file = os.path.join(drive_directory,"nvme.info.json")
+
+    if run_step_process(nvmecmd_args, drive_directory, 10) != 0:
+        return report_row(drive, info_file, "Failed to read information, verify drive number is correct")
+
+    return report_row(drive, info_file)
+
+def write_fleet_report(report_path, report_format, rows):
+
+    if report_format == 'json':
+        with open(report_path, 'w') as report_file:
+            json.dump({"drives": rows}, report_file, indent=2)
+
+    elif report_format == 'html':
+        with open(report_path, 'w') as report_file:
+            report_file.write("<html><body><table border='1'>\n")
+            report_file.write("<tr>" + "".join(f"<th>{html.escape(column)}</th>" for column in REPORT_COLUMNS) + "</tr>\n")
+            for row in rows:
+                report_file.write("<tr>" + "".join(f"<td>{html.escape(str(row.get(column,'')))}</td>" for column in REPORT_COLUMNS) + "</tr>\n")
+            report_file.write("</table></body></html>\n")
+
+    else:
+        with open(report_path, mode='w', newline='') as report_file:
+            csv_writer = csv.writer(report_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            csv_writer.writerow(REPORT_COLUMNS)
+            for row in rows:
+                csv_writer.writerow([row.get(column,"") for column in REPORT_COLUMNS])
+
 try:
     #-------------------------------------------------------------------
     # Define constants and create working directory
@@ -51,6 +122,31 @@ try:
     fileHandler.setFormatter(logFormatter)
     logger.addHandler(fileHandler)
     #-------------------------------------------------------------------
+    # Fleet report, drives or files are read in parallel
+    #-------------------------------------------------------------------
+    if args.all:
+        args.nvme = list_nvme_drives(os.path.join(working_directory,"nvme-list"))
+
+    if len(args.files) != 0 or len(args.nvme) > 1 or args.all:
+
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            if len(args.files) != 0:
+                rows = list(executor.map(lambda info_file: report_row("", os.path.abspath(info_file)), args.files))
+            else:
+                rows = list(executor.map(lambda drive: read_drive_row(drive, working_directory), args.nvme))
+
+        fleet_report_file = os.path.join(working_directory, f"fleet.{args.format}")
+        write_fleet_report(fleet_report_file, args.format, rows)
+
+        failed = [row for row in rows if row['Error'] != ""]
+        for row in failed:
+            logger.info(f" {row['Drive']} {row['Info File']}:  {row['Error']}")
+
+        logger.info(f" Fleet report on {len(rows) - len(failed)} of {len(rows)} drives: {fleet_report_file}")
+        os._exit(len(failed) != 0)
+
+    args.nvme = args.nvme[0]
+    #-------------------------------------------------------------------
     # Run nvmecmd
     #-------------------------------------------------------------------
     nvmecmd_args =  [NVMECMD,                               # path to nvmecmd executable 
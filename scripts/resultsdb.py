@@ -0,0 +1,157 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions that save checkout results to an SQLite database
+#
+#  Each checkout of a drive is a run.  Tests, steps, admin command sweeps and monitor totals are saved as they
+#  complete so the database has the same results as the log directories.  Runs are indexed by serial number, model
+#  and firmware, and tests by number, so trends across many runs are one query instead of a directory walk.
+#
+#  Example query:   SELECT runs.serial, tests.result, tests.run_time FROM tests JOIN runs ON runs.id = tests.run_id
+#                   WHERE runs.model = 'Samsung SSD 970 EVO 1TB' AND tests.number = 7
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import sqlite3,json
+from datetime import datetime
+from nvmeinfo import NvmeInfo
+
+DB_TIMEOUT_SEC = 60                     # parallel drive checkouts write to the same database
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY,
+    started     TEXT,
+    directory   TEXT,
+    nvme        INTEGER,
+    serial      TEXT,
+    model       TEXT,
+    firmware    TEXT
+);
+CREATE TABLE IF NOT EXISTS tests (
+    id          INTEGER PRIMARY KEY,
+    run_id      INTEGER REFERENCES runs(id),
+    number      INTEGER,
+    name        TEXT,
+    directory   TEXT,
+    started     TEXT,
+    result      TEXT,
+    errors      INTEGER,
+    run_time    REAL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    id          INTEGER PRIMARY KEY,
+    test_id     INTEGER REFERENCES tests(id),
+    name        TEXT,
+    directory   TEXT,
+    started     TEXT,
+    code        INTEGER,
+    run_time    REAL
+);
+CREATE TABLE IF NOT EXISTS sweeps (
+    id          INTEGER PRIMARY KEY,
+    step_id     INTEGER REFERENCES steps(id),
+    command     TEXT,
+    idle_ms     INTEGER,
+    avg_ms      REAL,
+    min_ms      REAL,
+    max_ms      REAL,
+    count       INTEGER,
+    percentiles TEXT
+);
+CREATE TABLE IF NOT EXISTS monitors (
+    id              INTEGER PRIMARY KEY,
+    step_id         INTEGER REFERENCES steps(id),
+    directory       TEXT,
+    samples         INTEGER,
+    max_temperature REAL,
+    tmt1_sec        REAL,
+    tmt2_sec        REAL,
+    warning_min     REAL,
+    critical_min    REAL,
+    busy_min        REAL,
+    data_read_gb    REAL,
+    data_written_gb REAL
+);
+CREATE INDEX IF NOT EXISTS runs_serial   ON runs(serial);
+CREATE INDEX IF NOT EXISTS runs_model    ON runs(model, firmware);
+CREATE INDEX IF NOT EXISTS runs_firmware ON runs(firmware);
+CREATE INDEX IF NOT EXISTS tests_number  ON tests(number, run_id);
+CREATE INDEX IF NOT EXISTS tests_run     ON tests(run_id);
+CREATE INDEX IF NOT EXISTS steps_test    ON steps(test_id);
+CREATE INDEX IF NOT EXISTS sweeps_step   ON sweeps(step_id);
+CREATE INDEX IF NOT EXISTS monitors_step ON monitors(step_id);
+'''
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Open the database and add rows.  Each function commits so the results are saved even if checkout is killed.
+#--------------------------------------------------------------------------------------------------------------------
+def open_results_db(db_path):
+
+    db = sqlite3.connect(db_path, timeout=DB_TIMEOUT_SEC, check_same_thread=False)     # saves are serialized by the caller
+    db.executescript(SCHEMA)
+    return db
+
+def add_run(db, nvme, directory):
+    with db:
+        return db.execute("INSERT INTO runs (started,directory,nvme) VALUES (?,?,?)", (now(), directory, nvme)).lastrowid
+
+def update_run_drive(db, run_id, info_file):
+
+    # Serial, model and firmware are read from the first nvme.info.json logged by the run
+
+    info = NvmeInfo(info_file)
+
+    with db:
+        db.execute("UPDATE runs SET serial=?, model=?, firmware=? WHERE id=?",
+                   (info['SN'].strip(), info['MN'].strip(), info['FR'].strip(), run_id))
+
+def add_test(db, run_id, test):
+    with db:
+        return db.execute("INSERT INTO tests (run_id,number,name,directory,started) VALUES (?,?,?,?,?)",
+                          (run_id, test['number'], test['name'], test['directory'], now())).lastrowid
+
+def end_test_row(db, test_id, result, errors, run_time):
+    with db:
+        db.execute("UPDATE tests SET result=?, errors=?, run_time=? WHERE id=?", (result, errors, run_time, test_id))
+
+def add_step(db, test_id, step):
+    with db:
+        return db.execute("INSERT INTO steps (test_id,name,directory,started) VALUES (?,?,?,?)",
+                          (test_id, step['name'], step['directory'], now())).lastrowid
+
+def end_step_row(db, step_id, code, run_time):
+    with db:
+        db.execute("UPDATE steps SET code=?, run_time=? WHERE id=?", (code, run_time, step_id))
+
+def add_sweep(db, step_id, command, idle_ms, histogram):
+    with db:
+        db.execute("INSERT INTO sweeps (step_id,command,idle_ms,avg_ms,min_ms,max_ms,count,percentiles) VALUES (?,?,?,?,?,?,?,?)",
+                   (step_id, command, idle_ms, histogram.mean, histogram.min if histogram.count else 0,
+                    histogram.max if histogram.count else 0, histogram.count, json.dumps(histogram.percentiles())))
+
+def add_monitor(db, step_id, directory, totals):
+    with db:
+        db.execute("INSERT INTO monitors (step_id,directory,samples,max_temperature,tmt1_sec,tmt2_sec,warning_min,critical_min,"
+                   "busy_min,data_read_gb,data_written_gb) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                   (step_id, directory, totals['samples'], totals['max temperature'], totals['tmt1'], totals['tmt2'],
+                    totals['warning time'], totals['critical time'], totals['busy time'], totals['data read'], totals['data written']))
@@ -0,0 +1,303 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple rules engine that verifies nvme.info.json files against nvmecmd rules files (*.rules.json)
+#
+#  Each rule has the format <parameter> <operator> <value>, e.g. "'Data Read' < 0.01 GB", the same as nvmecmd.  Rules
+#  are compiled once into Rule objects and can then check any number of info files already logged, so an archive of
+#  results can be checked against new rules without reading the drives again.
+#
+#  Numeric operators (<, <=, =, !=, >=, >) use units.  Values with units of the same kind (e.g. Sec and Min, or GB
+#  and MB) are converted before comparing.  String operators (match, not-match) compare the value as a string.
+#
+#  SampleRules checks a stream of monitor samples, live or from read.summary.json, and only checks the rules of the
+#  fields that changed since the prior sample, the other rules keep their prior result.  Each sample with a failing
+#  rule counts towards the fail limit of the cmd file and it stops at the limit.
+#
+#  Command line example:   python rules.py ../nvmecmd/errors.rules.json checkout --csv violations.csv
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import sys,os,argparse,logging,json,csv,re,glob,operator
+from nvmeinfo import NvmeInfo
+from summary import iter_summary_samples,read_summary_settings
+
+logger = logging.getLogger('nvme_logger')
+
+RULE_PATTERN   = re.compile(r"^\s*'(?P<parameter>[^']+)'\s+(?P<operator><=|>=|!=|<|>|=|not-match|match)\s+(?P<value>.*?)\s*$")
+NUMBER_PATTERN = re.compile(r"^\s*(?P<number>[-+]?[\d,]*\.?\d+(?:[eE][-+]?\d+)?)\s*(?P<unit>[^\s(]*)")
+
+NUMERIC_OPERATORS = {'<': operator.lt, '<=': operator.le, '=': operator.eq, '!=': operator.ne, '>=': operator.ge, '>': operator.gt}
+STRING_OPERATORS  = {'match': operator.eq, 'not-match': operator.ne}
+
+# Unit -> (kind, scale to base unit).  Units not listed are only compared to the same unit.
+
+UNITS = {'nS': ('time',1e-9), 'uS': ('time',1e-6), 'mS': ('time',1e-3), 'Sec': ('time',1.0), 'Min': ('time',60.0), 'Hours': ('time',3600.0),
+         'B': ('data',1.0), 'KB': ('data',1e3), 'MB': ('data',1e6), 'GB': ('data',1e9), 'TB': ('data',1e12), 'PB': ('data',1e15),
+         'KiB': ('data',2**10), 'MiB': ('data',2**20), 'GiB': ('data',2**30), 'TiB': ('data',2**40),
+         'mW': ('power',1e-3), 'W': ('power',1.0), 'Watts': ('power',1.0),
+         '%': ('percent',1.0)}
+
+def parse_number(text):
+    # Returns (number, unit) from a value such as "1,234.5 GB" or "5000 uS (5 mS)", or None if not a number
+
+    found = NUMBER_PATTERN.match(text)
+    if found is None: return None
+    return float(found.group('number').replace(',','')), found.group('unit')
+
+#--------------------------------------------------------------------------------------------------------------------
+#  A compiled rule
+#--------------------------------------------------------------------------------------------------------------------
+class Rule:
+
+    def __init__(self, text):
+
+        found = RULE_PATTERN.match(text)
+        if found is None:
+            raise ValueError(f"Rule is not <parameter> <operator> <value>: {text}")
+
+        self.text      = text
+        self.parameter = found.group('parameter')
+        self.operator  = found.group('operator')
+        self.expected  = found.group('value')
+
+        if self.operator in STRING_OPERATORS:
+            self.compare = STRING_OPERATORS[self.operator]
+            self.number  = None
+            return
+
+        self.compare = NUMERIC_OPERATORS[self.operator]
+        expected     = parse_number(self.expected)
+        if expected is None:
+            raise ValueError(f"Rule value is not a number: {text}")
+
+        self.number, self.unit = expected
+        self.kind, self.scale  = UNITS.get(self.unit, (self.unit, 1.0))
+
+    def value_number(self, value):
+        # Converts the value to the unit of the rule, returns None if it can't be
+
+        parsed = parse_number(value)
+        if parsed is None: return None
+
+        number, unit = parsed
+        if unit == self.unit or unit == "" or self.unit == "": return number
+
+        kind, scale = UNITS.get(unit, (unit, 1.0))
+        if kind != self.kind: return None
+        return number * scale / self.scale
+
+    def check(self, info):
+        # Returns None if the info passes the rule, otherwise the reason it failed
+
+        if self.parameter not in info:
+            return "parameter not found"
+
+        value = info[self.parameter]
+
+        if self.number is None:
+            if self.compare(value.strip(), self.expected): return None
+            return f"value is {value}"
+
+        number = self.value_number(value)
+        if number is None:
+            return f"value {value} can't be compared to {self.expected}"
+
+        if self.compare(number, self.number): return None
+        return f"value is {value}"
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Load rules files and verify info files
+#--------------------------------------------------------------------------------------------------------------------
+def load_rules(rules_file):
+
+    with open(rules_file) as json_file:
+        return [Rule(text) for text in json.load(json_file)['rules']]
+
+def find_info_files(paths):
+
+    # Files are used as is, directories are searched for *info.json files
+
+    info_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            info_files += sorted(glob.glob(os.path.join(path,'**','*info.json'), recursive=True))
+        else:
+            info_files.append(path)
+    return info_files
+
+def verify_info(info, rules):
+    violations = []
+    for rule in rules:
+        reason = rule.check(info)
+        if reason is not None: violations.append({'rule': rule.text, 'reason': reason})
+    return violations
+
+def verify_info_files(info_files, rules):
+
+    # Returns a list of (info file, violations)
+
+    results = []
+    for info_file in info_files:
+        try:
+            results.append((info_file, verify_info(NvmeInfo(info_file), rules)))
+        except Exception as e:
+            results.append((info_file, [{'rule': '', 'reason': f"Failed to read file: {e}"}]))
+    return results
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Check a stream of monitor samples
+#
+#  Samples are dicts of field name to value string, the same as read details.sample in read.summary.json or the live
+#  samples from read_live_samples.  A rule is only checked again when its field changed, otherwise its prior result is
+#  used, and a failing rule counts as a failure in every sample until the value passes, the same as nvmecmd.  Rules
+#  for fields not in the samples are not checked.  A fail limit of 0 never stops.
+#--------------------------------------------------------------------------------------------------------------------
+def read_fail_limit(cmd_file):
+    with open(cmd_file) as json_file:
+        return int(json.load(json_file).get('fail limit', 1))
+
+class SampleRules:
+
+    def __init__(self, rules, fail_limit=1):
+        self.fail_limit = fail_limit
+        self.failures   = 0
+        self.violations = []                    # (timestamp, rule text, reason)
+        self.last       = {}                    # field -> value in the prior sample
+        self.results    = {}                    # field -> [(rule, reason)] of the rules that failed for that value
+        self.fields     = {}                    # field -> rules using it
+        self.changed    = []                    # violations found by checking a rule again in the last sample
+
+        for rule in rules:
+            self.fields.setdefault(rule.parameter, []).append(rule)
+
+    @property
+    def failed(self):
+        return self.fail_limit > 0 and self.failures >= self.fail_limit
+
+    def check(self, sample):
+        # Returns the violations in this sample
+
+        violations   = []
+        self.changed = []
+
+        for field,field_rules in self.fields.items():
+            if field not in sample: continue                    # e.g. a log page not read by the monitor
+
+            value = sample[field]
+            if self.last.get(field) != value:
+                self.last[field]    = value
+                self.results[field] = [(rule, reason) for rule in field_rules if (reason := rule.check(sample)) is not None]
+                self.changed       += [(sample.get('timestamp',''), rule.text, reason) for rule,reason in self.results[field]]
+
+            for rule,reason in self.results[field]:
+                violations.append((sample.get('timestamp',''), rule.text, reason))
+                self.failures += 1
+                if self.failed: break
+
+            if self.failed: break
+
+        self.violations += violations
+        return violations
+
+    def __call__(self, sample):
+        # Abort check for run_monitored_process, logs violations when the value changes and is True once the fail
+        # limit is reached
+
+        self.check(sample)
+        for timestamp,text,reason in self.changed:
+            logger.info(f"\t Violation:  {timestamp}  {text}  ( {reason} )")
+        return self.failed
+
+def verify_samples(samples, rules, fail_limit=1):
+
+    # Returns the violations, stops at the first sample that reaches the fail limit
+
+    sample_rules = SampleRules(rules, fail_limit)
+    for sample in samples:
+        sample_rules.check(sample)
+        if sample_rules.failed: break
+    return sample_rules.violations
+
+def verify_summary_file(summary_file, rules, fail_limit=None):
+
+    # Uses the fail limit from the summary settings unless one is given
+
+    if fail_limit is None:
+        fail_limit = int(read_summary_settings(summary_file).get('read',{}).get('fail limit', 1))
+
+    return [{'rule': text, 'reason': f"{reason} at {timestamp}"} for timestamp,text,reason in
+            verify_samples(iter_summary_samples(summary_file), rules, fail_limit)]
+
+def write_violations_csv(csv_path, results):
+
+    with open(csv_path, mode='w', newline='') as violations_csv_file:
+        csv_writer = csv.writer(violations_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['File','Rule','Reason'])
+        for info_file,violations in results:
+            for violation in violations:
+                csv_writer.writerow([info_file,violation['rule'],violation['reason']])
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Verify info files from the command line
+#--------------------------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Verifies nvme.info.json files against a rules file', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('rules', type=str, help='Rules file (e.g. errors.rules.json)', metavar='<rules>')
+    parser.add_argument('paths', type=str, nargs='+', help='nvme.info.json or read.summary.json files, or directories to search for info files', metavar='<path>')
+    parser.add_argument('--csv', type=str, default='', help='Write the violations to this csv file', metavar='<file>')
+    parser.add_argument('--fail-limit', type=int, default=None, help='Fail limit for summary.json files, default is the limit the file was logged with', metavar='#')
+    args = parser.parse_args()
+
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+    try:
+        rules = load_rules(args.rules)
+    except Exception as e:
+        logger.error(f"Failed to load rules from {args.rules} with exception: {e}")
+        sys.exit(1)
+
+    # read.summary.json files are checked sample by sample, other files as nvme.info.json
+
+    files   = find_info_files(args.paths)
+    results = verify_info_files([file for file in files if not file.endswith("summary.json")], rules)
+
+    for summary_file in [file for file in files if file.endswith("summary.json")]:
+        try:
+            results.append((summary_file, verify_summary_file(summary_file, rules, args.fail_limit)))
+        except Exception as e:
+            results.append((summary_file, [{'rule': '', 'reason': f"Failed to read file: {e}"}]))
+
+    failed = 0
+    for info_file,violations in results:
+        if len(violations) == 0: continue
+        failed += 1
+        logger.info(f"\t {info_file}")
+        for violation in violations:
+            logger.info(f"\t    {violation['rule']:70} {violation['reason']}")
+
+    logger.info("")
+    logger.info(f"\t {len(results) - failed} of {len(results)} files passed {len(rules)} rules")
+
+    if args.csv != "":
+        write_violations_csv(args.csv, results)
+
+    sys.exit(failed != 0)
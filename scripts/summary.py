@@ -0,0 +1,428 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions for reading the nvmecmd read.summary.json file one entry at a time
+#
+#  Monitor runs can log a million samples so the summary file can be hundreds of MB.  Instead of loading the whole
+#  file with json.load these functions scan the file in chunks and only decode the entries asked for.  Memory use is
+#  bounded by the chunk size plus the size of one entry.
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import os,json,mmap,codecs,bisect
+from array import array
+from datetime import datetime
+
+try:
+    import numpy as np                          # optional, only used to decode many timestamps at once
+except ImportError:
+    np = None
+
+CHUNK_SIZE     = 1024*1024                      # characters read from the file at a time
+
+SAMPLE_PATH    = ('read details','sample')      # location of the samples in read.summary.json
+COMMAND_PATH   = ('command times',)             # location of the admin command times in read.summary.json
+SETTINGS_PATH  = ('_settings',)                 # location of the settings in read.summary.json
+
+INDEX_EVERY    = 1000                           # samples between entries in the sample index
+INDEX_SUFFIX   = ".index.json"                  # read.summary.json -> read.summary.index.json
+
+_NUMBER_CHARS  = '0123456789.eE+-'
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"       # format of the sample and command timestamps
+EPOCH            = datetime(1970,1,1)
+NS_IN_SEC        = 1000*1000*1000
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Chunked JSON scanner
+#
+#  Values are decoded with the C decoder from the buffer.  If a value runs past the end of the buffer the buffer is
+#  refilled and the decode retried.  Containers that still don't fit are walked one member at a time so skipping a
+#  large array never holds more than a couple of chunks, and reading one is not decoded again on every refill.
+#
+#  Object members named in skip, at any depth, are passed over without being kept.  A container is only walked one
+#  member at a time if a skipped name is in the buffer after it starts, otherwise it is decoded as usual.
+#--------------------------------------------------------------------------------------------------------------------
+class _JsonStream:
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE, skip=()):
+        self.file       = file
+        self.chunk_size = chunk_size
+        self.buffer     = ''
+        self.pos        = 0
+        self.offset     = 0                         # characters before the buffer, offset + pos is the file position
+        self.eof        = False
+        self.decoder    = json.JSONDecoder()
+        self.skip       = set(skip)
+        self._markers   = [json.dumps(name) for name in self.skip]
+        self._next_skip = None                      # buffer position of the next skipped name, found when needed
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buffer  = self.buffer[self.pos:] + chunk
+        self.pos     = 0
+        self._next_skip = None
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError(f"Unexpected end of file in {self.file.name}")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' but found '{self.buffer[self.pos]}' in {self.file.name}")
+        self.pos += 1
+
+    def _decode(self):
+        # Returns the value at the current position or raises ValueError if it runs past the end of the buffer.
+        # A number cut by the end of the buffer still decodes (e.g. "0." from "0.25") so a value followed by the end
+        # of the buffer or a number character is treated as incomplete.
+
+        value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        if not self.eof and (end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS):
+            raise ValueError("Value may continue in the next chunk")
+        self.pos = end
+        return value
+
+    def _skip_ahead(self):
+        # True if a skipped name is in the buffer after the current position
+
+        if not self._markers: return False
+        if self._next_skip is None or self._next_skip < self.pos:
+            found = [position for position in (self.buffer.find(marker, self.pos) for marker in self._markers) if position >= 0]
+            self._next_skip = min(found) if found else len(self.buffer)
+        return self._next_skip < len(self.buffer)
+
+    def read_value(self):
+        char = self.peek()
+        for attempt in range(2):
+            if char in '{[' and self._skip_ahead(): break
+            try:
+                return self._decode()
+            except ValueError:
+                if not self._fill(): raise
+
+        if char not in '{[':
+            while True:
+                try:
+                    return self._decode()
+                except ValueError:
+                    if not self._fill(): raise
+
+        # Container is bigger than the buffer or has skipped members, decode the members one at a time
+
+        self.pos += 1
+        value = {} if char == '{' else []
+
+        while self.peek() != ('}' if char == '{' else ']'):
+            if char == '{':
+                name = self.read_value()
+                self.expect(':')
+                if name in self.skip: self.skip_value()
+                else: value[name] = self.read_value()
+            else:
+                value.append(self.read_value())
+            if self.peek() == ',': self.pos += 1
+
+        self.pos += 1
+        return value
+
+    def skip_value(self):
+        char = self.peek()
+        for attempt in range(2):
+            try:
+                self._decode()
+                return
+            except ValueError:
+                if not self._fill(): raise
+
+        if char not in '{[':
+            self.read_value()
+            return
+
+        # Container is bigger than the buffer, walk the members instead
+
+        self.pos += 1
+        close = '}' if char == '{' else ']'
+
+        while self.peek() != close:
+            if char == '{':
+                self.read_value()
+                self.expect(':')
+            self.skip_value()
+            if self.peek() == ',': self.pos += 1
+
+        self.pos += 1
+
+    def find(self, path):
+        # Moves to the value at path, a list of object keys, and returns False if the path does not exist
+
+        for key in path:
+            if self.peek() != '{': return False
+            self.pos += 1
+
+            while True:
+                if self.peek() == '}': return False
+                name = self.read_value()
+                self.expect(':')
+                if name == key: break
+                self.skip_value()
+                if self.peek() == ',': self.pos += 1
+
+        return True
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Read one value or iterate over one array in a large JSON file
+#--------------------------------------------------------------------------------------------------------------------
+def read_json_value(file_path, path, default=None, chunk_size=CHUNK_SIZE, skip=()):
+
+    with open(file_path) as json_file:
+        stream = _JsonStream(json_file, chunk_size, skip)
+        if not stream.find(path): return default
+        return stream.read_value()
+
+def iter_json_array(file_path, path):
+
+    with open(file_path) as json_file:
+        stream = _JsonStream(json_file)
+        if not stream.find(path) or stream.peek() != '[': return
+        stream.pos += 1
+
+        while stream.peek() != ']':
+            yield stream.read_value()
+            if stream.peek() == ',': stream.pos += 1
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Short hand for the entries in read.summary.json
+#--------------------------------------------------------------------------------------------------------------------
+def iter_summary_samples(file_path):
+    return iter_json_array(file_path, SAMPLE_PATH)
+
+def iter_summary_command_times(file_path):
+    return iter_json_array(file_path, COMMAND_PATH)
+
+def read_summary_settings(file_path):
+    return read_json_value(file_path, SETTINGS_PATH, {})
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Sample index
+#
+#  The index is a sidecar file with the timestamp and byte offset of every INDEX_EVERY sample.  To read a time window
+#  the file is memory mapped and decoding starts at the last indexed sample before the window, so only the samples
+#  near the window are decoded.  The index is built the first time it is needed and rebuilt if the summary file has
+#  changed.  It is built by reading the file as latin-1 so each character is one byte and positions are offsets.
+#--------------------------------------------------------------------------------------------------------------------
+class _MappedText:
+
+    # Text file interface over part of a memory map, enough for _JsonStream
+
+    def __init__(self, mapped, offset, encoding, name):
+        self.mapped   = mapped
+        self.position = offset
+        self.decoder  = codecs.getincrementaldecoder(encoding)()
+        self.name     = name
+
+    def read(self, size):
+        data = self.mapped[self.position:self.position + size]
+        self.position += len(data)
+        return self.decoder.decode(data, final=(len(data) == 0))
+
+def sample_index_path(file_path):
+    return os.path.splitext(file_path)[0] + INDEX_SUFFIX
+
+def build_sample_index(file_path, every=INDEX_EVERY):
+
+    status = os.stat(file_path)
+    index  = {'size': status.st_size, 'modified ns': status.st_mtime_ns, 'every': every, 'timestamps': [], 'offsets': []}
+
+    with open(file_path, 'rb') as summary_file, mmap.mmap(summary_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        stream = _JsonStream(_MappedText(mapped, 0, 'latin-1', file_path))
+
+        if stream.find(SAMPLE_PATH) and stream.peek() == '[':
+            stream.pos += 1
+
+            count = 0
+            while stream.peek() != ']':
+                offset = stream.offset + stream.pos
+                sample = stream.read_value()
+                if count % every == 0:
+                    index['timestamps'].append(timestamp_ns(sample['timestamp']))
+                    index['offsets'].append(offset)
+                count += 1
+                if stream.peek() == ',': stream.pos += 1
+
+            index['samples'] = count
+
+    with open(sample_index_path(file_path), 'w') as index_file:
+        json.dump(index, index_file)
+
+    return index
+
+def load_sample_index(file_path):
+
+    try:
+        with open(sample_index_path(file_path)) as index_file:
+            index = json.load(index_file)
+
+        status = os.stat(file_path)
+        if index['size'] == status.st_size and index['modified ns'] == status.st_mtime_ns: return index
+    except (OSError, ValueError, KeyError):
+        pass
+
+    return build_sample_index(file_path)
+
+def iter_summary_window(file_path, start_ns=None, stop_ns=None):
+
+    # Yields the samples with start_ns <= timestamp < stop_ns, times from timestamp_ns, None for no limit
+
+    index = load_sample_index(file_path)
+    if len(index['offsets']) == 0: return
+
+    entry = 0 if start_ns is None else max(bisect.bisect_right(index['timestamps'], start_ns) - 1, 0)
+
+    with open(file_path, 'rb') as summary_file, mmap.mmap(summary_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        stream = _JsonStream(_MappedText(mapped, index['offsets'][entry], 'utf-8', file_path))
+
+        while stream.peek() != ']':
+            sample = stream.read_value()
+            if stream.peek() == ',': stream.pos += 1
+
+            sample_ns = timestamp_ns(sample['timestamp'])
+            if stop_ns is not None and sample_ns >= stop_ns: return
+            if start_ns is None or sample_ns >= start_ns: yield sample
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Decode nvmecmd value strings
+#
+#  nvmecmd logs values as strings such as "1,234 Sec" or "12.345 GB".  The number type and unit of a field are found
+#  from the first value decoded and then reused for every later sample of that field.
+#--------------------------------------------------------------------------------------------------------------------
+class SampleDecoder:
+
+    def __init__(self):
+        self.formats = {}                                   # field name -> [int or float, unit]
+
+    def decode(self, field, text):
+        number, _, unit = text.partition(' ')
+        if ',' in number: number = number.replace(',','')
+
+        value_format = self.formats.get(field)
+        if value_format is None:
+            value_format = self.formats[field] = [float if '.' in number else int, unit]
+
+        try:
+            return value_format[0](number)
+        except ValueError:
+            value_format[0] = float                         # field printed without decimals the first time
+            return float(number)
+
+    def unit(self, field):
+        return self.formats[field][1] if field in self.formats else ''
+
+    def decode_sample(self, sample, fields):
+        return [self.decode(field, sample[field]) for field in fields]
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Decode nvmecmd timestamps
+#
+#  Timestamps have a fixed format, e.g. "2021-10-01 10:00:00.123456".  Only the date, hour and minute are decoded with
+#  strptime, once per minute, and cached.  The seconds and fraction are added as integers.  Times are nanoseconds
+#  since 1970 in the same (local) time zone as the timestamps.
+#
+#  If numpy is installed, decode_all decodes every timestamp at once from the digit characters, which is much faster
+#  for a million samples.  Timestamps not in the exact format are decoded one at a time instead.
+#--------------------------------------------------------------------------------------------------------------------
+TIMESTAMP_LENGTH   = 26                                     # length of "%Y-%m-%d %H:%M:%S.%f"
+TIMESTAMP_TEMPLATE = b"0000-00-00 00:00:00.000000"
+
+class TimestampDecoder:
+
+    def __init__(self):
+        self.minutes = {}                                   # "YYYY-MM-DD HH:MM" -> nanoseconds
+
+    def decode(self, text):
+        minute_ns = self.minutes.get(text[:16])
+        if minute_ns is None:
+            delta = datetime.strptime(text[:16], "%Y-%m-%d %H:%M") - EPOCH
+            minute_ns = self.minutes[text[:16]] = (delta.days * 86400 + delta.seconds) * NS_IN_SEC
+
+        if text[16] != ':': raise ValueError(f"Timestamp is not {TIMESTAMP_FORMAT}: {text}")
+
+        seconds, _, fraction = text[17:].partition('.')
+        return minute_ns + int(seconds) * NS_IN_SEC + int(fraction.ljust(9,'0')[:9])
+
+    def decode_all(self, texts):
+        texts = list(texts)
+
+        if np is not None and len(texts):
+            decoded = _decode_timestamps_numpy(texts)
+            if decoded is not None: return decoded
+
+        decode = self.decode
+        return array('q', [decode(text) for text in texts])
+
+def _decode_timestamps_numpy(texts):
+
+    # Returns None if any timestamp is not exactly "YYYY-MM-DD HH:MM:SS.ffffff"
+
+    try:
+        joined = ''.join(texts).encode('ascii')
+    except UnicodeEncodeError:
+        return None
+    if len(joined) != len(texts) * TIMESTAMP_LENGTH: return None
+
+    # Subtracting the template leaves 0-9 in the digit columns and 0 in the separator columns
+
+    template = np.frombuffer(TIMESTAMP_TEMPLATE, dtype=np.uint8)
+    values   = np.frombuffer(joined, dtype=np.uint8).reshape(-1, TIMESTAMP_LENGTH) - template
+    if (values > np.where(template == ord('0'), 9, 0)).any(): return None
+
+    def number(first, last):
+        value = np.zeros(len(texts), dtype=np.int64)
+        for column in range(first, last):
+            value = value * 10 + values[:,column]
+        return value
+
+    months = (number(0,4) - 1970) * 12 + number(5,7) - 1
+    days   = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + number(8,10) - 1
+    ns     = ((days * 24 + number(11,13)) * 60 + number(14,16)) * 60 + number(17,19)
+    ns     = ns * NS_IN_SEC + number(20,26) * 1000
+
+    return array('q', ns.tobytes())
+
+_timestamp_decoder = TimestampDecoder()
+
+def timestamp_ns(text):
+    return _timestamp_decoder.decode(text)
+
+def timestamps_ns(texts):
+    return _timestamp_decoder.decode_all(texts)
+
+def read_sample_timestamps(file_path):
+    # Timestamps of every sample in read.summary.json as an array of nanoseconds
+    return timestamps_ns(sample['timestamp'] for sample in iter_summary_samples(file_path))
@@ -0,0 +1,139 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple class that decides how long to sample each idle time of a latency sweep
+#
+#  Each idle time is sampled in batches (e.g. one nvmecmd run of 20 samples or one 30 second fio run).  An idle time
+#  is done once the 95% confidence interval of its mean latency is within TARGET_CI of the mean, or it reached the
+#  most batches allowed.  When every idle time is done, idle times are added half way between neighbours whose mean
+#  latency changed by more than STEP_CHANGE, e.g. around the APST entry time, and those are sampled the same way.
+#
+#  The class only keeps the results, the caller runs the batches:
+#
+#      sweep = AdaptiveSweep([0,10,100,1000], max_batches=10)
+#      while (batch := sweep.next_batch()) is not None:
+#          interval, number = batch
+#          ... run the batch ...
+#          sweep.add_batch(interval, histogram, stddev)
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import logging,math
+from latency import LatencyHistogram
+
+logger = logging.getLogger('nvme_logger')
+
+MIN_BATCHES  = 2                        # batches sampled before an idle time can be done
+CONFIDENCE_Z = 1.96                     # 95% confidence
+TARGET_CI    = 0.05                     # done when the confidence interval is within 5% of the mean
+STEP_CHANGE  = 0.5                      # add an idle time between neighbours whose mean changed by more than 50%
+MIN_GAP_MS   = 2                        # don't add idle times between neighbours closer than this
+MAX_POINTS   = 32                       # most idle times in one sweep
+
+def admin_sweep_samples(interval):
+    # nvmecmd samples for one idle time of a fixed admin command sweep
+    return 100 if interval > 999 else 200
+
+class AdaptiveSweep:
+
+    def __init__(self, idle_times_ms, max_batches, min_batches=MIN_BATCHES, target_ci=TARGET_CI, step_change=STEP_CHANGE,
+                 min_gap_ms=MIN_GAP_MS, max_points=MAX_POINTS):
+
+        # max_batches is a number or a function of the idle time, e.g. fewer batches for long idle times
+
+        self.max_batches = max_batches if callable(max_batches) else (lambda interval: max_batches)
+        self.min_batches = min_batches
+        self.target_ci   = target_ci
+        self.step_change = step_change
+        self.min_gap_ms  = min_gap_ms
+        self.max_points  = max_points
+        self.points      = {}                   # idle time -> sampling state
+
+        for interval in idle_times_ms:
+            self.add_point(interval)
+
+    def add_point(self, interval):
+        self.points[interval] = {'histogram': LatencyHistogram(), 'count': 0, 'mean': 0.0, 'm2': 0.0, 'batches': 0, 'done': False}
+
+    def next_batch(self):
+
+        # Returns (idle time, batch number) of the next batch to run, or None when the sweep is done
+
+        for attempt in range(2):
+            for interval in sorted(self.points):
+                point = self.points[interval]
+                if not point['done']: return interval, point['batches']
+
+            if len(self.refine()) == 0: return None
+
+        return None
+
+    def add_batch(self, interval, histogram, stddev):
+
+        # The mean and variance of the batch are combined with the prior batches (Chan et al. parallel algorithm)
+
+        point = self.points[interval]
+        point['histogram'].merge(histogram)
+        point['batches'] += 1
+
+        count = histogram.count
+        if count:
+            total = point['count'] + count
+            delta = histogram.mean - point['mean']
+            point['m2']    += stddev * stddev * (count - 1) + delta * delta * point['count'] * count / total
+            point['mean']  += delta * count / total
+            point['count']  = total
+
+        point['done'] = self.converged(point) or point['batches'] >= self.max_batches(interval)
+
+    @staticmethod
+    def half_width(point):
+        # Half width of the confidence interval of the mean
+        if point['count'] < 2: return math.inf
+        return CONFIDENCE_Z * math.sqrt(point['m2'] / (point['count'] - 1) / point['count'])
+
+    def converged(self, point):
+        return point['batches'] >= self.min_batches and self.half_width(point) <= self.target_ci * point['mean']
+
+    def refine(self):
+
+        # Adds idle times between neighbours with a large change in mean latency, returns the idle times added
+
+        added     = []
+        intervals = sorted(self.points)
+
+        for low,high in zip(intervals, intervals[1:]):
+            if len(self.points) + len(added) >= self.max_points: break
+
+            low_mean, high_mean = self.points[low]['mean'], self.points[high]['mean']
+            if self.points[low]['count'] == 0 or self.points[high]['count'] == 0: continue
+            if abs(high_mean - low_mean) <= self.step_change * min(low_mean, high_mean): continue
+            if high - low < 2 * self.min_gap_ms: continue
+
+            added.append((low + high) // 2)
+            logger.info(f"\t    Adding idle time {added[-1]}mS, latency changed from {low_mean:.2f}mS at {low}mS to {high_mean:.2f}mS at {high}mS")
+
+        for interval in added:
+            self.add_point(interval)
+
+        return added
+
+    def results(self):
+        # (idle time, histogram) in idle time order
+        return [(interval, self.points[interval]['histogram']) for interval in sorted(self.points)]
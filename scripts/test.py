@@ -21,8 +21,19 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #--------------------------------------------------------------------------------------------------------------------
-import sys,platform,subprocess,time,os,pathlib,logging,json,shutil,glob,signal,csv 
+import sys,platform,subprocess,time,os,pathlib,logging,json,shutil,glob,signal,csv,asyncio,threading 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from summary import iter_summary_samples,iter_summary_command_times,timestamp_ns,timestamps_ns
+from monitor import MonitorSeries,read_live_samples,wait_for_steady_state,increase_check,LIVE_POLL_SEC
+from rules import SampleRules,load_rules,read_fail_limit
+from latency import LatencyHistogram,PERCENTILES,histogram_path,save_histograms
+from sweep import AdaptiveSweep,admin_sweep_samples
+from fioresult import DIRECTIONS,FIO_PERCENTILES,read_fio_result,fio_histograms,write_fio_csv
+from nvmeinfo import NvmeInfo
+from columnar import columns_path,write_columns
+from fiotarget import FILL_PATTERNS,cached_target,new_target_metadata,save_target_metadata,record_target_workload,remove_target
+from resultsdb import open_results_db,add_run,update_run_drive,add_test,end_test_row,add_step,end_step_row,add_sweep,add_monitor
 
 logFormatter = logging.Formatter("[%(asctime)s]  %(message)s")
 logger = logging.getLogger('nvme_logger')
@@ -35,7 +46,10 @@ TEST_CASE_EXCEPTION = 2
 USAGE_ERROR_CODE    = 16
 READINFO_FAIL_CODE  = 21
 
+PROCESS_OUTPUT_LIMIT = 64*1024        # bytes of stdout and stderr kept by the asyncio process functions
+
 NS_IN_MS     = 1000*1000
+NS_IN_SEC    = 1000*1000*1000
 MS_IN_SEC    = 1000
 MS_IN_MIN    = 60*1000
 MS_IN_HR     = 60*60*1000
@@ -69,10 +83,142 @@ else:
     FIO_ASYNC_IO = "libaio"
     DEFAULT_VOLUME = '/'
 
+#--------------------------------------------------------------------------------------------------------------------
+# Output options
+#
+# If 'columns' is True the monitor, admin command and sweep results are also saved as .columns files (see columnar.py)
+# next to the csv files.
+#--------------------------------------------------------------------------------------------------------------------
+output_options = {'columns': False}
+
+#--------------------------------------------------------------------------------------------------------------------
+# Results database
+#
+# If start_results_run is called the tests, steps, sweeps and monitor totals are also saved to an SQLite database.
+# results_run holds the database connection and the id of the current run and step.  A database error is logged but
+# does not fail the test.  Saves are serialized by results_lock so steps running on other threads (see plan.py) can
+# save results.
+#--------------------------------------------------------------------------------------------------------------------
+results_run  = {}
+results_lock = threading.Lock()
+
+def start_results_run(db_path, nvme, directory):
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        results_run['db']    = open_results_db(db_path)
+        results_run['run']   = add_run(results_run['db'], nvme, directory)
+        results_run['drive'] = False
+        results_run['step']  = None
+    except:
+        logger.exception(f"Failed to open results database {db_path}")
+        results_run.clear()
+
+def save_to_results_db(save, *save_args):
+
+    if 'db' not in results_run: return None
+
+    try:
+        with results_lock:
+            return save(results_run['db'], *save_args)
+    except:
+        logger.exception("Failed to save results to the results database")
+        return None
+
+#--------------------------------------------------------------------------------------------------------------------
+# Checkpoint journal
+#
+# If start_checkpoint is called each step and test that ends is added to checkpoint.jsonl in the results directory,
+# one json line each, and flushed to disk so the journal survives a crash or reboot.  With resume the journal of the
+# prior run is read first and:
+#
+#   test_resumed() returns True for a test that passed, the caller skips the test and the prior result is kept
+#   start_step() sets step['resumed'] for a step that passed, the caller skips the step and uses its logs
+#
+# Once a step of a test runs again the later steps of that test run again too because they may use its logs.  The
+# logs of a step that runs again are removed first.
+#--------------------------------------------------------------------------------------------------------------------
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+checkpoint = {}
+
+def read_checkpoint(file_path):
+
+    entries = []
+    try:
+        with open(file_path) as checkpoint_file:
+            for line in checkpoint_file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass                                    # last line cut short by the crash
+    except OSError:
+        pass
+
+    return entries
+
+def start_checkpoint(directory, resume=False):
+
+    checkpoint.clear()
+    checkpoint['file']   = os.path.join(directory, CHECKPOINT_FILE)
+    checkpoint['resume'] = resume
+    checkpoint['tests']  = {}
+    checkpoint['steps']  = {}
+
+    if not resume: return
+
+    # Later lines replace earlier ones, e.g. a step that failed and then passed when resumed
+
+    for entry in read_checkpoint(checkpoint['file']):
+        if entry['type'] == 'test':
+            checkpoint['tests'][(entry['number'], entry['name'])] = entry
+        else:
+            checkpoint['steps'][(entry['test'], entry['number'], entry['name'])] = entry
+
+    logger.info(f" Resuming {directory}, {len(checkpoint['steps'])} steps in the checkpoint journal")
+    logger.info("")
+
+def save_checkpoint(entry):
+
+    if 'file' not in checkpoint: return
+
+    try:
+        with open(checkpoint['file'],'a') as checkpoint_file:
+            checkpoint_file.write(json.dumps({**entry, 'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}) + "\n")
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+    except:
+        logger.exception(f"Failed to save checkpoint to {checkpoint['file']}")
+
+def test_resumed(test_number, test_name, test_dir):
+
+    if not checkpoint.get('resume', False): return False
+
+    entry = checkpoint['tests'].get((test_number, test_name))
+    if entry is None or entry['result'] != "PASS": return False
+
+    logger.info(f" +--------------------------------------------------------------------------------------------------------------------------+ ")
+    logger.info(f" | Test {test_number:2} : {test_name:110} |")
+    logger.info(f" +--------------------------------------------------------------------------------------------------------------------------+ ")
+    logger.info(f"      Resumed:  passed {entry['time']} in the prior run ( {entry['run time']:.3f} seconds )")
+    logger.info(" ")
+
+    test_results.append({name: entry[name] for name in ["number","name","result","errors","run time"]})
+    write_test_results(os.path.join(f"{test_dir}","results.json") if test_dir != "" else "")
+    return True
+
 #--------------------------------------------------------------------------------------------------------------------
 # Start and end a test
+#
+# The result of each test is saved in test_results and, if a test directory was specified, in results.json in that
+# directory so other scripts (e.g. multi-drive checkout) can read the results.
+#
+# Steps of a test started with resume_steps=False always run again when resuming, for tests whose steps depend on
+# each other while running, e.g. a monitor started in the first step and stopped in the last.
 #--------------------------------------------------------------------------------------------------------------------
-def start_test(test_number, test_name, test_dir):
+test_results = []
+
+def start_test(test_number, test_name, test_dir, resume_steps=True):
 
     test = {}
     test["number"]    = test_number
@@ -80,6 +226,7 @@ def start_test(test_number, test_name, test_dir):
     test["errors"]    = 0
     test["start"]     = time.perf_counter() 
     test['step']      = 0
+    test['resume']    = resume_steps and checkpoint.get('resume', False)
 
     now = datetime.now() 
 
@@ -90,12 +237,38 @@ def start_test(test_number, test_name, test_dir):
         test["directory"] = os.path.abspath( os.path.join(f"{test_dir}",f"Test{test_number}-{test_name}" ))
 
     test["logfile"]  = os.path.join(f"{test_dir}","summary.log")
+    test["results"]  = os.path.join(f"{test_dir}","results.json") if test_dir != "" else ""
+    test["db id"]    = save_to_results_db(add_test, results_run.get('run'), test)
     logger.info(f" +--------------------------------------------------------------------------------------------------------------------------+ ")
     logger.info(f" | Test {test_number:2} : {test_name:110} |")
     logger.info(f" +--------------------------------------------------------------------------------------------------------------------------+ ")
     return test
 
+def save_test_result(test):
+
+    test_results.append({"number"  : test["number"],
+                         "name"    : test["name"],
+                         "result"  : "FAILED" if test["errors"] != 0 else "PASS",
+                         "errors"  : test["errors"],
+                         "run time": round(time.perf_counter() - test["start"],3)})
+
+    result = test_results[-1]
+    save_to_results_db(end_test_row, test["db id"], result["result"], result["errors"], result["run time"])
+    save_checkpoint({"type": "test", **result})
+    write_test_results(test["results"])
+
+def write_test_results(results_path):
+
+    if results_path == "": return
+
+    try:
+        with open(results_path,'w') as results_file:
+            json.dump({"tests": test_results}, results_file, indent=2)
+    except:
+        logger.error(f"Failed to write test results to {results_path}")
+
 def end_test(test):
+    save_test_result(test)
     if (test["errors"] != 0):  
         logger.info("      **********************************************************************")
         logger.info(f"      ******************         Test {test['number']:2} : FAILED         ******************")
@@ -109,20 +282,40 @@ def end_test(test):
 #--------------------------------------------------------------------------------------------------------------------
 # Start and end a test step
 #--------------------------------------------------------------------------------------------------------------------
-def start_step(step_name, test):
-    test['step']      = test['step'] + 1
+def start_step(step_name, test, step_number=None):
+
+    # step_number is for steps that don't start in order (see plan.py), otherwise steps are numbered as they start
+
+    test['step']      = test['step'] + 1 if step_number == None else max(test['step'], step_number)
+    step_number       = test['step'] if step_number == None else step_number
 
     step = {}
-    step['directory'] = os.path.abspath(os.path.join(f"{test['directory']}",f"Step{test['step']}-{step_name}"))
+    step['directory'] = os.path.abspath(os.path.join(f"{test['directory']}",f"Step{step_number}-{step_name}"))
     step['name']      = step_name
+    step['test']      = test['number']
+    step['number']    = step_number
     step['logfile']   = test['logfile']
     step['start']     = time.perf_counter() 
     step['code']      = 0
+    step['resumed']   = False
+    step['db id']     = save_to_results_db(add_step, test['db id'], step)
+
+    if 'db' in results_run: results_run['step'] = step['db id']
+
+    if test['resume']:
+        entry = checkpoint['steps'].get((test['number'], step_number, step_name))
+        step['resumed'] = entry is not None and entry['code'] == 0
+        test['resume']  = step['resumed']
 
-    logger.info(f"      Step {test['step']} : {step_name}")
+    if checkpoint.get('resume', False) and not step['resumed']:
+        shutil.rmtree(step['directory'], ignore_errors=True)        # logs of the prior attempt
+
+    logger.info(f"      Step {step_number} : {step_name}")
     logger.info(" ")
     logger.info(f"\t Start:      {time.ctime()}")
     logger.info(f"\t Logs:       {step['directory']}")
+    if step['resumed']:
+        logger.info(f"\t Resumed:    passed in the prior run, using its logs")
     logger.info(" ")
 
     try:
@@ -139,6 +332,21 @@ def end_step(step):
 
     run_time = time.perf_counter() - step['start'] 
     logger.info(f"\t End:        {time.ctime()}  ( {run_time:.3f} seconds )")
+
+    save_to_results_db(end_step_row, step['db id'], step['code'], round(run_time,3))
+
+    if not step['resumed']:
+        save_checkpoint({"type": "step", "test": step['test'], "number": step['number'], "name": step['name'],
+                         "code": step['code'], "run time": round(run_time,3)})
+
+    # The drive is read from the first info file the run logs, steps such as the sweeps log it in a subdirectory
+
+    if results_run.get('drive') == False:
+        info_files = sorted(glob.glob(os.path.join(glob.escape(step['directory']),"**","nvme.info.json"), recursive=True),
+                            key=lambda path: (path.count(os.sep), path))
+        if info_files:
+            save_to_results_db(update_run_drive, results_run['run'], info_files[0])
+            results_run['drive'] = True
     
     if (step["code"] == 0):
         logger.info(f"\t Result:     Passed ")
@@ -149,6 +357,26 @@ def end_step(step):
         logger.info(" ")
         return 1
 #--------------------------------------------------------------------------------------------------------------------
+# List the NVMe drive numbers using the nvme list read by nvmecmd, entries are like the GUI drive list (e.g. "NVMe 0")
+#--------------------------------------------------------------------------------------------------------------------
+def list_nvme_drives(working_directory):
+
+    try:
+        os.makedirs(working_directory, exist_ok=True)
+        nvmecmd_args = [NVMECMD, os.path.join(NVMECMD_RESOURCES,'read.cmd.json'), "--dir", f"{working_directory}"]
+
+        if run_step_process(nvmecmd_args, working_directory, 30) != 0: return []
+
+        with open(os.path.join(working_directory,"nvme.info.json")) as info_file:
+            nvme_list = json.load(info_file)['_metadata']['system']['nvme list']
+
+        return [int(entry.split(" ")[1]) for entry in nvme_list]
+
+    except:
+        logger.exception("Failed to list the NVMe drives")
+        return []
+
+#--------------------------------------------------------------------------------------------------------------------
 # run, start and verify process
 #--------------------------------------------------------------------------------------------------------------------
 def run_step_process(args,cwd,timeout=None):
@@ -225,53 +453,338 @@ def verify_process(running_process,start_time,timeout=None):
         logger.exception('ERROR:  verify_process had unhandled exception:')
 
     return 1
+
+#--------------------------------------------------------------------------------------------------------------------
+# asyncio versions of run, start and verify process
+#
+# These let one thread run many nvmecmd and fio processes at once.  stdout and stderr are captured but only the last
+# output_limit bytes of each are kept.  The result is a dictionary with the return code, run time and output.
+#
+# On Windows the ctrl-c that stop_monitor sends to nvmecmd goes to every process on the console.  Processes started
+# with new_console, such as the checkout of each drive, get their own hidden console so the ctrl-c of one drive does
+# not stop the others.
+#--------------------------------------------------------------------------------------------------------------------
+def console_options(new_console):
+
+    if not new_console or platform.system() != "Windows": return {}
+
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags    |= subprocess.STARTF_USESHOWWINDOW
+    startupinfo.wShowWindow = subprocess.SW_HIDE
+    return {'creationflags': subprocess.CREATE_NEW_CONSOLE, 'startupinfo': startupinfo}
+
+async def _read_output(stream, output_limit):
+
+    output = bytearray()
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk: return bytes(output)
+        output += chunk
+        if len(output) > output_limit: del output[:len(output) - output_limit]
+
+async def start_step_process_async(args,cwd,output_limit=PROCESS_OUTPUT_LIMIT,new_console=False):
+
+    for index,arg in enumerate(args): 
+        if (index == 0): logger.debug(f"\t Process:  {arg}")
+        else:            logger.debug(f"\t           {arg}")
+
+    logger.debug(" ")   
+    start_time = time.perf_counter() 
+
+    try:
+        process = await asyncio.create_subprocess_exec(*args, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                                                       **console_options(new_console))
+    except:
+        logger.exception(f"Unhandled exception starting process {args[0]}")
+        return None
+
+    readers = asyncio.ensure_future(asyncio.gather(_read_output(process.stdout, output_limit), _read_output(process.stderr, output_limit)))
+
+    return {"process": process, "start": start_time, "readers": readers}
+
+async def verify_process_async(running_process,timeout=None):
+
+    result = {"code": 1, "run time": 0.0, "timeout": False, "stdout": b"", "stderr": b""}
+
+    try:
+        await asyncio.wait_for(running_process["process"].wait(), timeout)
+
+        result["code"]     = running_process["process"].returncode
+        result["run time"] = time.perf_counter() - running_process["start"]
+        result["stdout"],result["stderr"] = await running_process["readers"]
+
+        logger.debug(f"\t Run Time:      {result['run time']:.3f} seconds")
+        logger.debug(f"\t Return Code:   {result['code']}")
+        if (result["code"] != 0):
+            logger.debug(f"\t Result:        Process failed because returned code {result['code']}")
+        else:
+            logger.debug(f"\t Result:        PASSED")
+
+    except asyncio.TimeoutError:
+        result["timeout"]  = True
+        result["run time"] = time.perf_counter() - running_process["start"]
+        logger.debug(f"\t Run Time:      {result['run time']:.3f} seconds")
+        logger.debug(f"\t Result:        Process timed out.  Timeout value {timeout} seconds")
+    except:
+        logger.exception('ERROR:  verify_process_async had unhandled exception:')
+
+    return result
+
+async def run_step_process_async(args,cwd,timeout=None,output_limit=PROCESS_OUTPUT_LIMIT,new_console=False):
+
+    running_process = await start_step_process_async(args,cwd,output_limit,new_console)
+    if running_process == None:
+        return {"code": 1, "run time": 0.0, "timeout": False, "stdout": b"", "stderr": b""}
+
+    result = await verify_process_async(running_process,timeout)
+
+    if result["timeout"]:
+        running_process["process"].kill()
+        await running_process["process"].wait()
+        result["code"] = 1
+        try:
+            result["stdout"],result["stderr"] = await asyncio.wait_for(running_process["readers"], 10)
+        except asyncio.TimeoutError:
+            pass                                            # a child of the process still has the pipes open
+        logger.debug(f"\t Result:        Process was terminated")
+
+    logger.debug(" ")
+    return result
+
+def run_step_processes(processes,timeout=None,output_limit=PROCESS_OUTPUT_LIMIT,new_console=False):
+
+    # Runs a list of (args,cwd) processes at the same time and returns the list of results when all have finished
+
+    async def run_all():
+        return await asyncio.gather(*[run_step_process_async(args,cwd,timeout,output_limit,new_console) for args,cwd in processes])
+
+    return asyncio.run(run_all())
+
+def run_monitored_process(args,cwd,monitor_directory,abort_check,timeout=None):
+
+    # Runs a process, typically fio, while following the live monitor logging to monitor_directory.  Each new sample
+    # is passed to abort_check and the process is killed if it returns True.
+
+    step_process,start_time = start_step_process(args,cwd)
+    if step_process == None: return 1
+
+    seen = {}
+    read_live_samples(monitor_directory, seen)          # skip samples logged before the process started
+
+    while step_process.poll() == None:
+
+        for sample in read_live_samples(monitor_directory, seen):
+            if abort_check(sample):
+                os.kill(step_process.pid,signal.SIGKILL)
+                step_process.wait()
+                logger.info(f"\t Aborted:    {sample['timestamp']}  ( monitor sample failed the abort check )")
+                return 1
+
+        if timeout != None and (time.perf_counter() - start_time) > timeout:
+            os.kill(step_process.pid,signal.SIGKILL)
+            step_process.wait()
+            logger.debug(f"\t Result:        Process timed out and was terminated.  Timeout value {timeout} seconds")
+            return 1
+
+        time.sleep(LIVE_POLL_SEC)
+
+    return verify_process(step_process,start_time)
+
+def wait_for_drive(monitor_directory, nvmecmd_process, max_wait_sec, baseline_temperature=None):
+
+    # Waits for the drive to reach thermal steady state, see monitor.py, but no longer than max_wait_sec.  Needs the
+    # live monitor.  Returns the average temperature at the end of the wait to use as the baseline for later waits.
+
+    start_time    = time.perf_counter()
+    steady, state = wait_for_steady_state(monitor_directory, nvmecmd_process, max_wait_sec, baseline_temperature)
+
+    if steady:
+        logger.info(f"\t Steady state after {(time.perf_counter() - start_time):.0f} seconds at {state.temperature:.1f} C")
+    else:
+        logger.info(f"\t Steady state not reached after {(time.perf_counter() - start_time):.0f} seconds")
+
+    return state.temperature if state.temperature is not None else baseline_temperature
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions that run fio while nvmecmd monitors the drive
+#
+#  start_monitor() starts nvmecmd reading the cmd file, typically log page 2, every MONITOR_INTERVAL_MS until
+#  stop_monitor() and gives the drive startup_delay_sec to get a baseline, or with steady until it reaches thermal
+#  steady state.  Returns the monitor, or None if nvmecmd did not start or exited.
+#
+#  run_monitored_fio() runs fio, following the monitor with abort_check if not None, then lets the drive cool down
+#  for end_delay_sec, or with steady until it is back at the baseline.  Returns 0 if fio passed.
+#--------------------------------------------------------------------------------------------------------------------
+MONITOR_SAMPLES     = 1000000
+MONITOR_INTERVAL_MS = 2000
+
+def start_monitor(working_directory, nvme, cmd_file, startup_delay_sec, steady=False):
+
+    nvmecmd_args =  [NVMECMD,                         # path to nvmecmd executable defined in lib
+                    f"{cmd_file}",                    # cmd file to read log page 2 every few seconds until ctrl-c sent to app
+                    "--dir",f"{working_directory}",   # run in the working directory
+                    "--samples",f"{MONITOR_SAMPLES}", # set number of samples to read
+                    "--interval",f"{MONITOR_INTERVAL_MS}", # set interval in mS
+                    "--nvme",f"{nvme}"]               # NVMe drive number.  e.g. 0 for nvme0 or physicaldrive0
+
+    nvmecmd_process, nvmecmd_start_time = start_step_process(nvmecmd_args, working_directory)
+
+    if nvmecmd_process == None:
+        logger.error('>>>> FATAL ERROR: nvmecmd failed to start.  Verify nvmecmd installed correctly')
+        return None
+
+    monitor = {'process': nvmecmd_process, 'directory': working_directory, 'cmd file': cmd_file, 'baseline': None}
+
+    if steady:
+        monitor['baseline'] = wait_for_drive(working_directory, nvmecmd_process, startup_delay_sec)
+        exited = nvmecmd_process.poll() != None
+    else:
+        try:
+            nvmecmd_process.wait(startup_delay_sec)
+            exited = True
+        except subprocess.TimeoutExpired:
+            exited = False
+
+    if exited:
+        logger.error('>>>> FATAL ERROR: Test aborted because nvmecmd exited.  Verify NVMe drive number is correct')
+        return None
+
+    return monitor
+
+def run_monitored_fio(fio_args, working_directory, monitor, timeout, end_delay_sec, abort_check=None, steady=False):
+
+    if abort_check is not None:
+        code = run_monitored_process(fio_args, working_directory, monitor['directory'], abort_check, timeout)
+    else:
+        code = run_step_process(fio_args, working_directory, timeout)
+
+    if steady:
+        wait_for_drive(monitor['directory'], monitor['process'], end_delay_sec, monitor['baseline'])
+    else:
+        time.sleep(end_delay_sec)
+
+    return code
+
+def live_abort_check(cmd_file, live_rules=""):
+
+    # fio is aborted on critical temperature and, if live_rules is a rules file, once the monitor samples fail the
+    # rules the fail limit times in the monitor cmd file
+
+    critical_check = increase_check("Critical Composite Temperature Time")
+    if live_rules == "": return critical_check
+
+    rules_check = SampleRules(load_rules(live_rules), read_fail_limit(cmd_file))
+    return lambda sample: rules_check(sample) | critical_check(sample)
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple function that prepares the fio target file
+#
+#  The target is written with a sequential fill unless a target with the same volume, size and pattern is already
+#  there, see fiotarget.py.  With precondition the target is then random written until fio reports steady state
+#  IOPS, or precondition_sec.  This is done once for a target.  Returns 0 if the target is ready.
+#--------------------------------------------------------------------------------------------------------------------
+PRECONDITION_SS      = "iops_slope:2%"       # fio steady state, IOPS slope within 2% of the mean
+PRECONDITION_SS_DUR  = 300                   # seconds the steady state criteria must be met
+PRECONDITION_SS_RAMP = 60                    # seconds before checking for steady state
+
+def prepare_fio_target(target_file, volume, size, working_directory, pattern='random', reuse=True, precondition=False,
+                       fill_timeout=300, precondition_sec=1800):
+
+    fio_target_file = target_file.replace(":",r"\:")
+    metadata        = cached_target(target_file, volume, size, pattern) if reuse else None
+
+    if metadata is None:
+        logger.info(f"\t Writing fio target {target_file} ({size} {pattern})")
+        remove_target(target_file)
+
+        fill_args = [FIO,                             # path to fio executable
+                    "--name=fio-setup",               # name for job
+                    f"--ioengine={FIO_ASYNC_IO}",     # asynchronous IO engine (Window/Linux are different)
+                    "--direct=1",                     # non-buffered IO
+                    "--numjobs=1",                    # Number of threads
+                    "--thread",                       # Generate threads
+                    "--rw=write",                     # Access seq for speed
+                    "--iodepth=32",                   # Big queue depth for speed
+                    "--bs=1024k",                     # Big block size for speed
+                    "--output-format=json",           # Use json output so easy to read and parse later
+                    f"--output={os.path.join(working_directory,'fill.json')}",
+                    f"--filename={fio_target_file}",  # use one file so generated only once
+                    f"--size={size}"] + FILL_PATTERNS[pattern]
+
+        if run_step_process(fill_args, working_directory, fill_timeout): return 1
+
+        metadata = new_target_metadata(volume, size, pattern)
+        save_target_metadata(target_file, metadata)
+    else:
+        logger.info(f"\t Reusing fio target {target_file} ({size} {pattern}) created {metadata['created']}")
+
+    if not precondition: return 0
+
+    if metadata['preconditioned'] is not None:
+        logger.info(f"\t fio target preconditioned {metadata['preconditioned']}")
+        return 0
+
+    logger.info(f"\t Preconditioning fio target, up to {precondition_sec} seconds")
+
+    precondition_args = [FIO,
+                        "--name=fio-precondition",
+                        f"--ioengine={FIO_ASYNC_IO}",
+                        "--direct=1",
+                        "--numjobs=1",
+                        "--thread",
+                        "--rw=randwrite",                 # random write to reach steady state
+                        "--iodepth=32",
+                        "--bs=4k",
+                        "--norandommap",
+                        "--time_based",
+                        f"--runtime={precondition_sec}",  # upper bound, fio stops at steady state
+                        f"--steadystate={PRECONDITION_SS}",
+                        f"--ss_dur={PRECONDITION_SS_DUR}",
+                        f"--ss_ramp={PRECONDITION_SS_RAMP}",
+                        "--output-format=json",
+                        f"--output={os.path.join(working_directory,'precondition.json')}",
+                        f"--filename={fio_target_file}",
+                        f"--size={size}"] + FILL_PATTERNS[pattern]
+
+    if run_step_process(precondition_args, working_directory, precondition_sec + PRECONDITION_SS_RAMP + 60): return 1
+
+    metadata['preconditioned'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    save_target_metadata(target_file, metadata)
+    return 0
 #--------------------------------------------------------------------------------------------------------------------
 #  Simple function that parses fio data
 #--------------------------------------------------------------------------------------------------------------------
-def parse_fio_data(fio_file_paths,temp_fio_target_file):
+def parse_fio_data(fio_file_paths,temp_fio_target_file,csv_path=None):
 
     try:
  
         total_fio_data_read = 0
         total_fio_data_written = 0
         total_fio_run_time = 0
+        results = []
 
         for file in fio_file_paths:
-            ref_file = open(file) 
-            json_fio = json.load(ref_file) 
-            ref_file.close() 
-
-            fio_data_read = 0
-            fio_data_written = 0
-            read_bw = 0
-            write_bw = 0
-          
-            for job in range(len(json_fio['jobs'])):
-
-                job_data_read    =  float(json_fio['jobs'][job]['read']['io_bytes'])/BYTES_IN_GB  
-                job_data_written =  float(json_fio['jobs'][job]['write']['io_bytes'])/BYTES_IN_GB
-
-                fio_data_read += job_data_read    
-                fio_data_written +=  job_data_written 
-
-                if int(json_fio['jobs'][job]['read']['runtime']) != 0:
-                    read_bw += job_data_read / (int(json_fio['jobs'][job]['read']['runtime']) / MS_IN_SEC)
-
-                if int(json_fio['jobs'][job]['write']['runtime']) != 0:
-                    write_bw += job_data_written/ (int(json_fio['jobs'][job]['write']['runtime']) /MS_IN_SEC)
+            result = read_fio_result(file)
+            results.append(result)
                        
             width = 40
 
             logger.info("")
             logger.info(f"\t FIO file : {file}")
             logger.info("")
-            logger.info(f"\t {'   Data Read':{width}} {fio_data_read:.3f} GB  ({read_bw:.3f} GB/s)")
-            logger.info(f"\t {'   Data Written':{width}} {fio_data_written:.3f} GB  ({write_bw:.3f} GB/s)")  
-            logger.info(f"\t {'   Run Time':{width}} {int(json_fio['jobs'][0]['job options']['runtime'])} seconds")
+            logger.info(f"\t {'   Data Read':{width}} {result['read']['data gb']:.3f} GB  ({result['read']['bw gbs']:.3f} GB/s)")
+            logger.info(f"\t {'   Data Written':{width}} {result['write']['data gb']:.3f} GB  ({result['write']['bw gbs']:.3f} GB/s)")  
+            logger.info(f"\t {'   Run Time':{width}} {result['runtime sec']} seconds")
+
+            for direction in DIRECTIONS:
+                if result[direction]['count'] != 0:
+                    percentiles = "   ".join(f"P{percent}: {value:.3f} mS" for percent,value in result[direction]['percentiles'].items())
+                    logger.info(f"\t {'   ' + direction.title() + ' IOPS':{width}} {result[direction]['iops']:,.0f}")
+                    logger.info(f"\t {'   ' + direction.title() + ' Latency':{width}} {percentiles}")
+
+            save_histograms(histogram_path(file), fio_histograms(result))
 
-            total_fio_data_read += fio_data_read
-            total_fio_data_written += fio_data_written
-            total_fio_run_time += int(json_fio['jobs'][0]['job options']['runtime'])
+            total_fio_data_read += result['read']['data gb']
+            total_fio_data_written += result['write']['data gb']
+            total_fio_run_time += result['runtime sec']
 
         logger.info("")
         logger.info(f"\t FIO Total :")
@@ -281,11 +794,13 @@ def parse_fio_data(fio_file_paths,temp_fio_target_file):
         logger.info(f"\t {'   Run Time':{width}} {total_fio_run_time} seconds  ({(total_fio_run_time/60.0):.3f} Min)")
         logger.info("")
 
+        if csv_path is not None:
+            write_fio_csv(csv_path, results)
+
         return 0
     except:
         return 1
 
-
 #--------------------------------------------------------------------------------------------------------------------
 #  Simple function that stops nvmecmd and displays the SMART data change
 #--------------------------------------------------------------------------------------------------------------------
@@ -294,7 +809,8 @@ def signal_handler(sig, frame):
 
 def stop_monitor(monitor_directory,nvmecmd_process):
 
-    error_count = 0
+    error_count    = 0
+    on_main_thread = threading.current_thread() is threading.main_thread()
     try:
         
         # nvmecmd must still be running, if not report an error but still try and parse the file
@@ -306,70 +822,32 @@ def stop_monitor(monitor_directory,nvmecmd_process):
             error_count = 1
             logger.error(f"nvmecmd was not running when monitor was stopped.  nvmecmd returned code {exit_code}")
         else:
-            signal.signal(signal.SIGINT, signal_handler)
+            # The ctrl-c goes to every process on the console, including this one, so it is ignored here.  When more
+            # than one drive is tested each drive runs on its own console (see console_options).  Handlers can only be
+            # set on the main thread, a test plan stopping the monitor on a worker thread ignores the ctrl-c itself.
+
+            if on_main_thread: signal.signal(signal.SIGINT, signal_handler)
             logger.debug("sending ctrl-c to nvmecmd")
             os.kill(nvmecmd_process.pid,signal.CTRL_C_EVENT)
             logger.debug("waiting for nvmecmd to exit")
             return_code = nvmecmd_process.wait(10)
             logger.debug(f"nvmecmd returned code {return_code}")
         #-------------------------------------------------------------------
-        # Create csv monitor file  
+        # Create csv monitor file, each sample is decoded once into the
+        # numeric columns of the monitor series
         #-------------------------------------------------------------------  
-        ref_file = open(os.path.join(monitor_directory,"read.summary.json")) 
-        monitor_data = json.load(ref_file) 
-        ref_file.close() 
-  
-        last_sample = len(monitor_data['read details']['sample']) - 1
-
-        sample_rate_sec = float(monitor_data['_settings']['read']['interval in ms']) / MS_IN_SEC
-
-        max_temp = int(monitor_data['read details']['sample'][0]["Composite Temperature"].split()[0].replace(',',''))
- 
-        tmt1 = int(monitor_data['read details']['sample'][0]["Thermal Management Temperature 1 Time"].split()[0].replace(',',''))
-        tmt2 = int(monitor_data['read details']['sample'][0]["Thermal Management Temperature 2 Time"].split()[0].replace(',',''))
-        wt   = int(monitor_data['read details']['sample'][0]["Warning Composite Temperature Time"].split()[0].replace(',',''))
-        ct   = int(monitor_data['read details']['sample'][0]["Critical Composite Temperature Time"].split()[0].replace(',',''))
-        dw   = float(monitor_data['read details']['sample'][0]["Data Written"].split()[0].replace(',',''))
-        dr   = float(monitor_data['read details']['sample'][0]["Data Read"].split()[0].replace(',',''))
-        bt   = int(monitor_data['read details']['sample'][0]["Controller Busy Time"].split()[0].replace(',',''))
-
-        total_tmt1_delta = int(monitor_data['read details']['sample'][last_sample]["Thermal Management Temperature 1 Time"].split()[0].replace(',','')) - tmt1
-        total_tmt2_delta = int(monitor_data['read details']['sample'][last_sample]["Thermal Management Temperature 2 Time"].split()[0].replace(',','')) - tmt2
-        total_wt_delta = int(monitor_data['read details']['sample'][last_sample]["Warning Composite Temperature Time"].split()[0].replace(',','')) - wt
-        total_ct_delta = int(monitor_data['read details']['sample'][last_sample]["Critical Composite Temperature Time"].split()[0].replace(',','')) - ct
-        total_bt_delta = int(monitor_data['read details']['sample'][last_sample]["Controller Busy Time"].split()[0].replace(',','')) - bt
-
-        total_dr_delta = float(monitor_data['read details']['sample'][last_sample]["Data Read"].split()[0].replace(',','')) - dr
-        total_dw_delta = float(monitor_data['read details']['sample'][last_sample]["Data Written"].split()[0].replace(',','')) - dw
-
-
-        with open(os.path.join(monitor_directory,"monitor.csv"), mode='w', newline='') as monitor_csv_file:
-            csv_writer = csv.writer(monitor_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-            csv_writer.writerow(['Timestamp','Temp(C)','DeltaRead(GB/sec)','DeltaWritten(GB/sec)','DeltaTMT1(Sec)','DeltaTMT2(Sec)',
-                                'DataRead(GB)','DataWritten(GB)','TMT1(Sec)','TMT2(Sec)','WarningThrottle(Min)','CriticalThrottle(Min)','BusyTime(Min)'])
-
-            for sample in monitor_data['read details']['sample']: 
-
-                if (max_temp < int(sample["Composite Temperature"].split()[0].replace(',',''))):
-                    max_temp = int(sample["Composite Temperature"].split()[0].replace(',',''))
-
-                delta_dr = (float(sample["Data Read"].split()[0].replace(',','')) - dr)/sample_rate_sec
-                delta_dw = (float(sample["Data Written"].split()[0].replace(',','')) - dw)/sample_rate_sec
-                delta_tmt1 = float(sample["Thermal Management Temperature 1 Time"].split()[0].replace(',','')) - tmt1
-                delta_tmt2 = float(sample["Thermal Management Temperature 2 Time"].split()[0].replace(',','')) - tmt2
-
-                tmt1 = int(sample["Thermal Management Temperature 1 Time"].split()[0].replace(',',''))
-                tmt2 = int(sample["Thermal Management Temperature 2 Time"].split()[0].replace(',',''))
-                wt   = int(sample["Warning Composite Temperature Time"].split()[0].replace(',',''))
-                ct   = int(sample["Critical Composite Temperature Time"].split()[0].replace(',',''))
-                dw   = float(sample["Data Written"].split()[0].replace(',',''))
-                dr   = float(sample["Data Read"].split()[0].replace(',',''))
-                bt   = int(sample["Controller Busy Time"].split()[0].replace(',',''))
-
-                csv_writer.writerow([sample["timestamp"],sample["Composite Temperature"].split()[0],
-                                    f"{delta_dr:.3f}",f"{delta_dw:.3f}",f"{delta_tmt1}",f"{delta_tmt2}",
-                                    f"{dr:.3f}",f"{dw:.3f}",f"{tmt1}",f"{tmt2}",f"{wt}",f"{ct}",f"{bt}"])
+        series = MonitorSeries.from_summary(os.path.join(monitor_directory,"read.summary.json"))
+        series.write_csv(os.path.join(monitor_directory,"monitor.csv"))
+        if output_options['columns']: series.write_columns(os.path.join(monitor_directory,"monitor.columns"))
+
+        max_temp         = series.maximum('temperature')
+        total_tmt1_delta = series.total_delta('tmt1')
+        total_tmt2_delta = series.total_delta('tmt2')
+        total_wt_delta   = series.total_delta('warning_time')
+        total_ct_delta   = series.total_delta('critical_time')
+        total_bt_delta   = series.total_delta('busy_time')
+        total_dr_delta   = series.total_delta('data_read')
+        total_dw_delta   = series.total_delta('data_written')
         
         logger.info("")
         logger.info("\t   The maximum temperature was :    " + str(max_temp) + " C")
@@ -384,67 +862,97 @@ def stop_monitor(monitor_directory,nvmecmd_process):
         logger.info("")
         logger.info(f"\t   The controller busy time was :   {total_bt_delta} Min")
         logger.info("")
-        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        save_to_results_db(add_monitor, results_run.get('step'), monitor_directory,
+                           {'samples': len(series), 'max temperature': max_temp, 'tmt1': total_tmt1_delta, 'tmt2': total_tmt2_delta,
+                            'warning time': total_wt_delta, 'critical time': total_ct_delta, 'busy time': total_bt_delta,
+                            'data read': total_dr_delta, 'data written': total_dw_delta})
+        if on_main_thread: signal.signal(signal.SIGINT, signal.default_int_handler)
 
         return 0
     except:
         return 1
 
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple function that reads the admin command times in one pass
+#
+#  Each command time is written to the csv file and added to the latency histogram of the command and of all commands.
+#  Returns the histogram for each command, the histogram for all commands, and the number of commands with errors
+#--------------------------------------------------------------------------------------------------------------------
+def read_admin_commands(file_path, csv_path, skip = 0):
+
+    each_command = {}
+    all_commands = LatencyHistogram()
+    error_count  = 0 
+    columns      = {'timestamp': [], 'command': [], 'time': [], 'return code': [], 'bytes': []} if output_options['columns'] else None
+
+    with open(csv_path, mode='w', newline='') as times_csv_file:
+        csv_writer = csv.writer(times_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['Timestamp','Command','Time(mS)','ReturnCode','Bytes'])
+
+        for count,entry in enumerate(iter_summary_command_times(file_path)): 
+            if count < skip: continue
+
+            if entry['admin command'] not in each_command: each_command[entry['admin command']] = LatencyHistogram()
+            each_command[entry['admin command']].record(entry['time in ms'])
+            all_commands.record(entry['time in ms'])
+
+            if int(entry['return code']) != 0: 
+                error_count += 1
+
+            csv_writer.writerow([entry['timestamp'],entry['admin command'],entry['time in ms'],entry['return code'],entry['bytes returned']])
+
+            if columns is not None:
+                columns['timestamp'].append(timestamp_ns(entry['timestamp']))
+                columns['command'].append(entry['admin command'])
+                columns['time'].append(float(entry['time in ms']))
+                columns['return code'].append(int(entry['return code']))
+                columns['bytes'].append(int(entry['bytes returned']))
+
+    if columns is not None:
+        write_columns(columns_path(csv_path), [('timestamp','t',columns['timestamp']),('command','s',columns['command']),
+                                               ('time ms','p3',columns['time']),('return code','q',columns['return code']),
+                                               ('bytes','q',columns['bytes'])])
+
+    return each_command, all_commands, error_count
+
+def format_latency(histogram):
+
+    line = f"Avg: {histogram.mean:6.2f}mS    Min: {histogram.min:6.2f}mS    Max: {histogram.max:6.2f}mS      Count: {histogram.count:6}    "
+    for percent,value in histogram.percentiles().items():
+        line += f"P{percent}: {value:6.2f}mS    "
+    return line
+
 #--------------------------------------------------------------------------------------------------------------------
 #  Simple function that parses read summary file to get info on admin commands
 #--------------------------------------------------------------------------------------------------------------------
 def parse_admin_commands(file_path, csv_path, skip = 0,prefix="",verbose = False):
   
     try:
-        ref_file = open(file_path) 
-        summary_data = json.load(ref_file) 
-        ref_file.close() 
-
-        each_command = {}
-        all_commands = []
-        error_count  = 0 
-        total = 0
-       
-        with open(csv_path, mode='w', newline='') as times_csv_file:
-                csv_writer = csv.writer(times_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-                csv_writer.writerow(['Timestamp','Command','Time(mS)','ReturnCode','Bytes'])
-                count = 0
-                for entry in summary_data['command times']: 
-                    if count >= skip:
-                        all_commands.append(entry['time in ms'])
-                        if entry['admin command'] not in each_command: each_command[entry['admin command']] = []  
-                        each_command[entry['admin command']].append(entry['time in ms'])
-                        if int(entry['return code']) != 0: 
-                            error_count += 1
-
-                        csv_writer.writerow([entry['timestamp'],entry['admin command'],entry['time in ms'],entry['return code'],entry['bytes returned']])
-                    count = count + 1
+        each_command, all_commands, error_count = read_admin_commands(file_path, csv_path, skip)
+        save_histograms(histogram_path(csv_path), {**each_command, 'All Commands': all_commands})
 
         for command in each_command:
-            average = sum(each_command[command])/len(each_command[command])
-            total += average
-            logger.info(f"\t   {prefix} {command:35} Avg: {average:6.2f}mS    Min: {min(each_command[command]):6.2f}mS    Max: {max(each_command[command]):6.2f}mS      Count: {len(each_command[command]):6}    ")
+            logger.info(f"\t   {prefix} {command:35} {format_latency(each_command[command])}")
         
         if len(each_command) > 1:
-            average = sum(all_commands)/len(all_commands) 
             logger.info(" ")
-            logger.info(f"\t   {prefix} {'All Commands':35} Avg: {average:6.2f}mS    Min: {min(all_commands):6.2f}mS    Max: {max(all_commands):6.2f}mS      Count: {len(all_commands):6}    ")
+            logger.info(f"\t   {prefix} {'All Commands':35} {format_latency(all_commands)}")
 
         if error_count != 0:
             logger.info(" ")
             logger.info(f"\t   {error_count} admin commands completed with errors! ")
 
         if verbose:
-            prior_timestamp = None
-            timestamp_deltas = []
+            timestamps   = []
             run_times_ms = []
-            for sample in summary_data['read details']['sample']: 
-                if prior_timestamp != None: 
-                    timestamp_deltas.append( (datetime.strptime(sample['timestamp'], "%Y-%m-%d %H:%M:%S.%f") - prior_timestamp).total_seconds() )
-                prior_timestamp = datetime.strptime(sample['timestamp'], "%Y-%m-%d %H:%M:%S.%f")
+            for sample in iter_summary_samples(file_path): 
+                timestamps.append(sample['timestamp'])
                 run_times_ms.append(float(sample['run time'].split()[0]))
 
+            timestamps       = timestamps_ns(timestamps)
+            timestamp_deltas = [(later - earlier) / NS_IN_SEC for earlier,later in zip(timestamps, timestamps[1:])]
+
             logger.info(" ")
             logger.info("\t Timestamp Deltas:")
             logger.info(" ")
@@ -464,37 +972,234 @@ def parse_admin_commands(file_path, csv_path, skip = 0,prefix="",verbose = False
         return 1
         
 #--------------------------------------------------------------------------------------------------------------------
-#  Simple function that parses read summary file to get info on admin commands
+#  Simple function that parses read summary file to get info on one admin command
 #--------------------------------------------------------------------------------------------------------------------
-def get_admin_command(name, file_path, csv_path, skip = 0):
+def get_admin_command_latency(name, file_path, csv_path, skip = 0):
   
     try:
-        ref_file = open(file_path) 
-        summary_data = json.load(ref_file) 
-        ref_file.close() 
-         
-        each_command = {}
-        error_count  = 0 
-       
-        with open(csv_path, mode='w', newline='') as times_csv_file:
-            csv_writer = csv.writer(times_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            csv_writer.writerow(['Timestamp','Command','Time(mS)','ReturnCode','Bytes'])
-            count = 0
-            for entry in summary_data['command times']: 
-                if count >= skip:
-                    if entry['admin command'] not in each_command: each_command[entry['admin command']] = []  
-                    each_command[entry['admin command']].append(entry['time in ms'])
-
-                    csv_writer.writerow([entry['timestamp'],entry['admin command'],entry['time in ms'],entry['return code'],entry['bytes returned']])
-                count = count + 1
-
-        average = sum(each_command[name])/len(each_command[name])
-        return average, min(each_command[name]), max(each_command[name]), len(each_command[name])
+        each_command, all_commands, error_count = read_admin_commands(file_path, csv_path, skip)
+        return each_command[name]
 
     except Exception as e:
         logger.error('Failed to get admn command with exception: '+ str(e))
-        return 0,0,0,0
+        return LatencyHistogram()
+
+def get_admin_command(name, file_path, csv_path, skip = 0):
+  
+    histogram = get_admin_command_latency(name, file_path, csv_path, skip)
+    return histogram.mean, (histogram.min if histogram.count else 0), (histogram.max if histogram.count else 0), histogram.count
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple function that saves the results of a sweep, one row per idle time, as a .columns file
+#--------------------------------------------------------------------------------------------------------------------
+def write_sweep_columns(csv_path, sweep_rows):
+
+    # sweep_rows is a list of (idle time in ms, latency histogram)
 
+    columns = [('idle ms','q',[interval for interval,histogram in sweep_rows]),
+               ('mean ms','d',[histogram.mean for interval,histogram in sweep_rows]),
+               ('min ms','d',[histogram.min if histogram.count else 0 for interval,histogram in sweep_rows]),
+               ('max ms','d',[histogram.max if histogram.count else 0 for interval,histogram in sweep_rows]),
+               ('count','q',[histogram.count for interval,histogram in sweep_rows])]
+
+    for percent in PERCENTILES:
+        columns.append((f"p{percent} ms",'d',[histogram.percentile(percent) for interval,histogram in sweep_rows]))
+
+    write_columns(columns_path(csv_path), columns)
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple function that sweeps the idle time before an admin command
+#
+#  nvmecmd is run once for each idle time.  The summary file of one idle time is parsed on a worker thread while
+#  nvmecmd runs the next idle time.  Results are logged and written to the csv file in idle time order.
+#--------------------------------------------------------------------------------------------------------------------
+def log_sweep_interval(csv_writer, step, command_name, interval, histogram):
+
+    interval_name = f"Idle {interval}mS then read log page"
+    if histogram.count == 0:
+        logger.info(f"\t    {interval_name:35} Avg: {0:6.2f}mS    Min: {0:6.2f}mS    Max: {0:6.2f}mS      Count: {0:6}")
+        csv_writer.writerow([f"{interval}","0","0","0","0"] + ["0" for percent in PERCENTILES])
+        return
+    logger.info(f"\t    {interval_name:35} {format_latency(histogram)}")
+    save_to_results_db(add_sweep, step['db id'], command_name, interval, histogram)
+    csv_writer.writerow([f"{interval}",f"{histogram.mean}",f"{histogram.min}",f"{histogram.max}",f"{histogram.count}"] +
+                        [f"{value}" for value in histogram.percentiles().values()])
+
+def run_admin_sweep(step, nvme, cmd_file, command_name, idle_times_ms, csv_name, adaptive=False):
+
+    if adaptive:
+        run_adaptive_admin_sweep(step, nvme, cmd_file, command_name, idle_times_ms, csv_name)
+        return
+
+    def log_interval(interval, parse_result):
+        histogram = parse_result.result()
+        sweep_rows.append((interval, histogram))
+        log_sweep_interval(csv_writer, step, command_name, interval, histogram)
+
+    with open(os.path.join(f"{step['directory']}",csv_name), mode='w', newline='') as results_csv_file, ThreadPoolExecutor(max_workers=1) as executor:
+
+        csv_writer = csv.writer(results_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['Idle(ms)','Avg(ms)','Min(ms)','Max(ms)','Count'] + [f"P{percent}(ms)" for percent in PERCENTILES])
+
+        prior      = None
+        sweep_rows = []
+
+        for interval in idle_times_ms:
+
+            working_directory = os.path.join(f"{step['directory']}",f"{interval}mS")
+            os.makedirs(working_directory) 
+            summary_file      = os.path.join(working_directory,"read.summary.json")
+            csv_path          = os.path.join( working_directory, "admin_commands.csv")
+
+            nvmecmd_args =  [NVMECMD,                        # path to nvmecmd executable defined in lib
+                            f"{cmd_file}",                   # cmd file to read the NVMe information   
+                            "--samples",f"{admin_sweep_samples(interval)}",         
+                            "--interval",f"{interval}",      # set interval in mS
+                            "--dir",f"{working_directory}",  # log to the directory created by start_step                  
+                            "--nvme",f"{nvme}"]              # NVMe drive number 
+
+            step['code'] += run_step_process(nvmecmd_args, working_directory) 
+
+            parse_result = executor.submit(get_admin_command_latency, command_name, summary_file, csv_path, 2)
+            if prior != None: log_interval(*prior)
+            prior = (interval, parse_result)
+
+        if prior != None: log_interval(*prior)
+
+    if output_options['columns']:
+        write_sweep_columns(os.path.join(f"{step['directory']}",csv_name), sweep_rows)
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple function that sweeps the idle time before an admin command, sampling each idle time only until the mean
+#  latency is known (see sweep.py) and adding idle times where the latency changes sharply
+#
+#  Each batch is one nvmecmd run of ADMIN_BATCH_SAMPLES samples logged to <idle time>mS/<batch number>.  Results are
+#  logged and written to the csv file in idle time order once the sweep is done.
+#--------------------------------------------------------------------------------------------------------------------
+ADMIN_BATCH_SAMPLES = 20
+
+def run_adaptive_admin_sweep(step, nvme, cmd_file, command_name, idle_times_ms, csv_name):
+
+    sweep = AdaptiveSweep(idle_times_ms, lambda interval: admin_sweep_samples(interval) // ADMIN_BATCH_SAMPLES)
+
+    while (batch := sweep.next_batch()) is not None:
+
+        interval, number  = batch
+        working_directory = os.path.join(f"{step['directory']}",f"{interval}mS",f"{number}")
+        os.makedirs(working_directory) 
+        summary_file      = os.path.join(working_directory,"read.summary.json")
+        csv_path          = os.path.join( working_directory, "admin_commands.csv")
+
+        nvmecmd_args =  [NVMECMD,                        # path to nvmecmd executable defined in lib
+                        f"{cmd_file}",                   # cmd file to read the NVMe information   
+                        "--samples",f"{ADMIN_BATCH_SAMPLES}",         
+                        "--interval",f"{interval}",      # set interval in mS
+                        "--dir",f"{working_directory}",  # log to the directory created by start_step                  
+                        "--nvme",f"{nvme}"]              # NVMe drive number 
+
+        step['code'] += run_step_process(nvmecmd_args, working_directory) 
+
+        histogram = get_admin_command_latency(command_name, summary_file, csv_path, 2)
+        sweep.add_batch(interval, histogram, histogram.stdev)
+
+    with open(os.path.join(f"{step['directory']}",csv_name), mode='w', newline='') as results_csv_file:
+
+        csv_writer = csv.writer(results_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['Idle(ms)','Avg(ms)','Min(ms)','Max(ms)','Count'] + [f"P{percent}(ms)" for percent in PERCENTILES])
+
+        for interval,histogram in sweep.results():
+            log_sweep_interval(csv_writer, step, command_name, interval, histogram)
+
+    if output_options['columns']:
+        write_sweep_columns(os.path.join(f"{step['directory']}",csv_name), sweep.results())
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple function that sweeps the idle time before a random 4K read
+#
+#  fio is run for sweep_runtime_sec for each idle time, logged in subdirectories named after the idle time.  The
+#  adaptive sweep runs fio in batches of batch_runtime_sec, in subdirectories named after the batch number, and the
+#  results of each idle time are from the merged completion latency of its batches.
+#--------------------------------------------------------------------------------------------------------------------
+def run_random_read_sweep(step, target_file, size, idle_times_ms, adaptive=False, sweep_runtime_sec=180, batch_runtime_sec=30):
+
+    fio_target_file = target_file.replace(":",r"\:")
+
+    fio_base_args = [FIO,                             # path to fio executable
+                    "--name=fio-burst",               # name for job
+                    f"--ioengine={FIO_ASYNC_IO}",     # asynchronous IO engine (Window/Linux are different)
+                    "--direct=1",                     # non-buffered IO
+                    "--numjobs=1",                    # Number of threads
+                    "--thread",                       # Generate threads 
+                    "--rw=randread",                  # Access randomly 
+                    "--iodepth=1",                    # IO or queue depth
+                    "--thinktime_blocks=1",           # read one block then wait
+                    "--bs=4k",                        # one 4K block 
+                    "--time_based",                   # run time specified
+                    "--output-format=json",           # Use json output so easy to read and parse later
+                    f"--filename={fio_target_file}",  # use one file so generated only once
+                    f"--size={size}"]   
+
+    def run_random_read(interval, working_directory, runtime_sec):
+
+        if interval == 0: thinktime_us = 1
+        else: thinktime_us = interval * 1000
+
+        fio_args = fio_base_args + [f"--runtime={runtime_sec}"]
+
+        fio_args.append(f"--output={working_directory}\\fio.json")  
+        fio_args.append(f"--thinktime={thinktime_us}")      
+
+        step['code'] += run_step_process(fio_args, working_directory, runtime_sec + 60)
+
+        return read_fio_result(f"{working_directory}\\fio.json")['read']
+
+    sweep_results = []
+
+    if adaptive:
+        sweep = AdaptiveSweep(idle_times_ms, sweep_runtime_sec // batch_runtime_sec)
+
+        while (batch := sweep.next_batch()) is not None:
+            interval, number  = batch
+            working_directory = os.path.join(f"{step['directory']}",f"{interval}mS",f"{number}")
+            os.makedirs(working_directory) 
+
+            read = run_random_read(interval, working_directory, batch_runtime_sec)
+            sweep.add_batch(interval, read['histogram'], read['clat stddev ms'])
+
+        for interval,histogram in sweep.results():
+            sweep_results.append((interval, {'mean ms': histogram.mean, 'min ms': histogram.min if histogram.count else 0.0,
+                                             'max ms': histogram.max if histogram.count else 0.0, 'count': histogram.count,
+                                             'percentiles': histogram.percentiles(FIO_PERCENTILES), 'histogram': histogram}))
+    else:
+        for interval in idle_times_ms:
+            working_directory = os.path.join(f"{step['directory']}",f"{interval}mS")
+            os.makedirs(working_directory) 
+            sweep_results.append((interval, run_random_read(interval, working_directory, sweep_runtime_sec)))
+
+    # log summary in a csv file
+
+    with open(os.path.join(f"{step['directory']}","random_read_sweep.csv"), mode='w', newline='') as results_csv_file:
+
+        csv_writer = csv.writer(results_csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['Idle(ms)','Avg(ms)','Min(ms)','Max(ms)','Count'] + [f"P{percent}(ms)" for percent in FIO_PERCENTILES])
+        sweep_rows = []
+
+        for interval,read in sweep_results:
+
+            interval_name = f"Idle {interval}mS then random 4k read"
+            percentiles   = "    ".join(f"P{percent}: {value:6.2f}mS" for percent,value in read['percentiles'].items())
+        
+            logger.info(f"\t    {interval_name:40} Avg: {read['mean ms']:6.2f}mS    Min: {read['min ms']:6.2f}mS    Max: {read['max ms']:6.2f}mS      Count: {read['count']:6}    {percentiles}")
+            csv_writer.writerow([f"{interval}",f"{read['mean ms']}",f"{read['min ms']}",f"{read['max ms']}",f"{read['count']}"] +
+                                [f"{value}" for value in read['percentiles'].values()])
+            sweep_rows.append((interval, read['mean ms'], read['min ms'], read['max ms'], read['count']) + tuple(read['percentiles'].values()))
+            save_to_results_db(add_sweep, step['db id'], "Random 4K Read", interval, read['histogram'])
+
+    if output_options['columns']:
+        write_columns(os.path.join(f"{step['directory']}","random_read_sweep.columns"),
+                      [(name, column_type, [row[index] for row in sweep_rows]) for index,(name,column_type) in
+                       enumerate([('idle ms','q'),('mean ms','d'),('min ms','d'),('max ms','d'),('count','q')] +
+                                 [(f"p{percent} ms",'d') for percent in FIO_PERCENTILES])])
 
 #--------------------------------------------------------------------------------------------------------------------
 #  Simple function that compares host and drive timestamps and power on hours
@@ -509,66 +1214,61 @@ def get_admin_command(name, file_path, csv_path, skip = 0):
 def compare_time(ref_info_file, last_info_file):
 
     try:
-        ref_file = open(ref_info_file)                  
-        ref_data = json.load(ref_file) 
-        ref_file.close() 
+        ref_data  = NvmeInfo(ref_info_file)
+        last_data = NvmeInfo(last_info_file)
 
-        ref_file = open(last_info_file) 
-        last_data = json.load(ref_file) 
-        ref_file.close() 
-
-        logger.info(f"\t {'Host Start':35} {ref_data['nvme']['parameters']['Host Timestamp Decoded']['value']}")
-        logger.info(f"\t {'Host End':35} {last_data['nvme']['parameters']['Host Timestamp Decoded']['value']}")
+        logger.info(f"\t {'Host Start':35} {ref_data['Host Timestamp Decoded']}")
+        logger.info(f"\t {'Host End':35} {last_data['Host Timestamp Decoded']}")
         logger.info("")
 
-        host_start = int(ref_data['nvme']['parameters']['Host Timestamp']['value'].split()[0].replace(',',''))
-        host_end   = int(last_data['nvme']['parameters']['Host Timestamp']['value'].split()[0].replace(',',''))
+        host_start = ref_data.number('Host Timestamp')
+        host_end   = last_data.number('Host Timestamp')
         host_time_ms =  host_end - host_start
 
-        poh_start = int(ref_data['nvme']['parameters']["Power On Hours"]["value"].replace(',',''))
-        poh_end = int(last_data['nvme']['parameters']["Power On Hours"]["value"].replace(',',''))
+        poh_start = ref_data.number('Power On Hours')
+        poh_end = last_data.number('Power On Hours')
         poh_time_hrs = poh_end - poh_start
     
         # check if drive supports timestamp feature, if so use it
 
-        if "Timestamp Feature" in ref_data['nvme']['parameters'] and ref_data['nvme']['parameters']["Timestamp Feature"]["value"] == "Supported":
+        if "Timestamp Feature" in ref_data and ref_data['Timestamp Feature'] == "Supported":
  
             # If timestamp was from host the decoded value is the calendar date/time
 
-            if ref_data['nvme']['parameters']["Timestamp Origin"]["value"] == "Host Programmed" and last_data['nvme']['parameters']["Timestamp Origin"]["value"] == "Host Programmed":
+            if ref_data['Timestamp Origin'] == "Host Programmed" and last_data['Timestamp Origin'] == "Host Programmed":
                 
-                drive_start = int(ref_data['nvme']['parameters']["Timestamp"]["value"].split()[0].replace(',',''))
-                drive_end   = int(last_data['nvme']['parameters']["Timestamp"]["value"].split()[0].replace(',',''))
+                drive_start = ref_data.number('Timestamp')
+                drive_end   = last_data.number('Timestamp')
 
                 drive_time_ms =  drive_end - drive_start
                 host_delta_ms = host_time_ms - drive_time_ms
                 host_start_delta = drive_start - host_start
                 host_end_delta = drive_end - host_end
 
-                logger.info(f"\t {'Drive Start':35} {ref_data['nvme']['parameters']['Timestamp Decoded']['value']}   (Host Delta: {host_start_delta/MS_IN_HR:,.3f} hours {host_start_delta/MS_IN_SEC:,.3f} sec)")   
-                logger.info(f"\t {'Drive End':35} {last_data['nvme']['parameters']['Timestamp Decoded']['value']}   (Host Delta: {host_end_delta/MS_IN_HR:,.3f} hours {host_end_delta/MS_IN_SEC:,.3f} sec))")     
+                logger.info(f"\t {'Drive Start':35} {ref_data['Timestamp Decoded']}   (Host Delta: {host_start_delta/MS_IN_HR:,.3f} hours {host_start_delta/MS_IN_SEC:,.3f} sec)")   
+                logger.info(f"\t {'Drive End':35} {last_data['Timestamp Decoded']}   (Host Delta: {host_end_delta/MS_IN_HR:,.3f} hours {host_end_delta/MS_IN_SEC:,.3f} sec))")     
                 logger.info(" ")
                 logger.info(f"\t {'Host Timestamp Change':35} {host_time_ms/MS_IN_HR:.1f} hours  {host_time_ms/MS_IN_SEC:,.3f} sec")
                 logger.info(f"\t {'Drive Timestamp Change':35} {drive_time_ms/MS_IN_HR:.1f} hours  {drive_time_ms/MS_IN_SEC:,.3f} sec   (Host Delta: {host_delta_ms:,} mS)")
-                logger.info(f"\t {'Drive Timestamp Stopped':35} {last_data['nvme']['parameters']['Timestamp Stopped']['value']}")
+                logger.info(f"\t {'Drive Timestamp Stopped':35} {last_data['Timestamp Stopped']}")
                 logger.info(f"\t {'Drive Power On Hours Change':35} {poh_time_hrs} hours")
                 logger.info("")
 
             # if timestamp was from reset then decoded value is time since reset
 
-            elif ref_data['nvme']['parameters']["Timestamp Origin"]["value"] != "Host Programmed" and last_data['nvme']['parameters']["Timestamp Origin"]["value"] != "Host Programmed":
+            elif ref_data['Timestamp Origin'] != "Host Programmed" and last_data['Timestamp Origin'] != "Host Programmed":
 
-                drive_start = int(ref_data['nvme']['parameters']["Timestamp"]["value"].split()[0].replace(',',''))
-                drive_end   = int(last_data['nvme']['parameters']["Timestamp"]["value"].split()[0].replace(',',''))
+                drive_start = ref_data.number('Timestamp')
+                drive_end   = last_data.number('Timestamp')
                 drive_time_ms =  drive_end - drive_start
                 host_delta_ms = host_time_ms - drive_time_ms
  
-                logger.info(f"\t {'Drive Start':35} {ref_data['nvme']['parameters']['Timestamp Decoded']['value']}   (Time since controller reset)")   
-                logger.info(f"\t {'Drive End':35} {last_data['nvme']['parameters']['Timestamp Decoded']['value']}   (Time since controller reset)")
+                logger.info(f"\t {'Drive Start':35} {ref_data['Timestamp Decoded']}   (Time since controller reset)")   
+                logger.info(f"\t {'Drive End':35} {last_data['Timestamp Decoded']}   (Time since controller reset)")
                 logger.info(" ")
                 logger.info(f"\t {'Host Timestamp Change':35} {host_time_ms/MS_IN_HR:.1f} hours  {host_time_ms/MS_IN_SEC:,.3f} sec")
                 logger.info(f"\t {'Drive Timestamp Change':35} {drive_time_ms/MS_IN_HR:.1f} hours  {drive_time_ms/MS_IN_SEC:,.3f} sec   (Host Delta: {host_delta_ms:,} mS)")
-                logger.info(f"\t {'Drive Timestamp Stopped':35} {last_data['nvme']['parameters']['Timestamp Stopped']['value']}")
+                logger.info(f"\t {'Drive Timestamp Stopped':35} {last_data['Timestamp Stopped']}")
                 logger.info(f"\t {'Drive Power On Hours Change':35} {poh_time_hrs} hours")
                 logger.info("")
 
@@ -578,7 +1278,7 @@ def compare_time(ref_info_file, last_info_file):
                 logger.info(" ")
                 logger.info(f"\t {'Host Timestamp Change':35} {host_time_ms/MS_IN_HR:.1f} hours  {host_time_ms/MS_IN_SEC:,.3f} sec")
                 logger.info(f"\t {'Drive Timestamp Change':35} Not available because timestamp origin changed between start and end")
-                logger.info(f"\t {'Drive Timestamp Stopped':35} {last_data['nvme']['parameters']['Timestamp Stopped']['value']}")
+                logger.info(f"\t {'Drive Timestamp Stopped':35} {last_data['Timestamp Stopped']}")
                 logger.info(f"\t {'Drive Power On Hours Change':35} {poh_time_hrs} hours")                
                 logger.info("")
 
@@ -597,18 +1297,46 @@ def compare_time(ref_info_file, last_info_file):
 #  Simple function that displays a summary of the drive features
 #
 #  Reads the nvme.info.json file and displays a report.  The content and format can be easily adjusted to meet user
-#  specific needs
+#  specific needs.  The drive fields are listed in REPORT_GROUPS, one list for each group of lines, as (label, nvme
+#  parameter).  The fleet report in report.py has a column for each of these fields.
 #--------------------------------------------------------------------------------------------------------------------
+REPORT_GROUPS = [[('Vendor',                                            'Subsystem Vendor'),
+                  ('Model',                                             'Model Number (MN)'),
+                  ('Serial Number',                                     'Serial Number (SN)'),
+                  ('IEEE OUI Identifier',                               'IEEE OUI Identifier (IEEE)'),
+                  ('Namespace 1 EUID',                                  'Namespace 1 IEEE Extended Unique Identifier (EUI64)'),
+                  ('Namespace 1 NGUID',                                 'Namespace 1 Globally Unique Identifier (NGUID)'),
+                  ('Firmware',                                          'Firmware Revision (FR)'),
+                  ('Size',                                              'Size'),
+                  ('NVMe Version',                                      'Version (VER)')],
+                 [('Percentage Used',                                   'Percentage Used'),
+                  ('Data Read',                                         'Data Read'),
+                  ('Data Written',                                      'Data Written'),
+                  ('Power-On Hours',                                    'Power On Hours'),
+                  ('Power Cycles',                                      'Power Cycles'),
+                  ('Available Spare',                                   'Available Spare')],
+                 [('Composite Temperature',                             'Composite Temperature'),
+                  ('Thermal Management Temperature 1 (TMT1)',           'Thermal Management Temperature 1 (TMT1)'),
+                  ('Thermal Management Temperature 2 (TMT2)',           'Thermal Management Temperature 2 (TMT2)'),
+                  ('Warning Composite Temperature Threshold (WCTEMP)',  'Warning Composite Temperature Threshold (WCTEMP)'),
+                  ('Critical Composite Temperature Threshold (CCTEMP)', 'Critical Composite Temperature Threshold (CCTEMP)'),
+                  ('Thermal Management Temperature 1 Time',             'Thermal Management Temperature 1 Time'),
+                  ('Thermal Management Temperature 2 Time',             'Thermal Management Temperature 2 Time'),
+                  ('Warning Composite Temperature Time',                'Warning Composite Temperature Time'),
+                  ('Critical Composite Temperature Time',               'Critical Composite Temperature Time')],
+                 [('Critical Warnings',                                 'Critical Warnings'),
+                  ('Media and Data Integrity Errors',                   'Media and Data Integrity Errors'),
+                  ('Number Of Failed Self-Tests',                       'Number Of Failed Self-Tests')]]
+
+REPORT_FIELDS = [field for group in REPORT_GROUPS for field in group]
+
 def log_report(ref_info_file, nvme, standalone):
 
     try:            
-        ref_file = open(ref_info_file)                  # Read in the info from json file
-        source_info = json.load(ref_file) 
-        ref_file.close() 
+        info = NvmeInfo(ref_info_file)                  # Parameters are read from the json file on first use
 
         kwidth = 55                                     # Width of first field for display and log file
         indent = 10
-        parameters = source_info['nvme']['parameters']  # short hand for readability
         
         if standalone:
             indent = 1
@@ -616,81 +1344,51 @@ def log_report(ref_info_file, nvme, standalone):
             logger.info(f"{' ':{indent}}  NVME DRIVE {nvme}")
             logger.info(f"{' ':{indent}} -------------------------------------------------------------------------------------------")   
  
-        logger.info(f"{' ':{indent}}{'    Vendor':{kwidth}} {parameters['Subsystem Vendor']['value']}")
-        logger.info(f"{' ':{indent}}{'    Model':{kwidth}} {parameters['Model Number (MN)']['value']}")
-        logger.info(f"{' ':{indent}}{'    Serial Number':{kwidth}} {parameters['Serial Number (SN)']['value']}")
-        logger.info(f"{' ':{indent}}{'    IEEE OUI Identifier':{kwidth}} {parameters['IEEE OUI Identifier (IEEE)']['value']}")      
-        logger.info(f"{' ':{indent}}{'    Namespace 1 EUID':{kwidth}} {parameters['Namespace 1 IEEE Extended Unique Identifier (EUI64)']['value']}")   
-        logger.info(f"{' ':{indent}}{'    Namespace 1 NGUID':{kwidth}} {parameters['Namespace 1 Globally Unique Identifier (NGUID)']['value']}")   
-        logger.info(f"{' ':{indent}}{'    Firmware':{kwidth}} {parameters['Firmware Revision (FR)']['value']}")  
-        logger.info(f"{' ':{indent}}{'    Size':{kwidth}} {parameters['Size']['value']}")  
-        logger.info(f"{' ':{indent}}{'    NVMe Version':{kwidth}} {parameters['Version (VER)']['value']}")  
-
-        logger.info("")
-        logger.info(f"{' ':{indent}}{'    Percentage Used':{kwidth}} {parameters['Percentage Used']['value']}")
-        logger.info(f"{' ':{indent}}{'    Data Read':{kwidth}} {parameters['Data Read']['value']}")
-        logger.info(f"{' ':{indent}}{'    Data Written':{kwidth}} {parameters['Data Written']['value']}")    
-        logger.info(f"{' ':{indent}}{'    Power-On Hours':{kwidth}} {parameters['Power On Hours']['value']}")
-        logger.info(f"{' ':{indent}}{'    Power Cycles':{kwidth}} {parameters['Power Cycles']['value']}")
-        logger.info(f"{' ':{indent}}{'    Available Spare':{kwidth}} {parameters['Available Spare']['value']}")
-
-        logger.info("")
-        logger.info(f"{' ':{indent}}{'    Composite Temperature':{kwidth}} {parameters['Composite Temperature']['value']}")
-        logger.info(f"{' ':{indent}}{'    Thermal Management Temperature 1 (TMT1)':{kwidth}} {parameters['Thermal Management Temperature 1 (TMT1)']['value']}")
-        logger.info(f"{' ':{indent}}{'    Thermal Management Temperature 2 (TMT2)':{kwidth}} {parameters['Thermal Management Temperature 2 (TMT2)']['value']}")
-        logger.info(f"{' ':{indent}}{'    Warning Composite Temperature Threshold (WCTEMP)':{kwidth}} {parameters['Warning Composite Temperature Threshold (WCTEMP)']['value']}")
-        logger.info(f"{' ':{indent}}{'    Critical Composite Temperature Threshold (CCTEMP)':{kwidth}} {parameters['Critical Composite Temperature Threshold (CCTEMP)']['value']}")
-        logger.info(f"{' ':{indent}}{'    Thermal Management Temperature 1 Time':{kwidth}} {parameters['Thermal Management Temperature 1 Time']['value']}")
-        logger.info(f"{' ':{indent}}{'    Thermal Management Temperature 2 Time':{kwidth}} {parameters['Thermal Management Temperature 2 Time']['value']}")
-        logger.info(f"{' ':{indent}}{'    Warning Composite Temperature Time':{kwidth}} {parameters['Warning Composite Temperature Time']['value']}")
-        logger.info(f"{' ':{indent}}{'    Critical Composite Temperature Time':{kwidth}} {parameters['Critical Composite Temperature Time']['value']}")
-
-        logger.info("")
-        logger.info(f"{' ':{indent}}{'    Critical Warnings':{kwidth}} {parameters['Critical Warnings']['value']}")
-        logger.info(f"{' ':{indent}}{'    Media and Data Integrity Errors':{kwidth}} {parameters['Media and Data Integrity Errors']['value']}")
-        logger.info(f"{' ':{indent}}{'    Number Of Failed Self-Tests':{kwidth}} {parameters['Number Of Failed Self-Tests']['value']}")
-        logger.info("")
+        for group in REPORT_GROUPS:
+            for label,parameter in group:
+                logger.info(f"{' ':{indent}}{'    ' + label:{kwidth}} {info[parameter]}")
+            logger.info("")
 
         # Create a table with power information, Windows doesn't support APST, it uses a power plan to define when to change power states
 
         if ("Windows" == platform.system()):
 
-            logger.info(f"{' ':{indent}}{'    Windows Power Plan':{kwidth}} {parameters['Windows Power Plan']['value']}")
+            logger.info(f"{' ':{indent}}{'    Windows Power Plan':{kwidth}} {info['Windows Power Plan']}")
             # Check if on battery or not because power plan is different
 
-            if parameters['Host Power Source'] == "Battery":
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan Timeout 1':{kwidth}} {parameters['Windows Power NVMe Timeout 1 (DC)']['value']}")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan Timeout 2':{kwidth}} {parameters['Windows Power NVMe Timeout 2 (DC)']['value']}")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan Latency Limit 1':{kwidth}} {parameters['Windows Power NVMe Latency 1 (DC)']['value']}.  After timeout #1, change to lowest power state with entry+exit latency less than this")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan Latency Limit 2':{kwidth}} {parameters['Windows Power NVMe Latency 2 (DC)']['value']}.  After timeout #2, change to lowest power state with entry+exit latency less than this")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan PCIe ASPM':{kwidth}} {parameters['Windows Power ASPM (DC)']['value']}")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan NOPPME':{kwidth}} {parameters['Windows Power NOPPME (DC)']['value']}")
+            if info['Host Power Source'] == "Battery":
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan Timeout 1':{kwidth}} {info['Windows Power NVMe Timeout 1 (DC)']}")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan Timeout 2':{kwidth}} {info['Windows Power NVMe Timeout 2 (DC)']}")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan Latency Limit 1':{kwidth}} {info['Windows Power NVMe Latency 1 (DC)']}.  After timeout #1, change to lowest power state with entry+exit latency less than this")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan Latency Limit 2':{kwidth}} {info['Windows Power NVMe Latency 2 (DC)']}.  After timeout #2, change to lowest power state with entry+exit latency less than this")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan PCIe ASPM':{kwidth}} {info['Windows Power ASPM (DC)']}")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan NOPPME':{kwidth}} {info['Windows Power NOPPME (DC)']}")
              
             else:
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan Timeout 1':{kwidth}} {parameters['Windows Power NVMe Timeout 1 (AC)']['value']}")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan Timeout 2':{kwidth}} {parameters['Windows Power NVMe Timeout 2 (AC)']['value']}")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan Latency Limit 1':{kwidth}} {parameters['Windows Power NVMe Latency 1 (AC)']['value']}.  After timeout 1, change to lowest power state with entry+exit latency less than this")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan Latency Limit 2':{kwidth}} {parameters['Windows Power NVMe Latency 2 (AC)']['value']}.  After timeout 2, change to lowest power state with entry+exit latency less than this")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan PCIe ASPM':{kwidth}} {parameters['Windows Power ASPM (AC)']['value']}")
-                logger.info(f"{' ':{indent}}{'    Windows Power Plan NOPPME':{kwidth}} {parameters['Windows Power NOPPME (AC)']['value']}")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan Timeout 1':{kwidth}} {info['Windows Power NVMe Timeout 1 (AC)']}")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan Timeout 2':{kwidth}} {info['Windows Power NVMe Timeout 2 (AC)']}")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan Latency Limit 1':{kwidth}} {info['Windows Power NVMe Latency 1 (AC)']}.  After timeout 1, change to lowest power state with entry+exit latency less than this")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan Latency Limit 2':{kwidth}} {info['Windows Power NVMe Latency 2 (AC)']}.  After timeout 2, change to lowest power state with entry+exit latency less than this")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan PCIe ASPM':{kwidth}} {info['Windows Power ASPM (AC)']}")
+                logger.info(f"{' ':{indent}}{'    Windows Power Plan NOPPME':{kwidth}} {info['Windows Power NOPPME (AC)']}")
          
             logger.info("")
               
         # Linux uses APST as far as I can tell
  
         try:
-            if parameters['Autonomous Power State Transition']['value'] == "Supported":
-                logger.info(f"{' ':{indent}}{'    Autonomous Power State Transitions':{kwidth}} {parameters['Autonomous Power State Transition']['value']} and {parameters['Autonomous Power State Transition Enable (APSTE)']['value']}")
+            if info['Autonomous Power State Transition'] == "Supported":
+                logger.info(f"{' ':{indent}}{'    Autonomous Power State Transitions':{kwidth}} {info['Autonomous Power State Transition']} and {info['Autonomous Power State Transition Enable (APSTE)']}")
             else:
-                logger.info(f"{' ':{indent}}{'    Autonomous Power State Transitions':{kwidth}} {parameters['Autonomous Power State Transition']['value']}")
+                logger.info(f"{' ':{indent}}{'    Autonomous Power State Transitions':{kwidth}} {info['Autonomous Power State Transition']}")
         except:
                 logger.info(f"{' ':{indent}}{'    Autonomous Power State Transitions':{kwidth}} Not Supported")
 
         try:
-            if parameters['Non-Operational Power State Permissive Mode']['value'] == "Supported":
-                logger.info(f"{' ':{indent}}{'    Non-Operational Power State Permissive Mode':{kwidth}} {parameters['Non-Operational Power State Permissive Mode']['value']} and {parameters['Non-Operational Power State Permissive Mode Enable (NOPPME)']['value']}")
+            if info['Non-Operational Power State Permissive Mode'] == "Supported":
+                logger.info(f"{' ':{indent}}{'    Non-Operational Power State Permissive Mode':{kwidth}} {info['Non-Operational Power State Permissive Mode']} and {info['Non-Operational Power State Permissive Mode Enable (NOPPME)']}")
             else:
-                logger.info(f"{' ':{indent}}{'    Non-Operational Power State Permissive Mode':{kwidth}} {parameters['Non-Operational Power State Permissive Mode']['value']}")
+                logger.info(f"{' ':{indent}}{'    Non-Operational Power State Permissive Mode':{kwidth}} {info['Non-Operational Power State Permissive Mode']}")
         except:
             logger.info(f"{' ':{indent}}{'    Non-Operational Power State Permissive Mode':{kwidth}} Not Supported")
         
@@ -698,53 +1396,53 @@ def log_report(ref_info_file, nvme, standalone):
         logger.info(f"{' ':{indent}}    -------------------------------------------------------------------------------------------------------------------------------------")
         logger.info(f"{' ':{indent}}    State   NOP    Max        Active     Idle       Entry Latency   Exit Latency    ITPT          ITPS     RWL   RWT   RRL   RRT")
         logger.info(f"{' ':{indent}}    -------------------------------------------------------------------------------------------------------------------------------------")
-        for state in range(int(parameters['Number of Power States Support (NPSS)']['value'])):
+        for state in range(int(info['Number of Power States Support (NPSS)'])):
             power_state = f"{' ':{indent}}    {state:<8}"
 
-            if (parameters[f"Power State {state} Non-Operational State (NOPS)"]['value'] == "True"): 
+            if (info[f"Power State {state} Non-Operational State (NOPS)"] == "True"): 
                 power_state += f"{'Yes':7}"
             else: 
                 power_state += f"{' ':7}"
 
-            if (parameters[f"Power State {state} Maximum Power (MP)"]['value'] == "Not Reported"): 
+            if (info[f"Power State {state} Maximum Power (MP)"] == "Not Reported"): 
                 power_state += f"{' ':11}"
             else: 
-                power_state += f"{parameters[f'Power State {state} Maximum Power (MP)']['value'].split()[0]+' W':11}"
+                power_state += f"{info[f'Power State {state} Maximum Power (MP)'].split()[0]+' W':11}"
 
-            if (parameters[f"Power State {state} Active Power (ACTP)"]['value'] == "Not Reported"): 
+            if (info[f"Power State {state} Active Power (ACTP)"] == "Not Reported"): 
                 power_state += f"{' ':11}"
             else: 
-                power_state += f"{parameters[f'Power State {state} Active Power (ACTP)']['value'].split()[0]+' W':11}"
+                power_state += f"{info[f'Power State {state} Active Power (ACTP)'].split()[0]+' W':11}"
 
-            if (parameters[f"Power State {state} Idle Power (IDLP)"]['value'] == "Not Reported"): 
+            if (info[f"Power State {state} Idle Power (IDLP)"] == "Not Reported"): 
                 power_state += f"{' ':11}"
             else: 
-                power_state += f"{parameters[f'Power State {state} Idle Power (IDLP)']['value'].split()[0]+' W':11}"
+                power_state += f"{info[f'Power State {state} Idle Power (IDLP)'].split()[0]+' W':11}"
 
-            if (parameters[f"Power State {state} Entry Latency (ENLAT)"]['value'] == "Not Reported"): 
+            if (info[f"Power State {state} Entry Latency (ENLAT)"] == "Not Reported"): 
                 power_state += f"{' ':16}"
             else: 
-                power_state += f"{parameters[f'Power State {state} Entry Latency (ENLAT)']['value'].split('(')[0]:16}"
+                power_state += f"{info[f'Power State {state} Entry Latency (ENLAT)'].split('(')[0]:16}"
 
-            if (parameters[f"Power State {state} Exit Latency (EXLAT)"]['value'] == "Not Reported"): 
+            if (info[f"Power State {state} Exit Latency (EXLAT)"] == "Not Reported"): 
                 power_state += f"{' ':16}"
             else: 
-                power_state += f"{parameters[f'Power State {state} Exit Latency (EXLAT)']['value'].split('(')[0]:16}"
+                power_state += f"{info[f'Power State {state} Exit Latency (EXLAT)'].split('(')[0]:16}"
 
-            if f"Power State {state} Idle Time Prior to Transition (ITPT)" in parameters:
-                power_state += f"{parameters[f'Power State {state} Idle Time Prior to Transition (ITPT)']['value'].split('(')[0]:14}"
+            if f"Power State {state} Idle Time Prior to Transition (ITPT)" in info:
+                power_state += f"{info[f'Power State {state} Idle Time Prior to Transition (ITPT)'].split('(')[0]:14}"
             else: 
                 power_state += f"{' ':14}"
 
-            if f"Power State {state} Idle Transition Power State (ITPS)" in  parameters:
-                power_state += f"{parameters[f'Power State {state} Idle Transition Power State (ITPS)']['value'].split('(')[0]:9}"
+            if f"Power State {state} Idle Transition Power State (ITPS)" in info:
+                power_state += f"{info[f'Power State {state} Idle Transition Power State (ITPS)'].split('(')[0]:9}"
             else: 
                 power_state += f"{' ':9}"
 
-            power_state += f"{parameters[f'Power State {state} Relative Write Latency (RWL)']['value']:6}"  
-            power_state += f"{parameters[f'Power State {state} Relative Write Throughput (RWT)']['value']:6}"  
-            power_state += f"{parameters[f'Power State {state} Relative Read Latency (RRL)']['value']:6}"  
-            power_state += f"{parameters[f'Power State {state} Relative Read Throughput (RRT)']['value']:6}"  
+            power_state += f"{info[f'Power State {state} Relative Write Latency (RWL)']:6}"  
+            power_state += f"{info[f'Power State {state} Relative Write Throughput (RWT)']:6}"  
+            power_state += f"{info[f'Power State {state} Relative Read Latency (RRL)']:6}"  
+            power_state += f"{info[f'Power State {state} Relative Read Throughput (RRT)']:6}"  
 
             logger.info(power_state)
 
@@ -754,16 +1452,16 @@ def log_report(ref_info_file, nvme, standalone):
         logger.info(f"{' ':{indent}}    -------------------------------------------------------------------------------------------------------------------------------------")
         logger.info(f"{' ':{indent}}    PCI        Vendor       Vendor ID    Device ID    Width             Speed                                 Location")
         logger.info(f"{' ':{indent}}    -------------------------------------------------------------------------------------------------------------------------------------")
-        logger.info(f"{' ':{indent}}{'    Endpoint':{15}}{parameters['Controller Vendor']['value']:13}" + 
-                    f"{parameters['PCI Vendor ID (VID)']['value']:13}" +
-                    f"{parameters['PCI Device ID']['value']:13}" + 
-                    f"{parameters['PCI Width']['value']} (Rated: {parameters['PCI Rated Width']['value']})    " +
-                    f"{parameters['PCI Speed']['value']} (Rated: {parameters['PCI Rated Speed']['value']})    " +
-                    f"{parameters['PCI Location']['value']} ")
-
-        logger.info(f"{' ':{indent}}{'    Root':{15}}{' ':13}{parameters['Root PCI Vendor ID']['value']:13}" +
-                    f"{parameters['Root PCI Device ID']['value']:13}{' ':56}" +
-                    f"{parameters['Root PCI Location']['value']} ")
+        logger.info(f"{' ':{indent}}{'    Endpoint':{15}}{info['Controller Vendor']:13}" + 
+                    f"{info['PCI Vendor ID (VID)']:13}" +
+                    f"{info['PCI Device ID']:13}" + 
+                    f"{info['PCI Width']} (Rated: {info['PCI Rated Width']})    " +
+                    f"{info['PCI Speed']} (Rated: {info['PCI Rated Speed']})    " +
+                    f"{info['PCI Location']} ")
+
+        logger.info(f"{' ':{indent}}{'    Root':{15}}{' ':13}{info['Root PCI Vendor ID']:13}" +
+                    f"{info['Root PCI Device ID']:13}{' ':56}" +
+                    f"{info['Root PCI Location']} ")
 
         logger.info("")
         return 0
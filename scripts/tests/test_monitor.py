@@ -0,0 +1,117 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Tests for following a live monitor
+#
+#  The monitor directory is laid out the way nvmecmd writes it with "log sample rate": 1, one
+#  nvme.info.sample-<number>.json per sample next to the read.summary.json and nvme.info.json of the run.
+#
+#  Run from the scripts directory:   python -m unittest discover tests
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import os,sys,json,time,tempfile,unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitor import read_live_samples,wait_for_steady_state
+
+START_SEC = 1614852000                  # file times of the samples, one sample every 10 seconds
+
+def write_info(file_path, parameters, modified_sec=None):
+    with open(file_path, 'w') as info_file:
+        json.dump({"_metadata": {"system": {}}, "nvme": {"parameters": {name: {"value": value} for name,value in parameters.items()}}}, info_file)
+    if modified_sec is not None: os.utime(file_path, (modified_sec, modified_sec))
+
+def write_sample(directory, number, temperature=40, busy_min=5):
+    write_info(os.path.join(directory, f"nvme.info.sample-{number}.json"),
+               {"Composite Temperature": f"{temperature} C", "Controller Busy Time": f"{busy_min} Min"},
+               START_SEC + 10 * number)
+
+class RunningProcess:
+    def poll(self): return None
+
+class ReadLiveSamplesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path      = self.directory.name
+
+        # Files of the run that are not samples
+
+        write_info(os.path.join(self.path, "nvme.info.json"), {"Composite Temperature": "99 C"})
+        with open(os.path.join(self.path, "read.summary.json"), 'w') as summary_file:
+            summary_file.write("{}")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def temperatures(self, samples):
+        return [sample["Composite Temperature"] for sample in samples]
+
+    def test_samples_in_number_order(self):
+
+        for number in [10, 2, 1, 11, 3]:
+            write_sample(self.path, number, temperature=number)
+
+        samples = read_live_samples(self.path, {})
+        self.assertEqual(self.temperatures(samples), ["1 C", "2 C", "3 C", "10 C", "11 C"])
+        self.assertEqual(samples[0]["timestamp"][:4], time.strftime("%Y", time.localtime(START_SEC)))
+
+    def test_only_new_samples(self):
+
+        seen = {}
+        write_sample(self.path, 1, temperature=41)
+        self.assertEqual(self.temperatures(read_live_samples(self.path, seen)), ["41 C"])
+
+        write_sample(self.path, 2, temperature=42)
+        self.assertEqual(self.temperatures(read_live_samples(self.path, seen)), ["42 C"])
+        self.assertEqual(read_live_samples(self.path, seen), [])
+
+    def test_partial_sample_is_read_again(self):
+
+        seen = {}
+        write_sample(self.path, 1, temperature=41)
+        write_sample(self.path, 3, temperature=43)
+        with open(os.path.join(self.path, "nvme.info.sample-2.json"), 'w') as partial_file:
+            partial_file.write('{"nvme": {"parameters": {"Composite')
+
+        self.assertEqual(self.temperatures(read_live_samples(self.path, seen)), ["41 C"])
+
+        write_sample(self.path, 2, temperature=42)
+        self.assertEqual(self.temperatures(read_live_samples(self.path, seen)), ["42 C", "43 C"])
+
+    def test_steady_state(self):
+
+        for number in range(1, 20):
+            write_sample(self.path, number)
+
+        steady, state = wait_for_steady_state(self.path, RunningProcess(), max_wait_sec=0, poll_sec=0)
+        self.assertTrue(steady)
+        self.assertEqual(state.temperature, 40)
+
+    def test_steady_state_without_samples_warns(self):
+
+        with self.assertLogs('nvme_logger', level='WARNING'):
+            steady, state = wait_for_steady_state(self.path, RunningProcess(), max_wait_sec=0, poll_sec=0)
+        self.assertFalse(steady)
+        self.assertEqual(state.samples, 0)
+
+if __name__ == '__main__':
+    unittest.main()
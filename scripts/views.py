@@ -0,0 +1,153 @@
+#--------------------------------------------------------------------------------------------------------------------
+#  Simple functions that project nvme.info.json files through the GUI view filters (resources/view_filters)
+#
+#  A view filter is a list of parameter names, e.g. SMART.filter.json.  The filters are compiled once into one list
+#  of all the parameter names used plus, for each view, the positions of its names in that list.  Each info file is
+#  read once and every view is taken from the same values, so a set of views is applied to many files in one pass.
+#  The output is one small json or csv file per view with the values of each file.
+#
+#  Command line example:   python views.py checkout --views SMART THERMAL --format csv --output views
+#--------------------------------------------------------------------------------------------------------------------
+# Copyright(c) 2021 Joseph Jones
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this softwareand associated documentation files(the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and /or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions :
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#--------------------------------------------------------------------------------------------------------------------
+import sys,os,argparse,logging,json,csv,glob
+from nvmeinfo import NvmeInfo
+from rules import find_info_files
+
+logger = logging.getLogger('nvme_logger')
+
+FILTER_EXTENSION = ".filter.json"
+
+if 'NVMEINFO_INSTALL_PATH' in os.environ:
+    VIEW_FILTER_DIRECTORY = os.path.join(os.environ['NVMEINFO_INSTALL_PATH'],'resources','view_filters')
+else:
+    VIEW_FILTER_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','resources','view_filters')
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Load and compile the view filters
+#--------------------------------------------------------------------------------------------------------------------
+def load_view_filters(directory=VIEW_FILTER_DIRECTORY, views=None):
+
+    # Returns view name -> list of parameter names, views is a list of names (e.g. SMART) or None for all
+
+    if views is None:
+        views = sorted(os.path.basename(path)[:-len(FILTER_EXTENSION)] for path in glob.glob(os.path.join(directory,'*'+FILTER_EXTENSION)))
+
+    view_filters = {}
+    for view in views:
+        with open(os.path.join(directory, view + FILTER_EXTENSION)) as filter_file:
+            view_filters[view] = json.load(filter_file)['filter']
+    return view_filters
+
+class ViewProjection:
+
+    def __init__(self, view_filters):
+
+        self.names     = []                     # every parameter name used by the views, in first use order
+        self.positions = {}                     # view -> positions of its names in self.names
+
+        index = {}
+        for view,names in view_filters.items():
+            positions = []
+            for name in names:
+                if name not in index:
+                    index[name] = len(self.names)
+                    self.names.append(name)
+                if index[name] not in positions: positions.append(index[name])
+            self.positions[view] = positions
+
+    def view_names(self, view):
+        return [self.names[position] for position in self.positions[view]]
+
+    def project(self, parameters):
+
+        # Returns view -> {name: value} with only the parameters the info file has, the same as the GUI
+
+        values = [parameters[name]['value'] if name in parameters else None for name in self.names]
+
+        return {view: {self.names[position]: values[position] for position in positions if values[position] is not None}
+                for view,positions in self.positions.items()}
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Project many info files in one pass and save one file per view
+#--------------------------------------------------------------------------------------------------------------------
+def project_info_files(info_files, projection):
+
+    # Returns view -> list of (info file, values), files that can't be read are logged and skipped
+
+    projected = {view: [] for view in projection.positions}
+
+    for info_file in info_files:
+        try:
+            views = projection.project(NvmeInfo(info_file).parameters)
+        except Exception as e:
+            logger.error(f"Failed to read {info_file} with exception: {e}")
+            continue
+
+        for view,values in views.items():
+            projected[view].append((info_file, values))
+
+    return projected
+
+def write_view(output_path, output_format, names, rows):
+
+    if output_format == 'json':
+        with open(output_path, 'w') as json_file:
+            json.dump({"parameters": names, "files": [{"file": info_file, "values": values} for info_file,values in rows]}, json_file, indent=1)
+    else:
+        with open(output_path, mode='w', newline='') as csv_file:
+            csv_writer = csv.writer(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            csv_writer.writerow(['File'] + names)
+            for info_file,values in rows:
+                csv_writer.writerow([info_file] + [values.get(name,"") for name in names])
+
+#--------------------------------------------------------------------------------------------------------------------
+#  Project info files from the command line
+#--------------------------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Saves view filter projections of nvme.info.json files', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('paths',     type=str, nargs='+', help='nvme.info.json files or directories to search for them', metavar='<path>')
+    parser.add_argument('--views',   type=str, nargs='+', default=None, help='Views to save (e.g. SMART THERMAL), default is all views', metavar='<view>')
+    parser.add_argument('--filters', type=str, default=VIEW_FILTER_DIRECTORY, help='Directory with the *.filter.json files', metavar='<dir>')
+    parser.add_argument('--format',  type=str, default='json', choices=['json','csv'], help='Output file format')
+    parser.add_argument('--output',  type=str, default='.', help='Directory to save one file per view', metavar='<dir>')
+    args = parser.parse_args()
+
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+    try:
+        projection = ViewProjection(load_view_filters(args.filters, args.views))
+    except Exception as e:
+        logger.error(f"Failed to load view filters with exception: {e}")
+        sys.exit(1)
+
+    info_files = find_info_files(args.paths)
+    projected  = project_info_files(info_files, projection)
+
+    os.makedirs(args.output, exist_ok=True)
+    for view,rows in projected.items():
+        output_path = os.path.join(args.output, f"{view}.{args.format}")
+        write_view(output_path, args.format, projection.view_names(view), rows)
+        logger.info(f"\t {view:15} {len(rows)} files   {output_path}")
+
+    sys.exit(0 if len(info_files) == len(next(iter(projected.values()), [])) else 1)